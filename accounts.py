@@ -0,0 +1,64 @@
+"""
+Account-state index for the blockchain.
+Keeps confirmed balances per address, updated block by block, plus the debits of
+transactions still waiting in the pending pool, so lookups are O(1) instead of a
+walk over the whole chain.
+"""
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+class AccountIndex:
+    def __init__(self):
+        self.balances: Dict[str, float] = defaultdict(float)
+        self.pending_debits: Dict[str, float] = defaultdict(float)
+        self.height = 0  # number of blocks applied
+        self.lock = threading.Lock()
+
+    def _apply(self, block) -> None:
+        for transaction in block.transactions:
+            # Genesis carries a plain string, not a transfer
+            if isinstance(transaction, dict):
+                self.balances[transaction["recipient"]] += transaction["amount"]
+                self.balances[transaction["sender"]] -= transaction["amount"]
+        self.height += 1
+
+    def apply_block(self, block) -> None:
+        with self.lock:
+            self._apply(block)
+
+    def rebuild(self, chain: List) -> None:
+        """Recompute confirmed balances from scratch, e.g. after loading a chain"""
+        # One critical section, so a concurrent apply_block cannot land in the middle
+        with self.lock:
+            self.balances.clear()
+            self.height = 0
+            for block in chain:
+                self._apply(block)
+
+    def add_pending(self, transaction: Dict) -> None:
+        with self.lock:
+            self.pending_debits[transaction["sender"]] += transaction["amount"]
+
+    def remove_pending(self, transaction: Dict) -> None:
+        with self.lock:
+            sender = transaction["sender"]
+            self.pending_debits[sender] -= transaction["amount"]
+            if not self.pending_debits[sender]:
+                del self.pending_debits[sender]
+
+    def clear_pending(self) -> None:
+        with self.lock:
+            self.pending_debits.clear()
+
+    def balance(self, address: str) -> float:
+        return self.balances.get(address, 0.0)
+
+    def bulk_balances(self, addresses: Iterable[str]) -> Dict[str, float]:
+        balances = self.balances
+        return {address: balances.get(address, 0.0) for address in addresses}
+
+    def available(self, address: str) -> float:
+        """Confirmed balance minus what pending transactions already spend"""
+        return self.balances.get(address, 0.0) - self.pending_debits.get(address, 0.0)
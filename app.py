@@ -1,26 +1,48 @@
 """
-Example Flask backend with simple HMAC signature authentication and in-memory rate limiting.
+Example Flask backend with simple HMAC signature authentication and rate limiting.
 This file demonstrates how to harden endpoints; adapt to your framework and scale accordingly.
 """
 import os
+import json
+import math
 import time
 import hmac
 import hashlib
+import uuid
+import urllib.request
 from functools import wraps
-from collections import deque, defaultdict
 from flask import Flask, request, jsonify, abort
 
-from web3_utils import get_web3, load_contract
+from audit import AuditBatcher, AuditQueueFull
+from jobs import JobQueue, JobQueueFull
+from rate_limit import MemoryBackend, RateLimiter, RedisBackend
+from web3_utils import anchor_root, pool
 
 # Configuration via environment
 AUTH_SECRET = os.environ.get("AUTH_SECRET", None)
 RATE_LIMIT = int(os.environ.get("RATE_LIMIT_PER_MINUTE", "60"))
 RATE_WINDOW = 60  # seconds
+# Shared limits across API processes; per-process limits when unset
+RATE_LIMIT_REDIS_URL = os.environ.get("RATE_LIMIT_REDIS_URL")
+ML_WORKER_URL = os.environ.get("ML_WORKER_URL", "http://localhost:5001")
+ML_WORKER_TIMEOUT = float(os.environ.get("ML_WORKER_TIMEOUT", "10"))
 
 app = Flask(__name__)
 
-# Simple in-memory rate limiter keyed by remote addr or API key
-_request_log = defaultdict(lambda: deque())
+
+def _rate_limit_backend():
+    if RATE_LIMIT_REDIS_URL:
+        try:
+            import redis
+        except ImportError:
+            app.logger.warning("redis package not installed; rate limits are per process")
+        else:
+            return RedisBackend(redis.Redis.from_url(RATE_LIMIT_REDIS_URL))
+    return MemoryBackend()
+
+
+# Sliding-window rate limiter keyed by remote addr or API key
+limiter = RateLimiter(RATE_LIMIT, RATE_WINDOW, _rate_limit_backend())
 
 
 def verify_signature(body: bytes, signature_header: str) -> bool:
@@ -42,14 +64,9 @@ def rate_limited(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         key = request.headers.get("X-API-Key") or request.remote_addr
-        now = time.time()
-        q = _request_log[key]
-        # Pop old timestamps
-        while q and q[0] <= now - RATE_WINDOW:
-            q.popleft()
-        if len(q) >= RATE_LIMIT:
-            return jsonify({"error": "rate limit exceeded"}), 429
-        q.append(now)
+        allowed, retry_after = limiter.hit(key)
+        if not allowed:
+            return jsonify({"error": "rate limit exceeded"}), 429, {"Retry-After": str(math.ceil(retry_after))}
         return func(*args, **kwargs)
     return wrapper
 
@@ -69,11 +86,90 @@ def status():
     return jsonify({"status": "ok", "time": int(time.time())})
 
 
+def _anchor_audit_root(root: str) -> str:
+    """Anchor one batch root through the pooled provider (runs on the audit thread)"""
+    metrics = {}
+    w3 = pool.web3(os.environ.get("WEB3_PROVIDER_URI"), metrics)
+    contract_addr = os.environ.get("AUDIT_CONTRACT_ADDR")
+    contract = None
+    if contract_addr:
+        abi_path = os.environ.get("AUDIT_CONTRACT_ABI", "abi/AuditContract.abi.json")
+        contract = pool.contract(w3, abi_path, contract_addr, metrics)
+    tx_hash = anchor_root(w3, os.environ["AUDIT_PRIVATE_KEY"], root, contract)
+    app.logger.debug("web3 anchor metrics: %s", metrics)
+    return tx_hash
+
+
+# Tasks are anchored on chain in batches when a provider and signing key are configured
+audit_batcher = None
+if os.environ.get("WEB3_PROVIDER_URI") and os.environ.get("AUDIT_PRIVATE_KEY"):
+    audit_batcher = AuditBatcher(
+        _anchor_audit_root,
+        max_batch=int(os.environ.get("AUDIT_BATCH_SIZE", "256")),
+        max_delay=float(os.environ.get("AUDIT_BATCH_SECONDS", "10")),
+    )
+    audit_batcher.start()
+
+
+def _predict(rows: list) -> list:
+    body = json.dumps({"features": rows}).encode()
+    req = urllib.request.Request(ML_WORKER_URL.rstrip("/") + "/predict", body,
+                                 {"Content-Type": "application/json"})
+    with urllib.request.urlopen(req, timeout=ML_WORKER_TIMEOUT) as resp:
+        predictions = json.load(resp)["predictions"]
+    if len(predictions) != len(rows):
+        raise RuntimeError(f"ML worker returned {len(predictions)} predictions for {len(rows)} rows")
+    return predictions
+
+
+def _feature_rows(features) -> list:
+    """meta.features as a list of rows (one row or a list of rows); ValueError if malformed"""
+    if not isinstance(features, list) or not features:
+        raise ValueError("features must be a non-empty list")
+    rows = features if isinstance(features[0], list) else [features]
+    for row in rows:
+        if not isinstance(row, list) or not all(isinstance(x, (int, float)) and not isinstance(x, bool) for x in row):
+            raise ValueError("features must be numbers or lists of numbers")
+    return rows
+
+
+def _run_tasks(payloads: list) -> list:
+    """Job handler: the feature rows of a whole batch go to the ML worker in one /predict call"""
+    rows, spans = [], []
+    for payload in payloads:
+        features = (payload.get("meta") or {}).get("features")
+        if features is None:
+            spans.append(None)
+            continue
+        task_rows = _feature_rows(features)
+        spans.append((len(rows), len(rows) + len(task_rows)))
+        rows.extend(task_rows)
+    predictions = _predict(rows) if rows else []
+
+    results = []
+    for payload, span in zip(payloads, spans):
+        result = {"task": payload["task"]}
+        if span is not None:
+            result["predictions"] = predictions[span[0]:span[1]]
+        results.append(result)
+    return results
+
+
+jobs = JobQueue(
+    _run_tasks,
+    workers=int(os.environ.get("JOB_WORKERS", "4")),
+    max_queue=int(os.environ.get("JOB_QUEUE_SIZE", "1000")),
+    batch_size=int(os.environ.get("JOB_BATCH_SIZE", "32")),
+    max_attempts=int(os.environ.get("JOB_MAX_ATTEMPTS", "3")),
+    processes=os.environ.get("JOB_PROCESSES", "0") == "1",
+)
+
+
 @app.route("/submit_task", methods=["POST"])
 @rate_limited
 @signature_required
 def submit_task():
-    """Protected endpoint that accepts a work description and (optionally) triggers an on-chain transaction.
+    """Protected endpoint that accepts a work description and queues it for on-chain audit.
 
     Body JSON example:
     {
@@ -86,25 +182,63 @@ def submit_task():
     if not task:
         return jsonify({"error": "task required"}), 400
 
-    # Example: if configured, interact with web3 to submit a record on-chain
-    web3_provider = os.environ.get("WEB3_PROVIDER_URI")
-    contract_addr = os.environ.get("AUDIT_CONTRACT_ADDR")
-    abi_path = os.environ.get("AUDIT_CONTRACT_ABI", "abi/AuditContract.abi.json")
-
-    if web3_provider and contract_addr:
+    features = (data.get("meta") or {}).get("features")
+    if features is not None:
         try:
-            w3 = get_web3(web3_provider)
-            contract = load_contract(w3, abi_path, contract_addr)
-            # Example call (read-only). For write transactions, use web3_utils.sign_and_send.
-            if hasattr(contract.functions, "recordTask"):
-                tx = contract.functions.recordTask(task).buildTransaction({"from": w3.eth.accounts[0]})
-                # This is just a placeholder: do not use in production without proper key management.
-        except Exception:
-            # Non-fatal: proceed without on-chain audit if web3 errors occur.
-            pass
-
-    # Enqueue work, notify ML worker, etc. This is left minimal for the prototype.
-    return jsonify({"status": "accepted", "task": task}), 202
+            _feature_rows(features)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    # The audit record is queued first: once the job is queued it will run, so every
+    # error returned after that point would make a retrying client run the task twice
+    audit_id = None
+    if audit_batcher is not None:
+        record = {"id": str(uuid.uuid4()), "task": task, "meta": data.get("meta"), "timestamp": time.time()}
+        try:
+            audit_id = audit_batcher.submit(record)
+        except AuditQueueFull:
+            return jsonify({"error": "audit queue is full"}), 503, {"Retry-After": "1"}
+        except ValueError as e:
+            return jsonify({"error": f"task cannot be audited: {e}"}), 400
+
+    try:
+        job = jobs.submit({"task": task, "meta": data.get("meta")})
+    except JobQueueFull:
+        if audit_id is not None:
+            audit_batcher.withdraw(audit_id)
+        return jsonify({"error": "job queue is full"}), 503, {"Retry-After": "1"}
+
+    response = {"status": "accepted", "task": task, "job_id": job.id}
+    if audit_id is not None:
+        response["audit_id"] = audit_id
+    return jsonify(response), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+@rate_limited
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job id"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    data = {"jobs": jobs.metrics()}
+    if audit_batcher is not None:
+        data["audit"] = dict(audit_batcher.stats, pending=audit_batcher.pending)
+    return jsonify(data)
+
+
+@app.route("/audit/<audit_id>", methods=["GET"])
+@rate_limited
+def audit_proof(audit_id):
+    """Inclusion proof of a submitted task against its anchored batch root"""
+    proof = audit_batcher.proof(audit_id) if audit_batcher is not None else None
+    if proof is None:
+        return jsonify({"error": "unknown audit id"}), 404
+    return jsonify(proof)
 
 
 if __name__ == "__main__":
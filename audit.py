@@ -0,0 +1,225 @@
+"""
+Batched audit anchoring of accepted tasks.
+- `submit` only appends the task record to an in-memory batch; it never waits on
+  the chain.
+- A background thread seals the batch once it holds `max_batch` tasks or its oldest
+  task has waited `max_delay` seconds, and hands the batch's Merkle root to `anchor`
+  (e.g. one on-chain write). Failed anchors are retried with exponential backoff,
+  oldest batch first.
+- `proof(task_id)` returns the task's inclusion proof against its batch root and the
+  anchoring transaction once they exist.
+"""
+import itertools
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+from core.encoding import encode_value
+from merkle import merkle_proofs, merkle_root
+
+
+class AuditQueueFull(Exception):
+    pass
+
+
+@dataclass
+class AuditBatch:
+    id: int
+    records: List[Dict]
+    root: str
+    proofs: List[list]
+    sealed_at: float
+    tx_hash: str = None
+    anchored_at: float = None
+    attempts: int = 0
+    next_attempt: float = 0.0
+    error: str = None
+
+
+class AuditBatcher:
+    def __init__(self, anchor: Callable[[str], str], max_batch: int = 256, max_delay: float = 10.0,
+                 max_pending: int = 100000, retry_delay: float = 1.0, max_retry_delay: float = 300.0,
+                 keep_batches: int = 10000):
+        self.anchor = anchor  # root hex -> transaction hash
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending  # tasks not yet anchored
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.keep_batches = keep_batches  # anchored batches kept for proof lookups
+
+        self._cond = threading.Condition()
+        self._open: List[Dict] = []  # records waiting to be sealed
+        self._open_since = None
+        self._sealed = deque()  # batches waiting to be anchored, oldest first
+        self.batches: "OrderedDict[int, AuditBatch]" = OrderedDict()
+        self._locations: Dict[str, tuple] = {}  # task id -> (batch id, index), None until sealed
+        self._batch_ids = itertools.count(1)
+        self.pending = 0
+        self.stats = Counter()
+        self._thread = None
+        self._stopping = False
+        # Held while sealing or anchoring, so flush and the thread never work on one batch
+        self._work = threading.Lock()
+
+    def submit(self, record: Dict) -> str:
+        """Queue a task record (with a unique "id") for the next batch"""
+        encode_value(record)  # reject values the Merkle leaves cannot encode up front
+        with self._cond:
+            if self.pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise AuditQueueFull("audit queue is full")
+            if not self._open:
+                self._open_since = time.time()
+            self._open.append(record)
+            self._locations[record["id"]] = None
+            self.pending += 1
+            self.stats["submitted"] += 1
+            if len(self._open) >= self.max_batch:
+                self._cond.notify()
+        return record["id"]
+
+    def withdraw(self, task_id: str) -> bool:
+        """Drop a record that has not been sealed yet; False if it is already in a batch"""
+        with self._cond:
+            if self._locations.get(task_id, ()) is not None:
+                return False
+            # Records being sealed are out of _open but have no location yet
+            index = next((i for i, record in enumerate(self._open) if record["id"] == task_id), None)
+            if index is None:
+                return False
+            del self._open[index]
+            del self._locations[task_id]
+            if not self._open:
+                self._open_since = None
+            self.pending -= 1
+            self.stats["withdrawn"] += 1
+            return True
+
+    def proof(self, task_id: str) -> Dict:
+        """Audit status of a task; None if unknown (or its batch has been dropped)"""
+        with self._cond:
+            if task_id not in self._locations:
+                return None
+            location = self._locations[task_id]
+            if location is None:
+                return {"id": task_id, "status": "pending"}
+            batch = self.batches[location[0]]
+            return {
+                "id": task_id,
+                "status": "anchored" if batch.tx_hash else "sealed",
+                "batch": batch.id,
+                "record": batch.records[location[1]],
+                "root": batch.root,
+                "proof": batch.proofs[location[1]],
+                "tx_hash": batch.tx_hash,
+                "error": batch.error,
+            }
+
+    def _seal(self) -> None:
+        with self._cond:
+            records = self._open[:self.max_batch]
+            self._open = self._open[self.max_batch:]
+            self._open_since = time.time() if self._open else None
+        if not records:
+            return
+        # Hashing happens outside the lock, so submit is never held up by it
+        batch = AuditBatch(next(self._batch_ids), records, merkle_root(records), merkle_proofs(records), time.time())
+        with self._cond:
+            self.batches[batch.id] = batch
+            for index, record in enumerate(records):
+                self._locations[record["id"]] = (batch.id, index)
+            self._sealed.append(batch)
+            self.stats["batches"] += 1
+
+    def _anchor(self, batch: AuditBatch) -> None:
+        with self._cond:
+            if not self._sealed or self._sealed[0] is not batch:
+                return  # anchored meanwhile
+        try:
+            tx_hash = self.anchor(batch.root)
+        except Exception as e:
+            with self._cond:
+                batch.attempts += 1
+                batch.error = f"{type(e).__name__}: {e}"
+                delay = min(self.max_retry_delay, self.retry_delay * 2 ** (batch.attempts - 1))
+                batch.next_attempt = time.time() + delay
+                self.stats["anchor_failures"] += 1
+            return
+        with self._cond:
+            batch.tx_hash = tx_hash
+            batch.anchored_at = time.time()
+            batch.error = None
+            self._sealed.popleft()
+            self.pending -= len(batch.records)
+            self.stats["anchored"] += 1
+            self.stats["anchored_tasks"] += len(batch.records)
+            self._drop_old_batches()
+
+    def _drop_old_batches(self) -> None:
+        while len(self.batches) > self.keep_batches:
+            batch = next(iter(self.batches.values()))
+            if batch.tx_hash is None:
+                return  # never forget a batch that is still waiting for its anchor
+            del self.batches[batch.id]
+            for record in batch.records:
+                self._locations.pop(record["id"], None)
+
+    def _next_step(self):
+        """Under the lock: "seal", a batch to anchor, or seconds to wait (None: until notified)"""
+        now = time.time()
+        if self._open and (len(self._open) >= self.max_batch or now - self._open_since >= self.max_delay):
+            return "seal"
+        if self._sealed and self._sealed[0].next_attempt <= now:
+            return self._sealed[0]
+        waits = []
+        if self._open:
+            waits.append(self._open_since + self.max_delay - now)
+        if self._sealed:
+            waits.append(self._sealed[0].next_attempt - now)
+        return min(waits) if waits else None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                step = self._next_step()
+                if step is None or isinstance(step, float):
+                    self._cond.wait(step)
+                    continue
+            with self._work:
+                if step == "seal":
+                    self._seal()
+                else:
+                    self._anchor(step)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def flush(self) -> bool:
+        """Seal and try to anchor everything queued, on the calling thread; True if all anchored"""
+        with self._work:
+            while self._open:
+                self._seal()
+            for batch in list(self._sealed):
+                self._anchor(batch)
+                if batch.tx_hash is None:
+                    return False
+            return True
+
+    def stop(self, flush: bool = True) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            self.flush()
@@ -1,9 +1,84 @@
 import hashlib
 import json
+import struct
 import time
 from datetime import datetime
-from typing import List, Dict, Any
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from accounts import AccountIndex
+from core.mempool import Mempool, tx_id_of
+from merkle import merkle_root
+from mining import ParallelMiner, encode_nonce, mine_sequential
+from wallet import SignatureVerifier, address_of, default_verifier
+
+# Fixed-size header: version, index, previous_hash, merkle_root, timestamp, difficulty.
+# The 8-byte nonce is appended, so every header hashes 90 bytes whatever the block holds.
+HEADER_VERSION = 1
+HEADER_FORMAT = ">BQ32s32sdB"
+
+# Sender of the mining reward, the one transaction that carries no signature
+REWARD_SENDER = "network"
+
+
+class ChainValidationError(ValueError):
+    def __init__(self, index: int, reason: str):
+        super().__init__(f"{reason} at block {index}")
+        self.index = index
+        self.reason = reason
+
+
+def signed_payload(transaction: Dict) -> Dict:
+    """The part of a transaction covered by its signature"""
+    return {k: v for k, v in transaction.items() if k not in ("signature", "public_key")}
+
+
+def _unsigned_reason(transaction: Dict) -> Optional[str]:
+    """Why a transfer cannot be signature-checked, or None if it can"""
+    public_key = transaction.get("public_key")
+    if not isinstance(public_key, str):
+        return "missing public key"
+    if not isinstance(transaction.get("signature"), str):
+        return "missing signature"
+    if address_of(public_key) != transaction.get("sender"):
+        return "public key does not belong to the sender"
+    return None
+
+
+def _check_blocks(blocks: List['Block'], verifier: SignatureVerifier = default_verifier) -> Optional[Tuple[int, str]]:
+    """Self-contained checks for each block; (index, reason) of the first failure"""
+    for block in blocks:
+        # Check the header still commits to the block's transactions
+        if block.merkle_root != merkle_root(block.transactions):
+            return block.index, "invalid merkle root"
+
+        # A repeated transaction would be applied twice to the account index
+        tx_ids = [tx_id_of(tx) for tx in block.transactions if isinstance(tx, dict)]
+        if len(set(tx_ids)) != len(tx_ids):
+            return block.index, "duplicate transaction"
+
+        # Check if current block hash is valid
+        if block.hash != block.calculate_hash():
+            return block.index, "invalid hash"
+
+        # Check proof of work
+        if block.hash[:block.difficulty] != "0" * block.difficulty:
+            return block.index, "invalid proof of work"
+
+        # Every transfer but the trailing mining reward must be signed by its sender
+        signed = [tx for tx in block.transactions if isinstance(tx, dict)]
+        if signed and signed[-1] is block.transactions[-1] and signed[-1].get("sender") == REWARD_SENDER:
+            signed.pop()
+        if any(_unsigned_reason(tx) for tx in signed):
+            return block.index, "unsigned transaction"
+        checked = verifier.verify_batch(
+            [(signed_payload(tx), tx["signature"], tx["public_key"]) for tx in signed])
+        if not all(checked):
+            return block.index, "invalid signature"
+    return None
+
 
 class Block:
     def __init__(self, index: int, transactions: List[Dict], timestamp: float, 
@@ -14,30 +89,44 @@ class Block:
         self.previous_hash = previous_hash
         self.nonce = nonce
         self.difficulty = difficulty  # Ова мора да биде пред calculate_hash!
+        self.merkle_root = merkle_root(transactions)  # computed once per block
         self.hash = self.calculate_hash()
+        self.mining_stats = None
+
+    def header_bytes(self) -> bytes:
+        """Header without the nonce"""
+        return struct.pack(
+            HEADER_FORMAT,
+            HEADER_VERSION,
+            self.index,
+            bytes.fromhex(self.previous_hash.rjust(64, "0")),  # genesis uses "0"
+            bytes.fromhex(self.merkle_root),
+            self.timestamp,
+            self.difficulty
+        )
+
+    def hash_template(self) -> Tuple[bytes, bytes]:
+        """Header split around the nonce: hash = sha256(prefix + nonce + suffix)"""
+        return self.header_bytes(), b""
 
     def calculate_hash(self) -> str:
         # Сега self.difficulty веќе постои
-        block_string = json.dumps({
-            "index": self.index,
-            "transactions": self.transactions,
-            "timestamp": self.timestamp,
-            "previous_hash": self.previous_hash,
-            "nonce": self.nonce,
-            "difficulty": self.difficulty
-        }, sort_keys=True).encode()
-        
-        return hashlib.sha256(block_string).hexdigest()
+        return hashlib.sha256(self.header_bytes() + encode_nonce(self.nonce)).hexdigest()
 
-    def mine_block(self, difficulty: int) -> None:
+    def mine_block(self, difficulty: int, workers: int = 1) -> None:
+        """Find a nonce meeting `difficulty`; workers > 1 uses the multi-process miner"""
         self.difficulty = difficulty
-        target = "0" * difficulty
-        
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-            
-        print(f"Block mined: {self.hash}")
+        prefix, suffix = self.hash_template()
+
+        if workers > 1:
+            result = ParallelMiner(workers).mine(prefix, suffix, difficulty, self.nonce)
+        else:
+            result = mine_sequential(prefix, suffix, difficulty, self.nonce)
+
+        self.nonce = result.nonce
+        self.hash = result.hash
+        self.mining_stats = result
+        print(f"Block mined: {self.hash} ({result.hashrate:.0f} H/s)")
 
     def to_dict(self) -> Dict:
         return {
@@ -45,6 +134,7 @@ class Block:
             "transactions": self.transactions,
             "timestamp": self.timestamp,
             "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root,
             "hash": self.hash,
             "nonce": self.nonce,
             "difficulty": self.difficulty
@@ -52,12 +142,22 @@ class Block:
 
 
 class Blockchain:
-    def __init__(self):
+    def __init__(self, mining_workers: int = 1, max_block_transactions: int = 1000,
+                 mempool_max_count: int = 50000, mempool_max_bytes: int = 64 * 1024 * 1024,
+                 verifier: Optional[SignatureVerifier] = None):
         self.chain: List[Block] = []
-        self.pending_transactions: List[Dict] = []
+        self.verifier = verifier or default_verifier
+        self.accounts = AccountIndex()
+        # Deduplicated by tx id, highest fee first; evicted entries stop counting as pending debits
+        self.pending_transactions = Mempool(mempool_max_count, mempool_max_bytes,
+                                            on_evict=self.accounts.remove_pending)
+        self.max_block_transactions = max_block_transactions
         self.difficulty = 4
         self.mining_reward = 10
+        self.mining_workers = mining_workers  # 1 keeps single-threaded mining
         self.lock = threading.Lock()
+        self.checkpoint: Tuple[int, str] = (0, "")  # (blocks already validated, hash of the last one)
+        self.validation_error = None
         
         # Create genesis block
         self.create_genesis_block()
@@ -65,19 +165,55 @@ class Blockchain:
     def create_genesis_block(self):
         # Додади го difficulty како аргумент
         genesis_block = Block(0, ["Genesis Block"], time.time(), "0", difficulty=self.difficulty)
-        genesis_block.mine_block(self.difficulty)
+        genesis_block.mine_block(self.difficulty, self.mining_workers)
         self.chain.append(genesis_block)
+        self.accounts.apply_block(genesis_block)
 
     def get_last_block(self) -> Block:
         return self.chain[-1]
 
     def add_transaction(self, transaction: Dict) -> None:
-        # Basic validation
+        result = self.add_transactions([transaction])[0]
+        if "error" in result:
+            raise ValueError(result["error"])
+
+    def add_transactions(self, transactions: List[Dict]) -> List[Dict]:
+        """Admit a batch of transactions, verifying their signatures as one batch.
+
+        Every transaction must carry the `public_key` of its sender and a valid signature
+        over the rest of its fields. Returns one {"success": True, "tx_id": ...} or
+        {"error": ...} per item.
+        """
+        results: List[Dict] = [{} for _ in transactions]
+        to_verify = []
         required_fields = ["sender", "recipient", "amount", "signature"]
-        if not all(field in transaction for field in required_fields):
-            raise ValueError("Transaction must contain sender, recipient, amount, and signature")
-            
-        self.pending_transactions.append(transaction)
+        for i, transaction in enumerate(transactions):
+            # Basic validation
+            if not all(field in transaction for field in required_fields):
+                results[i] = {"error": "Transaction must contain sender, recipient, amount, and signature"}
+            elif transaction["sender"] == REWARD_SENDER:
+                results[i] = {"error": "Mining rewards cannot be submitted"}
+            elif _unsigned_reason(transaction):
+                results[i] = {"error": f"Invalid transaction: {_unsigned_reason(transaction)}"}
+            else:
+                to_verify.append(i)
+
+        verified = self.verifier.verify_batch([
+            (signed_payload(transactions[i]), transactions[i]["signature"], transactions[i]["public_key"])
+            for i in to_verify
+        ])
+        for i, ok in zip(to_verify, verified):
+            if not ok:
+                results[i] = {"error": "Invalid transaction signature"}
+
+        for i, transaction in enumerate(transactions):
+            if results[i]:
+                continue
+            # Duplicates and transactions too cheap for a full mempool are dropped
+            if self.pending_transactions.add_transaction(transaction):
+                self.accounts.add_pending(transaction)
+            results[i] = {"success": True, "tx_id": tx_id_of(transaction)}
+        return results
         
     def mine_pending_transactions(self, miner_address: str) -> Block:
         with self.lock:
@@ -86,27 +222,30 @@ class Blockchain:
             
             # Add mining reward transaction
             reward_transaction = {
-                "sender": "network",
+                "sender": REWARD_SENDER,
                 "recipient": miner_address,
                 "amount": self.mining_reward,
                 "signature": "mining_reward"
             }
             
+            included = self.pending_transactions.top(self.max_block_transactions)
             block = Block(
                 index=len(self.chain),
-                transactions=self.pending_transactions.copy() + [reward_transaction],
+                transactions=included + [reward_transaction],
                 timestamp=time.time(),
                 previous_hash=self.get_last_block().hash,
                 difficulty=self.difficulty  # Додади го difficulty тука
             )
             
-            block.mine_block(self.difficulty)
+            block.mine_block(self.difficulty, self.mining_workers)
             
             # Add block to chain
             self.chain.append(block)
+            self.accounts.apply_block(block)
             
-            # Clear pending transactions
-            self.pending_transactions = []
+            # Remove mined transactions from the mempool
+            for transaction in self.pending_transactions.remove(tx_id_of(tx) for tx in included):
+                self.accounts.remove_pending(transaction)
             
             # Adjust difficulty every 10 blocks
             if len(self.chain) % 10 == 0:
@@ -132,40 +271,72 @@ class Blockchain:
             self.difficulty = max(1, self.difficulty - 1)
             print(f"Difficulty decreased to {self.difficulty}")
 
-    def is_chain_valid(self) -> bool:
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i-1]
-            
-            # Check if current block hash is valid
-            if current_block.hash != current_block.calculate_hash():
-                print(f"Invalid hash at block {i}")
-                return False
-            
-            # Check if previous hash matches
-            if current_block.previous_hash != previous_block.hash:
-                print(f"Invalid previous hash at block {i}")
-                return False
-            
-            # Check proof of work
-            if current_block.hash[:current_block.difficulty] != "0" * current_block.difficulty:
-                print(f"Invalid proof of work at block {i}")
-                return False
-        
+    def validate_chain(self, full: bool = False, workers: int = 1) -> None:
+        """Raise ChainValidationError for the first bad block.
+
+        Blocks below the trusted checkpoint are skipped unless `full` is set or the
+        checkpointed block was replaced. workers > 1 spreads hash and proof-of-work
+        checks across a process pool; previous_hash links are checked sequentially.
+        """
+        with self.lock:
+            chain = list(self.chain)
+
+        start = 1
+        height, checkpoint_hash = self.checkpoint
+        if not full and 0 < height <= len(chain) and chain[height - 1].hash == checkpoint_hash:
+            start = height
+
+        failures = []
+
+        # Check if previous hash matches
+        for i in range(start, len(chain)):
+            if chain[i].previous_hash != chain[i - 1].hash:
+                failures.append(ChainValidationError(i, "invalid previous hash"))
+                break
+
+        blocks = chain[start:]
+        if workers > 1 and len(blocks) > workers:
+            size = -(-len(blocks) // workers)
+            chunks = [blocks[i:i + size] for i in range(0, len(blocks), size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                check = partial(_check_blocks, verifier=self.verifier)
+                failure = next((f for f in pool.map(check, chunks) if f), None)
+        else:
+            failure = _check_blocks(blocks, self.verifier)
+        if failure:
+            failures.append(ChainValidationError(*failure))
+
+        if failures:
+            raise min(failures, key=lambda e: e.index)
+
+        self.checkpoint = (len(chain), chain[-1].hash)
+
+    def is_chain_valid(self, full: bool = False, workers: int = 1) -> bool:
+        """Boolean form of validate_chain; the failure is kept in self.validation_error"""
+        try:
+            self.validate_chain(full, workers)
+        except ChainValidationError as e:
+            self.validation_error = e
+            return False
+        self.validation_error = None
         return True
 
     def get_balance(self, address: str) -> float:
-        balance = 0.0
-        
-        for block in self.chain:
-            for transaction in block.transactions:
-                if isinstance(transaction, dict):
-                    if transaction["recipient"] == address:
-                        balance += transaction["amount"]
-                    if transaction["sender"] == address:
-                        balance -= transaction["amount"]
-        
-        return balance
+        return self.accounts.balance(address)
+
+    def get_balances(self, addresses: List[str]) -> Dict[str, float]:
+        return self.accounts.bulk_balances(addresses)
+
+    def get_available_balance(self, address: str) -> float:
+        """Balance left after the sender's pending transactions are mined"""
+        return self.accounts.available(address)
+
+    def rebuild_account_index(self) -> None:
+        """Recompute balances from the chain, e.g. after replacing self.chain on startup"""
+        self.accounts.rebuild(self.chain)
+        self.accounts.clear_pending()
+        for transaction in self.pending_transactions:
+            self.accounts.add_pending(transaction)
 
     def to_dict(self) -> List[Dict]:
         return [block.to_dict() for block in self.chain]
@@ -0,0 +1,192 @@
+"""
+Streaming chat ingestion in front of NFT training.
+- Messages are queued per NFT instead of being trained, or rejected by the cooldown,
+  one at a time.
+- A scheduler keeps the NFTs with queued messages in a heap ordered by the time their
+  cooldown ends. Every NFT that comes due gets one training step built from its queue
+  by the merge policy, and all due NFTs are trained with one NFTManager.train_batch.
+  The manager's lock serializes that pass with request threads training through
+  NFTManager.train_with_chat or train_batch on the same manager.
+- Features of every message in a step are extracted in one vectorized pass.
+- `stats()` reports throughput, queue depth and drop counts.
+
+Merge policies:
+- "latest": train on the newest message, older ones are folded into it unused
+- "concat": train on all queued messages joined by spaces
+- "mean": train on the average features and target of the queued messages
+"""
+import heapq
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List
+
+import numpy as np
+
+from nft import NFTManager, TRAIN_COOLDOWN, batch_features
+
+MERGE_POLICIES = ("latest", "concat", "mean")
+
+
+class ChatIngestor:
+    def __init__(self, manager: NFTManager, merge_policy: str = "latest", max_queue: int = 100,
+                 max_pending: int = 100000, max_batch: int = 1024):
+        if merge_policy not in MERGE_POLICIES:
+            raise ValueError(f"Unknown merge policy {merge_policy!r}, expected one of {MERGE_POLICIES}")
+        self.manager = manager
+        self.merge_policy = merge_policy
+        self.max_queue = max_queue  # per NFT; the oldest message is dropped beyond it
+        self.max_pending = max_pending  # across all NFTs; new messages are dropped beyond it
+        self.max_batch = max_batch  # NFTs trained per train_batch call
+
+        self.queues: Dict[str, deque] = {}
+        self.pending = 0
+        self._heap = []  # (ready_at, seq, nft_id), one entry per NFT with queued messages
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._train_lock = threading.Lock()  # one training pass at a time
+        self._thread = None
+        self._stopping = False
+
+        self.started_at = time.time()
+        self.submitted = 0
+        self.steps = 0  # training steps taken
+        self.trained = 0  # messages consumed by those steps
+        self.batches = 0
+        self.dropped = Counter()
+
+    def _schedule(self, nft_id: str, ready_at: float) -> None:
+        heapq.heappush(self._heap, (ready_at, next(self._seq), nft_id))
+        self._cond.notify()
+
+    def submit(self, nft_id: str, message: str) -> bool:
+        """Queue a message for training; False if it was dropped"""
+        nft = self.manager.get_nft(nft_id)
+        with self._cond:
+            self.submitted += 1
+            if nft is None:
+                self.dropped["unknown_nft"] += 1
+                return False
+            if self.pending >= self.max_pending:
+                self.dropped["overflow"] += 1
+                return False
+            queue = self.queues.get(nft_id)
+            if queue is None:
+                queue = self.queues[nft_id] = deque()
+                self._schedule(nft_id, nft.last_train + TRAIN_COOLDOWN)
+            if len(queue) >= self.max_queue:
+                queue.popleft()
+                self.pending -= 1
+                self.dropped["queue_full"] += 1
+            queue.append(message)
+            self.pending += 1
+            return True
+
+    def _take_due(self, now: float) -> List[tuple]:
+        """Pop up to max_batch due NFTs with their queued messages"""
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now and len(due) < self.max_batch:
+                _, _, nft_id = heapq.heappop(self._heap)
+                queue = self.queues.pop(nft_id)
+                self.pending -= len(queue)
+                due.append((nft_id, list(queue)))
+        return due
+
+    def _requeue(self, nft_id: str, messages: List[str], ready_at: float) -> None:
+        with self._cond:
+            queue = self.queues.get(nft_id)
+            if queue is None:
+                queue = self.queues[nft_id] = deque()
+                self._schedule(nft_id, ready_at)
+            # Older messages go back in front of anything submitted meanwhile
+            queue.extendleft(reversed(messages))
+            self.pending += len(messages)
+            while len(queue) > self.max_queue:
+                queue.popleft()
+                self.pending -= 1
+                self.dropped["queue_full"] += 1
+
+    def _merge(self, due: List[tuple]):
+        """(nft_id, message) pairs plus their inputs and targets under the merge policy"""
+        if self.merge_policy == "concat":
+            pairs = [(nft_id, " ".join(messages)) for nft_id, messages in due]
+            return pairs, None, None
+
+        pairs = [(nft_id, messages[-1]) for nft_id, messages in due]
+        if self.merge_policy == "latest":
+            return pairs, None, None
+
+        # "mean": one vectorized pass over every queued message, averaged per NFT
+        flat = [m for _, messages in due for m in messages]
+        counts = np.array([len(messages) for _, messages in due])
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        lengths = np.fromiter(map(len, flat), dtype=float, count=len(flat))
+        inputs = np.add.reduceat(batch_features(flat), starts) / counts[:, None]
+        targets = np.add.reduceat(np.minimum(1.0, lengths / 50), starts) / counts
+        return pairs, inputs, targets
+
+    def run_due(self, now: float = None) -> List[Dict]:
+        """Train every NFT whose cooldown has ended; one result per training step"""
+        with self._train_lock:
+            due = self._take_due(time.time() if now is None else now)
+            if not due:
+                return []
+            pairs, inputs, targets = self._merge(due)
+            results = self.manager.train_batch(pairs, inputs, targets)
+
+            for (nft_id, messages), result in zip(due, results):
+                if result.get("success"):
+                    self.steps += 1
+                    self.trained += len(messages)
+                elif "wait" in result:
+                    # Trained elsewhere since it was scheduled: try again when it is ready
+                    self._requeue(nft_id, messages, time.time() + result["wait"])
+                else:
+                    self.dropped["unknown_nft"] += len(messages)
+            self.batches += 1
+            return results
+
+    def start(self) -> None:
+        """Run the scheduler on a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if self._stopping:
+                    return
+                delay = self._heap[0][0] - time.time() if self._heap else None
+                if delay is None or delay > 0:
+                    self._cond.wait(delay)
+                    continue
+            self.run_due()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict:
+        with self._cond:
+            elapsed = max(time.time() - self.started_at, 1e-9)
+            return {
+                "submitted": self.submitted,
+                "steps": self.steps,
+                "trained": self.trained,
+                "merged": self.trained - self.steps,
+                "batches": self.batches,
+                "queue_depth": self.pending,
+                "queued_nfts": len(self.queues),
+                "dropped": dict(self.dropped),
+                "messages_per_second": self.trained / elapsed,
+                "steps_per_second": self.steps / elapsed,
+            }
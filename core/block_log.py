@@ -0,0 +1,392 @@
+"""
+Append-only, segmented block log.
+- One record per block: 4-byte length, 4-byte crc32, payload.
+- Records go to numbered segment files that roll over at `segment_size` bytes.
+- `index` starts with a magic and format version, then holds one fixed 44-byte entry
+  per height: (segment number, offset, 32-byte key), the key being a digest of the
+  block hash.
+- `keys` holds (key, height) pairs sorted by key for the first heights, and is
+  binary-searched through an mmap. Keys appended since it was written stay in a
+  dict, which is merged into a new `keys` file every `merge_keys` appends, so blocks
+  are found by hash without a scan and opening reads at most that many entries.
+- An index that is missing or in an older format is rebuilt from the segments, which
+  are the source of truth; `key_of(payload)` supplies keys for records found that way.
+- fsync modes: "block" syncs every append, "batch" every `batch_size` appends,
+  "interval" from a background thread every `interval` seconds.
+- On open, the last segment is re-scanned from its last indexed record and a torn or
+  corrupt tail record is truncated away, as is a partial trailing index entry, so a
+  crash loses at most the unsynced tail instead of the chain.
+- The index, key file and segments are memory-mapped; opening reads neither every
+  index entry nor any block.
+"""
+import hashlib
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+RECORD_HEADER = struct.Struct(">II")  # payload length, crc32
+INDEX_HEADER = struct.Struct(">8sI4x")  # magic, format version
+INDEX_MAGIC = b"NNBLKIDX"
+INDEX_VERSION = 2
+INDEX_ENTRY = struct.Struct(">IQ32s")  # segment number, offset, key
+EMPTY_KEY = b"\0" * 32
+KEYS_HEADER = struct.Struct(">8sQ")  # magic, heights covered
+KEYS_MAGIC = b"NNBLKKEY"
+KEY_ENTRY = struct.Struct(">32sQ")  # key, height; sorted
+MERGE_KEYS = 16384  # recent keys kept in memory before they are merged into the key file
+INDEX_FILE = "index"
+KEYS_FILE = "keys"
+SEGMENT_SUFFIX = ".seg"
+FSYNC_MODES = ("block", "batch", "interval")
+
+
+class CorruptLogError(Exception):
+    pass
+
+
+def segment_name(number):
+    return f"{number:08d}{SEGMENT_SUFFIX}"
+
+
+def hash_key(block_hash):
+    return hashlib.sha256(block_hash.encode()).digest()
+
+
+def _scan(data, pos=0):
+    """(offset, payload) of the intact records in `data` from `pos`; stops at the first bad one"""
+    while pos + RECORD_HEADER.size <= len(data):
+        length, crc = RECORD_HEADER.unpack_from(data, pos)
+        end = pos + RECORD_HEADER.size + length
+        if end > len(data) or zlib.crc32(data[pos + RECORD_HEADER.size:end]) != crc:
+            return
+        yield pos, data[pos + RECORD_HEADER.size:end]
+        pos = end
+
+
+class BlockLog:
+    def __init__(self, directory, segment_size=64 * 1024 * 1024, fsync="batch", batch_size=100, interval=1.0,
+                 key_of=None, merge_keys=MERGE_KEYS):
+        if fsync not in FSYNC_MODES:
+            raise ValueError(f"fsync must be one of {FSYNC_MODES}")
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.interval = interval
+        self.key_of = key_of  # payload -> key, for records that have no index entry
+        self.merge_keys = merge_keys
+        self.unsynced = 0
+        self.last_sync = time.time()
+        self.lock = threading.RLock()
+        self.truncated_bytes = 0  # torn tail dropped during recovery
+        self.rebuilt_index = False
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        self._keys_path = os.path.join(directory, KEYS_FILE)
+        self._maps = {}  # segment -> mmap
+        self._keys_map = None
+        self._keys_count = 0  # entries in the key file
+        self._keys_covered = 0  # heights whose keys are in the key file
+        self._recent = {}  # key -> newest height, for heights not in the key file
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._segment_file = open(self._segment_path(self.segment), "ab")
+        self._index_file = open(self._index_path, "ab")
+        self._open_keys()
+
+        self._stop = threading.Event()
+        self._syncer = None
+        if fsync == "interval":
+            self._syncer = threading.Thread(target=self._sync_loop, daemon=True)
+            self._syncer.start()
+
+    def _segment_path(self, number):
+        return os.path.join(self.directory, segment_name(number))
+
+    def _segments(self):
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX))
+
+    def _key(self, payload):
+        return self.key_of(bytes(payload)) if self.key_of is not None else EMPTY_KEY
+
+    def _index_is_current(self):
+        try:
+            with open(self._index_path, "rb") as f:
+                header = f.read(INDEX_HEADER.size)
+        except FileNotFoundError:
+            return False
+        return len(header) == INDEX_HEADER.size and INDEX_HEADER.unpack(header) == (INDEX_MAGIC, INDEX_VERSION)
+
+    def _rebuild_index(self):
+        """Write a current-format index from the records of every segment"""
+        entries = []
+        for number in self._segments():
+            with open(self._segment_path(number), "rb") as f:
+                if not os.fstat(f.fileno()).st_size:
+                    continue
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    entries.extend((number, offset, self._key(payload)) for offset, payload in _scan(data))
+        tmp = self._index_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION))
+            f.write(b"".join(INDEX_ENTRY.pack(*e) for e in entries))
+            os.fsync(f.fileno())
+        os.replace(tmp, self._index_path)
+        self.rebuilt_index = bool(entries)
+        if os.path.exists(self._keys_path):
+            os.remove(self._keys_path)
+
+    def _map_index(self):
+        """Map the index file; entries appended after this live in self._tail"""
+        self._index_map = None
+        self._mapped = 0
+        size = os.path.getsize(self._index_path) - INDEX_HEADER.size
+        self._index_torn = size % INDEX_ENTRY.size != 0  # a partial entry from an interrupted append
+        if size:
+            with open(self._index_path, "rb") as f:
+                self._index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = size // INDEX_ENTRY.size
+        self._tail = []
+
+    def _recover(self):
+        if not self._index_is_current():
+            self._rebuild_index()
+        self._map_index()
+        count = self._mapped
+        self._trusted = count  # entries the key file may cover
+        segments = self._segments()
+        self.segment = segments[-1] if segments else 0
+
+        # Earlier segments were synced before rollover; only the active one can be torn.
+        # Its indexed records are trusted except the last, which is re-checked along
+        # with anything written after it. Heights are found by bisection on the
+        # segment number, so this reads a handful of entries however long the log is.
+        end = self._first_height(self.segment + 1, count)
+        if end > self._first_height(self.segment, count):
+            last = self._entry(end - 1)
+            base, pos = end - 1, last[1]
+        else:
+            last = None
+            base, pos = end, 0
+
+        path = self._segment_path(self.segment)
+        found = []
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                f.seek(pos)
+                data = f.read()
+            scan = 0
+            for offset, payload in _scan(data):
+                found.append((pos + offset, payload))
+                scan = offset + RECORD_HEADER.size + len(payload)
+            if scan < len(data):
+                self.truncated_bytes = len(data) - scan
+                with open(path, "r+b") as f:
+                    f.truncate(pos + scan)
+                    os.fsync(f.fileno())
+
+        entries = [(self.segment, offset, last[2] if last and offset == last[1] else self._key(payload))
+                   for offset, payload in found]
+        if self._index_torn or entries != [self._entry(h) for h in range(base, count)]:
+            if self._index_map is not None:
+                self._index_map.close()
+            self._trusted = base
+            with open(self._index_path, "ab") as f:
+                f.truncate(INDEX_HEADER.size + base * INDEX_ENTRY.size)
+                f.write(b"".join(INDEX_ENTRY.pack(*e) for e in entries))
+                os.fsync(f.fileno())
+            self._map_index()
+
+    def _first_height(self, segment, count):
+        """First height whose record is in `segment` or a later one"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < segment:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _open_keys(self):
+        """Map the key file, or rebuild it if it does not match the index"""
+        covered = None
+        try:
+            with open(self._keys_path, "rb") as f:
+                header = f.read(KEYS_HEADER.size)
+                size = os.fstat(f.fileno()).st_size
+            if len(header) == KEYS_HEADER.size:
+                magic, covered = KEYS_HEADER.unpack(header)
+                if (magic != KEYS_MAGIC or covered > self._trusted
+                        or (size - KEYS_HEADER.size) % KEY_ENTRY.size):
+                    covered = None
+        except FileNotFoundError:
+            pass
+        if covered is None:
+            self._write_keys([], 0)  # filled from the index below
+        self._map_keys()
+        self._recent = {}
+        for height in range(self._keys_covered, len(self)):
+            self._remember(self._entry(height)[2], height)
+        if len(self._recent) >= self.merge_keys:
+            self._merge_keys()
+
+    def _map_keys(self):
+        if self._keys_map is not None:
+            self._keys_map.close()
+            self._keys_map = None
+        with open(self._keys_path, "rb") as f:
+            self._keys_covered = KEYS_HEADER.unpack(f.read(KEYS_HEADER.size))[1]
+            self._keys_count = (os.fstat(f.fileno()).st_size - KEYS_HEADER.size) // KEY_ENTRY.size
+            if self._keys_count:
+                self._keys_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _write_keys(self, entries, covered):
+        tmp = self._keys_path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(KEYS_HEADER.pack(KEYS_MAGIC, covered))
+            entries = iter(entries)
+            while True:
+                chunk = b"".join(KEY_ENTRY.pack(*entry) for entry in itertools.islice(entries, 4096))
+                if not chunk:
+                    break
+                f.write(chunk)
+            os.fsync(f.fileno())
+        os.replace(tmp, self._keys_path)
+
+    def _merge_keys(self):
+        """Fold the recent keys into a new key file; one sequential pass over the old one"""
+        self.sync()  # never cover heights the index could still lose in a crash
+        recent = sorted(self._recent.items())
+        if self._keys_map is None:
+            self._write_keys(recent, len(self))
+        else:
+            end = KEYS_HEADER.size + self._keys_count * KEY_ENTRY.size
+            view = memoryview(self._keys_map)[KEYS_HEADER.size:end]
+            try:
+                self._write_keys(heapq.merge(KEY_ENTRY.iter_unpack(view), recent), len(self))
+            finally:
+                view.release()  # the old map can only be closed once nothing views it
+        self._map_keys()
+        self._recent = {}
+
+    def _remember(self, key, height):
+        if key != EMPTY_KEY:
+            self._recent[key] = height
+
+    def _find_key(self, key):
+        """Newest height with `key` in the key file, or None"""
+        lo, hi = 0, self._keys_count
+        while lo < hi:  # first entry with a larger key
+            mid = (lo + hi) // 2
+            offset = KEYS_HEADER.size + mid * KEY_ENTRY.size
+            if self._keys_map[offset:offset + 32] <= key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if not lo:
+            return None
+        found, height = KEY_ENTRY.unpack_from(self._keys_map, KEYS_HEADER.size + (lo - 1) * KEY_ENTRY.size)
+        return height if found == key else None
+
+    def _entry(self, height):
+        if height < self._mapped:
+            return INDEX_ENTRY.unpack_from(self._index_map, INDEX_HEADER.size + height * INDEX_ENTRY.size)
+        return self._tail[height - self._mapped]
+
+    def __len__(self):
+        return self._mapped + len(self._tail)
+
+    def append(self, payload, key=b""):
+        """Write one record and return its height"""
+        with self.lock:
+            if self._segment_file.tell() >= self.segment_size:
+                self._roll_segment()
+            offset = self._segment_file.tell()
+            self._segment_file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._segment_file.flush()
+            entry = (self.segment, offset, key.ljust(32, b"\0"))
+            self._index_file.write(INDEX_ENTRY.pack(*entry))
+            self._index_file.flush()
+            self._tail.append(entry)
+            self._remember(entry[2], len(self) - 1)
+            if len(self._recent) >= self.merge_keys:
+                self._merge_keys()
+            self.unsynced += 1
+
+            if self.fsync == "block" or (self.fsync == "batch" and self.unsynced >= self.batch_size):
+                self.sync()
+            return len(self) - 1
+
+    def _roll_segment(self):
+        self.sync()
+        self._segment_file.close()
+        self.segment += 1
+        self._segment_file = open(self._segment_path(self.segment), "ab")
+
+    def _segment_map(self, segment, end):
+        m = self._maps.get(segment)
+        if m is None or len(m) < end:
+            # The active segment grows; remap it once reads go past the mapped size
+            with open(self._segment_path(segment), "rb") as f:
+                m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = m
+        return m
+
+    def read(self, height):
+        segment, offset, _ = self._entry(height)
+        with self.lock:
+            m = self._segment_map(segment, offset + RECORD_HEADER.size)
+            length, crc = RECORD_HEADER.unpack_from(m, offset)
+            start = offset + RECORD_HEADER.size
+            m = self._segment_map(segment, start + length)
+            payload = m[start:start + length]
+        if zlib.crc32(payload) != crc:
+            raise CorruptLogError(f"checksum mismatch at height {height}")
+        return payload
+
+    def find(self, key):
+        """Height of the newest record appended with `key`, or None"""
+        key = key.ljust(32, b"\0")
+        with self.lock:
+            height = self._recent.get(key)
+            return height if height is not None else self._find_key(key)
+
+    def __iter__(self):
+        for height in range(len(self)):
+            yield self.read(height)
+
+    def sync(self):
+        with self.lock:
+            if not self.unsynced:
+                return
+            os.fsync(self._segment_file.fileno())
+            os.fsync(self._index_file.fileno())
+            self.unsynced = 0
+            self.last_sync = time.time()
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.interval):
+            self.sync()
+
+    def close(self):
+        self._stop.set()
+        if self._syncer:
+            self._syncer.join()
+        with self.lock:
+            self.sync()
+            self._segment_file.close()
+            self._index_file.close()
+            for m in self._maps.values():
+                m.close()
+            self._maps = {}
+            if self._index_map is not None:
+                self._index_map.close()
+            if self._keys_map is not None:
+                self._keys_map.close()
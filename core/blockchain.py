@@ -4,17 +4,27 @@ import os
 import hashlib
 import random
 import threading
+from collections import OrderedDict
 
-CHAIN_FILE = os.path.join(os.path.dirname(file), "..", "data", "chain.json")
-LOCK = threading.Lock()
+from core.block_log import BlockLog, hash_key
+from core.encoding import ENCODING_VERSION, F64, U8, U64, Reader, encode_value, pack_hash, pack_str
+from mining import ParallelMiner, encode_nonce, mine_sequential
+
+CHAIN_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "chain.json")  # legacy, migrated on load
+CHAIN_LOG_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "chain")
+LOCK = threading.RLock()  # save_chain is called while already holding it
 
 class Block:
-    def init(self, index, previous_hash, transactions, nonce=0, hash_val=None, timestamp=None):
+    __slots__ = ("index", "previous_hash", "transactions", "nonce", "timestamp", "hash", "_tx_digest", "mining_stats")
+
+    def __init__(self, index, previous_hash, transactions, nonce=0, hash_val=None, timestamp=None):
         self.index = index
         self.previous_hash = previous_hash
         self.transactions = transactions
         self.nonce = nonce
         self.timestamp = timestamp or time.time()
+        self._tx_digest = None
+        self.mining_stats = None
         self.hash = hash_val or self.calculate_hash()
 
     def to_dict(self):
@@ -27,14 +37,138 @@ class Block:
             "hash": self.hash
         }
 
+    @classmethod
+    def from_dict(cls, b):
+        return cls(b["index"], b["previous_hash"], b["transactions"], b["nonce"], b["hash"], b["timestamp"])
+
+    def to_bytes(self):
+        # version | index u64 | previous_hash | timestamp f64 | nonce u64 | hash | transactions
+        return b"".join((
+            U8.pack(ENCODING_VERSION),
+            U64.pack(self.index),
+            pack_hash(self.previous_hash),
+            F64.pack(self.timestamp),
+            U64.pack(self.nonce),
+            pack_hash(self.hash),
+            encode_value(self.transactions),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        r = Reader(data)
+        r.version()
+        index, previous_hash = r.unpack(U64), r.hash()
+        timestamp, nonce = r.unpack(F64), r.unpack(U64)
+        hash_val = r.hash()
+        return cls(index, previous_hash, r.value(), nonce, hash_val, timestamp)
+
+    def hash_template(self):
+        # version | index | previous_hash | timestamp | sha256 of the encoded transactions;
+        # the nonce is appended, so only these bytes are hashed per attempt
+        if self._tx_digest is None:
+            self._tx_digest = hashlib.sha256(encode_value(self.transactions)).digest()
+        return b"".join((
+            U8.pack(ENCODING_VERSION),
+            U64.pack(self.index),
+            pack_str(self.previous_hash),
+            F64.pack(self.timestamp),
+            self._tx_digest,
+        )), b""
+
     def calculate_hash(self):
-        content = f"{self.index}{self.previous_hash}{self.timestamp}{self.transactions}{self.nonce}"
-        return hashlib.sha256(str(content).encode()).hexdigest()
+        prefix, suffix = self.hash_template()
+        return hashlib.sha256(prefix + encode_nonce(self.nonce) + suffix).hexdigest()
+
+
+def decode_block(payload):
+    # blocks logged before the binary encoding are JSON objects
+    if payload[:1] == b"{":
+        return Block.from_dict(json.loads(payload))
+    return Block.from_bytes(payload)
+
+
+class LazyChain:
+    """List-like chain backed by the block log.
+
+    The newest `recent` blocks are kept as objects; older ones are decoded from the
+    memory-mapped log on demand and kept in a bounded LRU of `cache_size` blocks.
+    Safe to read from several request threads.
+    """
+    def __init__(self, log, recent=256, cache_size=1024):
+        self.log = log
+        self.recent_size = recent
+        self.cache_size = cache_size
+        self.recent = {}  # height -> Block
+        self.cache = OrderedDict()  # height -> Block, least recently used first
+        self.length = len(log)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return self.length
+
+    def _block(self, height):
+        with self.lock:
+            block = self.recent.get(height)
+            if block is None:
+                block = self.cache.get(height)
+                if block is not None:
+                    self.cache.move_to_end(height)
+            if block is not None:
+                return block
+        # decoded outside the lock; two threads may both decode a block, the last one is kept
+        block = decode_block(self.log.read(height))
+        with self.lock:
+            if height >= self.length - self.recent_size:
+                self.recent[height] = block
+                self._trim()
+            else:
+                self.cache[height] = block
+                self._evict()
+        return block
+
+    def _evict(self):
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _trim(self):
+        while len(self.recent) > self.recent_size:
+            oldest = min(self.recent)
+            if oldest >= len(self.log):
+                break  # not written yet, must stay in memory
+            self.cache[oldest] = self.recent.pop(oldest)
+            self._evict()
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._block(h) for h in range(*i.indices(self.length))]
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("block height out of range")
+        return self._block(i)
+
+    def __iter__(self):
+        for height in range(self.length):
+            yield self._block(height)
+
+    def append(self, block):
+        with self.lock:
+            self.recent[self.length] = block
+            self.length += 1
+            self._trim()
+
 
 class Blockchain:
-    def init(self, difficulty=3):
+    def __init__(self, difficulty=3, mining_workers=1, fsync="batch", lazy=False, recent_blocks=256, cache_blocks=1024):
         self.chain = []
         self.difficulty = int(difficulty)
+        self.mining_workers = mining_workers  # >1 grinds nonces on a process pool
+        # fsync: "block", "batch" or "interval"
+        self.log = BlockLog(CHAIN_LOG_DIR, fsync=fsync, key_of=lambda payload: hash_key(decode_block(payload).hash))
+        # lazy: serve blocks from the memory-mapped log instead of loading them all
+        self.lazy = lazy
+        self.recent_blocks = recent_blocks
+        self.cache_blocks = cache_blocks
         self.load_chain()
 
     def create_genesis_block(self):
@@ -45,22 +179,40 @@ class Blockchain:
 
     def load_chain(self):
         with LOCK:
-            if os.path.exists(CHAIN_FILE):
+            if self.lazy and len(self.log):
+                self.chain = LazyChain(self.log, self.recent_blocks, self.cache_blocks)
+            elif len(self.log):
+                # torn tail records were already truncated when the log was opened
+                self.chain = [decode_block(p) for p in self.log]
+            elif os.path.exists(CHAIN_FILE):
                 try:
                     with open(CHAIN_FILE, "r") as f:
                         raw = json.load(f)
-                    self.chain = [Block(b["index"], b["previous_hash"], b["transactions"], b["nonce"], b["hash"], b["timestamp"]) for b in raw]
+                    self.chain = [Block.from_dict(b) for b in raw]
+                    self.save_chain()
                 except Exception:
                     self.create_genesis_block()
             else:
                 self.create_genesis_block()
+            if self.lazy and not isinstance(self.chain, LazyChain):
+                self.chain = LazyChain(self.log, self.recent_blocks, self.cache_blocks)
 
     def save_chain(self):
+        """Append blocks not yet in the log; earlier blocks are never rewritten"""
+        with LOCK:
+            for block in self.chain[len(self.log):]:
+                self.log.append(block.to_bytes(), hash_key(block.hash))
+
+    def get_block_by_hash(self, block_hash):
         with LOCK:
-            tmp = CHAIN_FILE + ".tmp"
-            with open(tmp, "w") as f:
-                json.dump([b.to_dict() for b in self.chain], f, indent=2)
-            os.replace(tmp, CHAIN_FILE)
+            height = self.log.find(hash_key(block_hash))
+            if height is not None:
+                return self.chain[height]
+            # mined but not yet written
+            return next((b for b in self.chain[len(self.log):] if b.hash == block_hash), None)
+
+    def close(self):
+        self.log.close()
 
     def last_block(self):
         return self.chain[-1]
@@ -68,25 +220,24 @@ class Blockchain:
     def mine_block(self, transactions, miner_addr=None, max_nonce_rand=1024):
         last = self.last_block()
         index = len(self.chain)
-        nonce = 0
-        target = "0" * self.difficulty
+        difficulty = int(self.difficulty)
         # classic PoW: sha256 of content must start with target
-        while True:
-            # random step for faster exploration
-            step = random.randint(1, max(1, max_nonce_rand))
-            nonce += step
-            ts = time.time()
-            content = f"{index}{last.hash}{transactions}{nonce}{ts}"
-            h = hashlib.sha256(str(content).encode()).hexdigest()
-            if h.startswith(target):
-                new_block = Block(index, last.hash, transactions, nonce, h, ts)
-                with LOCK:
-                    self.chain.append(new_block)
-                    self.save_chain()
-                # slight difficulty adaptation safe-guard (caps)
-                if self.difficulty < 10:
-                    self.difficulty = min(10, self.difficulty + 0.001)
-                return new_block
+        # random starting nonce so concurrent miners explore different ranges
+        block = Block(index, last.hash, transactions, random.randint(0, max(1, max_nonce_rand)), "0", time.time())
+        prefix, suffix = block.hash_template()
+        if self.mining_workers > 1:
+            result = ParallelMiner(self.mining_workers).mine(prefix, suffix, difficulty, block.nonce)
+        else:
+            result = mine_sequential(prefix, suffix, difficulty, block.nonce)
+        block.nonce, block.hash = result.nonce, result.hash
+        block.mining_stats = result
+        with LOCK:
+            self.chain.append(block)
+            self.save_chain()
+        # slight difficulty adaptation safe-guard (caps)
+        if self.difficulty < 10:
+            self.difficulty = min(10, self.difficulty + 0.001)
+        return block
 
     def to_dict(self):
         return [b.to_dict() for b in self.chain]
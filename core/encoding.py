@@ -0,0 +1,147 @@
+"""
+Compact, canonical binary encoding used for hashing, persistence and wire transfer.
+- Numbers are fixed width big-endian, strings are u32 length-prefixed UTF-8.
+- Free-form values (meta, block transactions) use a tagged encoding; dict keys are
+  sorted, so equal values always encode to the same bytes.
+- Every top-level record starts with ENCODING_VERSION.
+"""
+import struct
+
+ENCODING_VERSION = 1
+
+U8 = struct.Struct(">B")
+U32 = struct.Struct(">I")
+U64 = struct.Struct(">Q")
+I64 = struct.Struct(">q")
+F64 = struct.Struct(">d")
+
+TAG_NONE, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_FLOAT, TAG_STR, TAG_LIST, TAG_DICT, TAG_BYTES = range(9)
+
+
+class EncodingError(ValueError):
+    pass
+
+
+def pack_str(value):
+    data = value.encode()
+    return U32.pack(len(data)) + data
+
+
+def pack_hash(value):
+    """64-char hex digests as 32 raw bytes, anything else (e.g. genesis "0") as a string"""
+    if len(value) == 64 and value == value.lower():
+        try:
+            return U8.pack(0) + bytes.fromhex(value)
+        except ValueError:
+            pass
+    return U8.pack(1) + pack_str(value)
+
+
+def _encode(value, out):
+    if value is None:
+        out.append(U8.pack(TAG_NONE))
+    elif value is True:
+        out.append(U8.pack(TAG_TRUE))
+    elif value is False:
+        out.append(U8.pack(TAG_FALSE))
+    elif isinstance(value, int):
+        try:
+            out.append(U8.pack(TAG_INT) + I64.pack(value))
+        except struct.error:
+            raise EncodingError(f"integer out of 64-bit range: {value}")
+    elif isinstance(value, float):
+        out.append(U8.pack(TAG_FLOAT) + F64.pack(value))
+    elif isinstance(value, str):
+        out.append(U8.pack(TAG_STR) + pack_str(value))
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(U8.pack(TAG_BYTES) + U32.pack(len(value)) + bytes(value))
+    elif isinstance(value, (list, tuple)):
+        out.append(U8.pack(TAG_LIST) + U32.pack(len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(U8.pack(TAG_DICT) + U32.pack(len(value)))
+        for key in sorted(value):
+            if not isinstance(key, str):
+                raise EncodingError(f"dict keys must be strings, got {type(key).__name__}")
+            out.append(pack_str(key))
+            _encode(value[key], out)
+    elif hasattr(value, "to_dict"):
+        _encode(value.to_dict(), out)
+    else:
+        raise EncodingError(f"cannot encode {type(value).__name__}")
+
+
+def encode_value(value):
+    out = []
+    _encode(value, out)
+    return b"".join(out)
+
+
+class Reader:
+    """Sequential decoder over a bytes-like object"""
+    __slots__ = ("data", "pos")
+
+    def __init__(self, data, pos=0):
+        self.data = memoryview(data)
+        self.pos = pos
+
+    def unpack(self, fmt):
+        try:
+            value = fmt.unpack_from(self.data, self.pos)[0]
+        except struct.error:
+            raise EncodingError("truncated record")
+        self.pos += fmt.size
+        return value
+
+    def raw(self, size):
+        if self.pos + size > len(self.data):
+            raise EncodingError("truncated record")
+        value = bytes(self.data[self.pos:self.pos + size])
+        self.pos += size
+        return value
+
+    def str(self):
+        return self.raw(self.unpack(U32)).decode()
+
+    def hash(self):
+        if self.unpack(U8) == 0:
+            return self.raw(32).hex()
+        return self.str()
+
+    def value(self):
+        tag = self.unpack(U8)
+        if tag == TAG_NONE:
+            return None
+        if tag == TAG_TRUE:
+            return True
+        if tag == TAG_FALSE:
+            return False
+        if tag == TAG_INT:
+            return self.unpack(I64)
+        if tag == TAG_FLOAT:
+            return self.unpack(F64)
+        if tag == TAG_STR:
+            return self.str()
+        if tag == TAG_BYTES:
+            return self.raw(self.unpack(U32))
+        if tag == TAG_LIST:
+            return [self.value() for _ in range(self.unpack(U32))]
+        if tag == TAG_DICT:
+            count = self.unpack(U32)
+            result = {}
+            for _ in range(count):
+                key = self.str()
+                result[key] = self.value()
+            return result
+        raise EncodingError(f"unknown tag {tag}")
+
+    def version(self):
+        version = self.unpack(U8)
+        if version != ENCODING_VERSION:
+            raise EncodingError(f"unsupported encoding version {version}")
+        return version
+
+
+def decode_value(data):
+    return Reader(data).value()
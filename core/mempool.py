@@ -1,12 +1,129 @@
+import hashlib
+import heapq
+import itertools
+import json
+import threading
+
+
+def tx_id_of(tx):
+    """Transaction objects carry tx_id; plain dicts are keyed by their canonical JSON"""
+    if hasattr(tx, "tx_id"):
+        return tx.tx_id
+    if "tx_id" in tx:
+        return tx["tx_id"]
+    return hashlib.sha256(json.dumps(tx, sort_keys=True).encode()).hexdigest()
+
+
+def fee_of(tx):
+    if hasattr(tx, "meta"):
+        return float(tx.meta.get("fee", 0))
+    return float(tx.get("fee", 0))
+
+
+def size_of(tx):
+    data = tx.to_dict() if hasattr(tx, "to_dict") else tx
+    return len(json.dumps(data, sort_keys=True, default=str))
+
+
 class Mempool:
-    def init(self):
-        self.transactions = []
+    """Deduplicating, fee-ordered pool of pending transactions.
+
+    Two heaps share the entries: a max-heap on priority for block templates and a
+    min-heap for evicting the cheapest entries once `max_count` or `max_bytes` is hit.
+    Removed entries are dropped lazily from the heaps, so removal is O(log n) amortized.
+    """
+    def __init__(self, max_count=50000, max_bytes=64 * 1024 * 1024, priority=fee_of, on_evict=None):
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.priority = priority
+        self.on_evict = on_evict
+        self.transactions = {}  # tx_id -> tx, in arrival order
+        self._sizes = {}
+        self._seqs = {}  # tx_id -> seq of its live heap entries
+        self._best = []  # (-priority, seq, tx_id)
+        self._worst = []  # (priority, -seq, tx_id)
+        self._seq = itertools.count()
+        self.bytes = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __contains__(self, tx_id):
+        return tx_id in self.transactions
+
+    def __iter__(self):
+        return iter(list(self.transactions.values()))
 
     def add_transaction(self, tx):
-        self.transactions.append(tx)
+        """Add tx; False if it is a duplicate or too cheap to fit in a full pool"""
+        tx_id = tx_id_of(tx)
+        with self.lock:
+            if tx_id in self.transactions:
+                return False
+            priority = self.priority(tx)
+            seq = next(self._seq)
+            size = size_of(tx)
+            self.transactions[tx_id] = tx
+            self._sizes[tx_id] = size
+            self._seqs[tx_id] = seq
+            self.bytes += size
+            heapq.heappush(self._best, (-priority, seq, tx_id))
+            heapq.heappush(self._worst, (priority, -seq, tx_id))
+            evicted = self._evict()
+        accepted = True
+        for e in evicted:
+            if tx_id_of(e) == tx_id:
+                accepted = False
+            elif self.on_evict:
+                self.on_evict(e)
+        return accepted
+
+    def _evict(self):
+        evicted = []
+        while len(self.transactions) > self.max_count or self.bytes > self.max_bytes:
+            _, seq, tx_id = heapq.heappop(self._worst)
+            if self._seqs.get(tx_id) == -seq:
+                evicted.append(self._discard(tx_id))
+        return evicted
+
+    def _discard(self, tx_id):
+        tx = self.transactions.pop(tx_id)
+        self.bytes -= self._sizes.pop(tx_id)
+        del self._seqs[tx_id]
+        # Stale heap entries are skipped on pop; rebuild once they dominate
+        if len(self._best) > 2 * len(self.transactions) + 64:
+            self._best = [e for e in self._best if self._seqs.get(e[2]) == e[1]]
+            self._worst = [e for e in self._worst if self._seqs.get(e[2]) == -e[1]]
+            heapq.heapify(self._best)
+            heapq.heapify(self._worst)
+        return tx
+
+    def remove(self, tx_ids):
+        """Drop transactions, e.g. once they are included in a block"""
+        with self.lock:
+            return [self._discard(tx_id) for tx_id in tx_ids if tx_id in self.transactions]
+
+    def top(self, n):
+        """Up to n highest-priority transactions, best first, left in the pool"""
+        with self.lock:
+            taken = []
+            while self._best and len(taken) < n:
+                entry = heapq.heappop(self._best)
+                if self._seqs.get(entry[2]) == entry[1]:
+                    taken.append(entry)
+            for entry in taken:
+                heapq.heappush(self._best, entry)
+            return [self.transactions[e[2]] for e in taken]
 
     def snapshot(self):
-        return list(self.transactions)
+        return list(self.transactions.values())
 
     def clear(self):
-        self.transactions = []
+        with self.lock:
+            self.transactions = {}
+            self._sizes = {}
+            self._seqs = {}
+            self._best = []
+            self._worst = []
+            self.bytes = 0
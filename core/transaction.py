@@ -1,19 +1,40 @@
 import time
 import hashlib
-import json
+
+from core.encoding import ENCODING_VERSION, F64, U8, Reader, encode_value, pack_str
 
 class Transaction:
-    def init(self, sender, receiver, amount, meta=None):
+    __slots__ = ("sender", "receiver", "amount", "meta", "timestamp", "tx_id")
+
+    def __init__(self, sender, receiver, amount, meta=None, timestamp=None):
         self.sender = sender
         self.receiver = receiver
         self.amount = float(amount)
         self.meta = meta or {}
-        self.timestamp = time.time()
+        self.timestamp = time.time() if timestamp is None else timestamp
         self.tx_id = self.calculate_tx_id()
 
+    def to_bytes(self):
+        # version | sender | receiver | amount f64 | timestamp f64 | meta
+        return b"".join((
+            U8.pack(ENCODING_VERSION),
+            pack_str(self.sender),
+            pack_str(self.receiver),
+            F64.pack(self.amount),
+            F64.pack(self.timestamp),
+            encode_value(self.meta),
+        ))
+
+    @classmethod
+    def from_bytes(cls, data):
+        r = Reader(data)
+        r.version()
+        sender, receiver = r.str(), r.str()
+        amount, timestamp = r.unpack(F64), r.unpack(F64)
+        return cls(sender, receiver, amount, r.value(), timestamp)
+
     def calculate_tx_id(self):
-        content = f"{self.sender}{self.receiver}{self.amount}{self.timestamp}{json.dumps(self.meta, sort_keys=True)}"
-        return hashlib.sha256(content.encode()).hexdigest()
+        return hashlib.sha256(self.to_bytes()).hexdigest()
 
     def to_dict(self):
         return {
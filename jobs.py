@@ -0,0 +1,193 @@
+"""
+In-process job queue with a worker pool.
+- `submit` assigns a job id and queues the payload, or raises JobQueueFull when
+  `max_queue` jobs are already waiting (callers turn that into a 503).
+- Worker threads take up to `batch_size` ready jobs at a time and run them through
+  one `handler(payloads) -> results` call, either on the thread itself or in a
+  process pool. A result that is an Exception (or a handler that raises) fails only
+  those jobs, which are retried with exponential backoff up to `max_attempts`.
+- `metrics()` reports queue depth, outcomes and queue-wait / run-time statistics.
+"""
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+from timing import Timing
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    id: str
+    payload: Any
+    status: str = "queued"  # queued, running, retrying, done, failed
+    attempts: int = 0
+    result: Any = None
+    error: str = None
+    submitted_at: float = field(default_factory=time.time)
+    queued_at: float = 0.0  # last time it entered the ready queue
+    started_at: float = None
+    finished_at: float = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "attempts": self.attempts,
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobQueue:
+    def __init__(self, handler: Callable[[List[Any]], List[Any]], workers: int = 4, max_queue: int = 1000,
+                 batch_size: int = 32, max_attempts: int = 3, retry_delay: float = 0.5,
+                 max_retry_delay: float = 30.0, processes: bool = False, keep_finished: int = 10000):
+        self.handler = handler
+        self.workers = workers
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.keep_finished = keep_finished
+        # A picklable, module-level handler can run outside the GIL
+        self._pool = ProcessPoolExecutor(workers) if processes else None
+
+        self._cond = threading.Condition()
+        self._ready = deque()
+        self._delayed = []  # (retry at, seq, job)
+        self._seq = itertools.count()
+        self.jobs: Dict[str, Job] = {}
+        self._finished = OrderedDict()  # finished job ids, oldest first
+        self.running = 0
+        self.counts = Counter()
+        self.queue_wait = Timing()
+        self.run_time = Timing()
+        self.batch_sizes = Timing()
+        self._stopping = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def depth(self) -> int:
+        return len(self._ready) + len(self._delayed)
+
+    def submit(self, payload: Any) -> Job:
+        with self._cond:
+            if self.depth >= self.max_queue:
+                self.counts["rejected"] += 1
+                raise JobQueueFull("job queue is full")
+            job = Job(str(uuid.uuid4()), payload)
+            job.queued_at = job.submitted_at
+            self.jobs[job.id] = job
+            self._ready.append(job)
+            self.counts["submitted"] += 1
+            self._cond.notify()
+            return job
+
+    def get(self, job_id: str) -> Job:
+        return self.jobs.get(job_id)
+
+    def _take(self) -> List[Job]:
+        """Wait for ready jobs and take up to batch_size of them; [] when stopping"""
+        with self._cond:
+            while True:
+                if self._stopping:
+                    return []
+                now = time.time()
+                while self._delayed and self._delayed[0][0] <= now:
+                    job = heapq.heappop(self._delayed)[2]
+                    job.status = "queued"
+                    job.queued_at = now
+                    self._ready.append(job)
+                if self._ready:
+                    break
+                self._cond.wait(self._delayed[0][0] - now if self._delayed else None)
+            batch = [self._ready.popleft() for _ in range(min(self.batch_size, len(self._ready)))]
+            for job in batch:
+                job.status = "running"
+                job.started_at = now
+                job.attempts += 1
+                self.queue_wait.add(now - job.queued_at)
+            self.running += len(batch)
+            self.batch_sizes.add(len(batch))
+            return batch
+
+    def _work(self) -> None:
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            start = time.perf_counter()
+            payloads = [job.payload for job in batch]
+            try:
+                if self._pool is not None:
+                    results = self._pool.submit(self.handler, payloads).result()
+                else:
+                    results = self.handler(payloads)
+                if len(results) != len(batch):
+                    raise RuntimeError(f"handler returned {len(results)} results for {len(batch)} jobs")
+            except Exception as e:
+                results = [e] * len(batch)
+            self._finish(batch, results, time.perf_counter() - start)
+
+    def _finish(self, batch: List[Job], results: List[Any], run_time: float) -> None:
+        now = time.time()
+        with self._cond:
+            self.run_time.add(run_time)
+            self.running -= len(batch)
+            for job, result in zip(batch, results):
+                if not isinstance(result, Exception):
+                    job.status, job.result, job.error, job.finished_at = "done", result, None, now
+                    self.counts["done"] += 1
+                elif job.attempts < self.max_attempts:
+                    job.status = "retrying"
+                    job.error = f"{type(result).__name__}: {result}"
+                    delay = min(self.max_retry_delay, self.retry_delay * 2 ** (job.attempts - 1))
+                    heapq.heappush(self._delayed, (now + delay, next(self._seq), job))
+                    self.counts["retried"] += 1
+                    continue
+                else:
+                    job.status, job.error, job.finished_at = "failed", f"{type(result).__name__}: {result}", now
+                    self.counts["failed"] += 1
+                self._finished[job.id] = None
+            while len(self._finished) > self.keep_finished:
+                job_id, _ = self._finished.popitem(last=False)
+                del self.jobs[job_id]
+            self._cond.notify_all()  # a retry may now be the earliest wake-up
+
+    def metrics(self) -> Dict:
+        with self._cond:
+            return {
+                "queue_depth": self.depth,
+                "running": self.running,
+                "workers": self.workers,
+                **self.counts,
+                "queue_wait_seconds": self.queue_wait.to_dict(),
+                "run_time_seconds": self.run_time.to_dict(),
+                "batch_size": self.batch_sizes.to_dict(),
+            }
+
+    def close(self) -> None:
+        """Stop the workers after their current batch; queued jobs are left as they are"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        if self._pool is not None:
+            self._pool.shutdown()
@@ -0,0 +1,77 @@
+"""
+Merkle tree helpers for committing to a list of items with a single 32-byte root.
+- Leaves are hashed from the canonical binary encoding (core.encoding), so dicts and
+  plain strings both work.
+- Leaf and inner-node hashes use different prefixes to rule out second-preimage tricks.
+- An odd node at any level is promoted to the next level unchanged. Pairing it with
+  itself, as Bitcoin does, would give [a, b, c] and [a, b, c, c] the same root.
+"""
+import hashlib
+from typing import Any, List, Tuple
+
+from core.encoding import encode_value
+
+EMPTY_ROOT = hashlib.sha256(b"").hexdigest()
+
+
+def hash_leaf(item: Any) -> bytes:
+    return hashlib.sha256(b"\x00" + encode_value(item)).digest()
+
+
+def _hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    parents = [_hash_node(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(items: List[Any]) -> str:
+    """Hex root of `items`; EMPTY_ROOT for an empty list"""
+    if not items:
+        return EMPTY_ROOT
+    level = [hash_leaf(item) for item in items]
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0].hex()
+
+
+def merkle_proof(items: List[Any], index: int) -> List[Tuple[str, str]]:
+    """Sibling path for items[index] as (side, hex_hash) pairs, side being "left" or "right" """
+    if not 0 <= index < len(items):
+        raise IndexError("item index out of range")
+    level = [hash_leaf(item) for item in items]
+    proof = []
+    while len(level) > 1:
+        sibling = index ^ 1
+        if sibling < len(level):  # a promoted odd node has no sibling at this level
+            proof.append(("left" if sibling < index else "right", level[sibling].hex()))
+        level = _next_level(level)
+        index //= 2
+    return proof
+
+
+def merkle_proofs(items: List[Any]) -> List[List[Tuple[str, str]]]:
+    """merkle_proof of every item, built in one pass over the tree"""
+    level = [hash_leaf(item) for item in items]
+    proofs = [[] for _ in items]
+    positions = list(range(len(items)))
+    while len(level) > 1:
+        for i, index in enumerate(positions):
+            sibling = index ^ 1
+            if sibling < len(level):
+                proofs[i].append(("left" if sibling < index else "right", level[sibling].hex()))
+            positions[i] = index // 2
+        level = _next_level(level)
+    return proofs
+
+
+def verify_proof(item: Any, proof: List[Tuple[str, str]], root: str) -> bool:
+    node = hash_leaf(item)
+    for side, sibling in proof:
+        sibling = bytes.fromhex(sibling)
+        node = _hash_node(sibling, node) if side == "left" else _hash_node(node, sibling)
+    return node.hex() == root
@@ -0,0 +1,139 @@
+"""
+Proof-of-work mining engine.
+- A block exposes its hash input as a (prefix, suffix) byte template around the nonce,
+  so each attempt only hashes bytes instead of re-serializing the block. The nonce is
+  encoded with `encode_nonce` (8-byte big-endian).
+- `mine_sequential` grinds nonces on the calling thread (default, used by tests).
+- `ParallelMiner` splits the nonce space across worker processes and stops them all
+  as soon as one finds a solution. A worker that dies stops the search with MiningError.
+"""
+import hashlib
+import multiprocessing as mp
+import os
+import queue
+import time
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+NONCE_SIZE = 8
+
+# How many nonces a worker tries between checks of the shared stop flag
+CHECK_INTERVAL = 20000
+
+# Seconds between checks that every unreported worker is still alive
+POLL_INTERVAL = 0.5
+
+
+class MiningError(RuntimeError):
+    pass
+
+
+@dataclass
+class MiningResult:
+    nonce: int
+    hash: str
+    hashes: int
+    elapsed: float
+    workers: int = 1
+
+    @property
+    def hashrate(self) -> float:
+        """Hashes per second over the whole search"""
+        return self.hashes / self.elapsed if self.elapsed > 0 else float(self.hashes)
+
+
+def encode_nonce(nonce: int) -> bytes:
+    return nonce.to_bytes(NONCE_SIZE, "big")
+
+
+def _search(prefix: bytes, suffix: bytes, target: str, start: int, step: int,
+            count: int) -> Tuple[Optional[int], Optional[str], int]:
+    """Try `count` nonces start, start+step, ...; return (nonce, hash, attempts)"""
+    sha256 = hashlib.sha256
+    nonce = start
+    for attempt in range(1, count + 1):
+        h = sha256(prefix + nonce.to_bytes(NONCE_SIZE, "big") + suffix).hexdigest()
+        if h.startswith(target):
+            return nonce, h, attempt
+        nonce += step
+    return None, None, count
+
+
+def mine_sequential(prefix: bytes, suffix: bytes, difficulty: int, start_nonce: int = 0) -> MiningResult:
+    target = "0" * difficulty
+    started = time.perf_counter()
+    nonce = start_nonce
+    hashes = 0
+    while True:
+        found, h, attempts = _search(prefix, suffix, target, nonce, 1, CHECK_INTERVAL)
+        hashes += attempts
+        if found is not None:
+            return MiningResult(found, h, hashes, time.perf_counter() - started)
+        nonce += CHECK_INTERVAL
+
+
+def _worker(index: int, prefix: bytes, suffix: bytes, target: str, start: int, step: int, stop, results) -> None:
+    nonce = start
+    hashes = 0
+    found, h = None, None
+    while not stop.is_set():
+        found, h, attempts = _search(prefix, suffix, target, nonce, step, CHECK_INTERVAL)
+        hashes += attempts
+        if found is not None:
+            stop.set()
+            break
+        nonce += step * CHECK_INTERVAL
+    results.put((index, found, h, hashes))
+
+
+class ParallelMiner:
+    """Multi-process nonce search. Worker i tries start+i, start+i+n, ... for n workers."""
+
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.last_result: Optional[MiningResult] = None
+
+    def mine(self, prefix: bytes, suffix: bytes, difficulty: int, start_nonce: int = 0) -> MiningResult:
+        if self.workers == 1:
+            self.last_result = mine_sequential(prefix, suffix, difficulty, start_nonce)
+            return self.last_result
+
+        target = "0" * difficulty
+        stop = mp.Event()
+        results = mp.Queue()
+        procs = [
+            mp.Process(target=_worker,
+                       args=(i, prefix, suffix, target, start_nonce + i, self.workers, stop, results),
+                       daemon=True)
+            for i in range(self.workers)
+        ]
+        started = time.perf_counter()
+        for p in procs:
+            p.start()
+
+        best = None
+        hashes = 0
+        try:
+            # Every worker reports exactly once, either with a solution or after the stop flag
+            pending = set(range(self.workers))
+            while pending:
+                try:
+                    index, found, h, attempts = results.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    # A worker that exits cleanly has already flushed its report to the queue
+                    dead = [i for i in pending if procs[i].exitcode not in (None, 0)]
+                    if dead:
+                        raise MiningError(f"mining worker {dead[0]} died with exit code {procs[dead[0]].exitcode}")
+                    continue
+                pending.discard(index)
+                hashes += attempts
+                if found is not None and (best is None or found < best[0]):
+                    best = (found, h)
+        finally:
+            stop.set()
+            for p in procs:
+                p.join()
+        elapsed = time.perf_counter() - started
+
+        self.last_result = MiningResult(best[0], best[1], hashes, elapsed, self.workers)
+        return self.last_result
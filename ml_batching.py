@@ -0,0 +1,148 @@
+"""
+Dynamic micro-batching for model inference.
+- Concurrent callers hand their rows to `MicroBatcher.predict` and block.
+- One collector thread waits for up to `max_wait` seconds after the oldest pending
+  request, or until `max_batch_size` rows are pending, stacks the requests into one
+  array, runs a single predict call and gives each caller its slice of the result.
+- Only requests with the same row shape and dtype are stacked; a request larger than
+  `max_batch_size` runs on its own.
+- If a batch fails, its requests are retried one by one so a bad request only fails
+  its own caller.
+"""
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict
+
+import numpy as np
+
+from timing import Timing
+
+
+class _Request:
+    __slots__ = ("rows", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    def __init__(self, predict: Callable[[np.ndarray], np.ndarray], max_batch_size: int = 64,
+                 max_wait: float = 0.005):
+        self.predict_fn = predict
+        self.max_batch_size = max_batch_size  # rows per model call
+        self.max_wait = max_wait  # seconds the oldest request may wait for company
+        self._cond = threading.Condition()
+        self._pending = deque()
+        self._pending_rows = 0
+        self.counts = Counter()
+        self.batch_rows = Timing()  # rows per batch (not seconds)
+        self.batch_requests = Timing()
+        self.queue_wait = Timing()
+        self.predict_time = Timing()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        """Predictions for a 2-D array of rows, computed in a shared batch"""
+        request = _Request(rows)
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("micro-batcher is closed")
+            self._pending.append(request)
+            self._pending_rows += len(rows)
+            self._cond.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def _take(self) -> list:
+        """Wait for a full batch or the oldest request's deadline; [] when stopping"""
+        with self._cond:
+            while not self._pending:
+                if self._stopping:
+                    return []
+                self._cond.wait()
+            deadline = self._pending[0].enqueued_at + self.max_wait
+            while self._pending_rows < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            first = self._pending.popleft()
+            batch, rows = [first], len(first.rows)
+            while self._pending:
+                request = self._pending[0]
+                if (rows + len(request.rows) > self.max_batch_size
+                        or request.rows.shape[1:] != first.rows.shape[1:]
+                        or request.rows.dtype != first.rows.dtype):
+                    break
+                batch.append(self._pending.popleft())
+                rows += len(request.rows)
+            self._pending_rows -= rows
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take()
+            if not batch:
+                return
+            start = time.perf_counter()
+            for request in batch:
+                self.queue_wait.add(start - request.enqueued_at)
+            try:
+                if len(batch) == 1:
+                    outputs = [np.asarray(self.predict_fn(batch[0].rows))]
+                else:
+                    stacked = np.concatenate([request.rows for request in batch])
+                    offsets = np.cumsum([len(request.rows) for request in batch])[:-1]
+                    predictions = np.asarray(self.predict_fn(stacked))
+                    if len(predictions) != len(stacked):
+                        raise ValueError(f"model returned {len(predictions)} predictions for {len(stacked)} rows")
+                    outputs = np.split(predictions, offsets)
+                for request, output in zip(batch, outputs):
+                    request.result = output
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0].error = e
+                else:
+                    self.counts["split_batches"] += 1
+                    for request in batch:
+                        try:
+                            request.result = np.asarray(self.predict_fn(request.rows))
+                        except Exception as request_error:
+                            request.error = request_error
+            self.predict_time.add(time.perf_counter() - start)
+            self.counts["batches"] += 1
+            self.counts["requests"] += len(batch)
+            self.counts["rows"] += sum(len(request.rows) for request in batch)
+            self.batch_requests.add(len(batch))
+            self.batch_rows.add(sum(len(request.rows) for request in batch))
+            for request in batch:
+                request.done.set()
+
+    def metrics(self) -> Dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending_requests": len(self._pending),
+            **self.counts,
+            "rows_per_batch": self.batch_rows.to_dict(),
+            "requests_per_batch": self.batch_requests.to_dict(),
+            "queue_wait_seconds": self.queue_wait.to_dict(),
+            "predict_seconds": self.predict_time.to_dict(),
+        }
+
+    def close(self) -> None:
+        """Finish pending requests and stop the collector"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,75 @@
+"""
+LRU + TTL cache of per-row model predictions.
+- A row's key is a hash of the model version, the row's dtype and shape, and its raw
+  bytes, so a new model can never serve predictions of the old one.
+- `lookup` splits a request into cached rows and misses; only the misses need to go
+  to the model, and `store` caches what it returns.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, List, Tuple
+
+import numpy as np
+
+
+class PredictionCache:
+    def __init__(self, max_entries: int = 100000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()  # key -> (expires at, prediction)
+        self.counts = Counter()
+
+    @staticmethod
+    def keys(rows: np.ndarray, version: str) -> List[bytes]:
+        prefix = f"{version}|{rows.dtype.str}|{rows.shape[1:]}|".encode()
+        rows = np.ascontiguousarray(rows)
+        return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).digest() for row in rows]
+
+    def lookup(self, keys: List[bytes]) -> Tuple[List[Any], List[int]]:
+        """(predictions with None for misses, indices of the misses)"""
+        now = time.monotonic()
+        predictions, misses = [None] * len(keys), []
+        with self.lock:
+            for i, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] <= now:
+                    del self._entries[key]
+                    self.counts["expired"] += 1
+                    entry = None
+                if entry is None:
+                    misses.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    predictions[i] = entry[1]
+            self.counts["hits"] += len(keys) - len(misses)
+            self.counts["misses"] += len(misses)
+        return predictions, misses
+
+    def store(self, keys: List[bytes], predictions: List[Any]) -> None:
+        expires = time.monotonic() + self.ttl
+        with self.lock:
+            for key, prediction in zip(keys, predictions):
+                self._entries[key] = (expires, prediction)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counts["evicted"] += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self._entries.clear()
+            self.counts["invalidations"] += 1
+
+    def metrics(self) -> dict:
+        with self.lock:
+            lookups = self.counts["hits"] + self.counts["misses"]
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                **self.counts,
+                "hit_rate": self.counts["hits"] / lookups if lookups else 0.0,
+            }
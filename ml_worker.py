@@ -1,15 +1,31 @@
 """
 Minimal ML worker prototype.
-- Attempts to load a sklearn/pickle model from model.pkl in the working directory.
-- Exposes a tiny Flask app with a /predict endpoint.
+- Serves a sklearn/pickle model from ML_MODEL_PATH (model.pkl by default), a model
+  directory with memory-mapped weights, or a directory of versions. The path is
+  watched (ML_MODEL_POLL_SECONDS) and new models are warmed up and swapped in without
+  a restart; see model_registry.
+- Exposes a tiny Flask app with a /predict endpoint. Features are JSON by default;
+  a binary tensor body (`application/x-npy` or `application/x-msgpack`, see
+  tensor_codec) is decoded without copying and answered in the same format unless
+  the Accept header asks for another.
 - If no model is available, returns a deterministic mock prediction.
+- Concurrent model requests are micro-batched into one model.predict call
+  (ML_MAX_BATCH_SIZE rows, ML_MAX_BATCH_WAIT_MS); GET /metrics reports the batches.
+- ML_WORKERS > 1 loads the model once and serves from that many forked processes
+  that share its memory (see prefork). The parent then watches ML_MODEL_PATH; after a
+  reload it forks new workers with the new model and retires the old ones, so a
+  single copy of each model stays shared whatever its format.
+- Per-row predictions are cached by row bytes and model version (ML_CACHE_SIZE
+  entries, ML_CACHE_TTL seconds; size 0 disables), so only uncached rows reach the
+  model. Loading a model clears the cache.
 
 This is a lightweight prototype and should be adapted with proper ML infra
 (inference server, batching, GPU handling, health checks) for production.
 """
 import os
 import json
-from flask import Flask, request, jsonify
+from contextlib import nullcontext
+from flask import Flask, Response, request, jsonify
 
 try:
     import pickle
@@ -19,36 +35,122 @@ except Exception:
     np = None
 
 MODEL_PATH = os.environ.get("ML_MODEL_PATH", "model.pkl")
+POLL_INTERVAL = float(os.environ.get("ML_MODEL_POLL_SECONDS", "2"))
+MAX_BATCH_SIZE = int(os.environ.get("ML_MAX_BATCH_SIZE", "64"))
+MAX_BATCH_WAIT = float(os.environ.get("ML_MAX_BATCH_WAIT_MS", "5")) / 1000
+
+CACHE_SIZE = int(os.environ.get("ML_CACHE_SIZE", "100000"))
+CACHE_TTL = float(os.environ.get("ML_CACHE_TTL", "300"))
 
 app = Flask(__name__)
-model = None
+TENSOR_TYPES = ()
+if np is not None:
+    from tensor_codec import TENSOR_TYPES, TensorError, decode_tensor, encode_tensor
+
+cache = None
+if np is not None and CACHE_SIZE > 0:
+    from ml_cache import PredictionCache
+    cache = PredictionCache(CACHE_SIZE, CACHE_TTL)
+
+
+def _model_swapped(served) -> None:
+    if cache is not None:
+        cache.clear()
+
+
+registry = None
+if np is not None:
+    from ml_batching import MicroBatcher
+    from model_registry import ModelRegistry
+    registry = ModelRegistry(
+        MODEL_PATH, POLL_INTERVAL,
+        batcher_factory=lambda predict: MicroBatcher(predict, MAX_BATCH_SIZE, MAX_BATCH_WAIT),
+        on_swap=_model_swapped, logger=app.logger,
+    )
+    registry.start()
+if registry is None or registry.current is None:
+    app.logger.info("No model found; using mock predictions")
+
+
+def load_model(path: str = MODEL_PATH) -> None:
+    """Load and swap in a model now instead of waiting for the watcher"""
+    if registry is None:
+        raise RuntimeError("Cannot load a model: numpy is not installed, so only mock predictions are served")
+    registry.load(path)
+
+
+def _predict_rows(served, arr):
+    """Predictions for a 2-D array, serving cached rows and batching the misses"""
+    registry.remember(arr)
+    if cache is None:
+        return served.batcher.predict(arr)
+    keys = cache.keys(arr, served.version)
+    preds, misses = cache.lookup(keys)
+    if misses:
+        computed = served.batcher.predict(arr[misses] if len(misses) < len(arr) else arr).tolist()
+        for i, pred in zip(misses, computed):
+            preds[i] = pred
+        cache.store([keys[i] for i in misses], computed)
+    return np.asarray(preds)
+
 
-if pickle is not None and os.path.exists(MODEL_PATH):
+def _predict_model(served, features):
+    """/predict response from the model of `served`"""
     try:
-        with open(MODEL_PATH, "rb") as fh:
-            model = pickle.load(fh)
-        app.logger.info("Loaded model from %s", MODEL_PATH)
+        arr = np.asarray(features)
+    except ValueError:
+        arr = None  # ragged rows
+    if arr is not None and arr.ndim == 1:
+        arr = arr.reshape(1, -1)  # a single row
+    if arr is None or arr.dtype == object or arr.ndim != 2:
+        return jsonify({"error": "`features` must be a row or a list of equal-length rows"}), 400
+    try:
+        preds = _predict_rows(served, arr)
+        return jsonify({"predictions": preds.tolist()})
     except Exception as e:
-        app.logger.warning("Failed to load model: %s", e)
-else:
-    app.logger.info("No model found; using mock predictions")
+        return jsonify({"error": f"model inference failed: {e}"}), 500
+
+
+def _predict_tensor():
+    """/predict for a binary tensor body"""
+    try:
+        arr = decode_tensor(request.get_data(cache=False), request.mimetype)
+    except TensorError as e:
+        return jsonify({"error": str(e)}), 400
+    if arr.ndim == 1:
+        arr = arr.reshape(1, -1)  # a single row
+    response_type = request.accept_mimetypes.best_match(
+        [request.mimetype, *TENSOR_TYPES, "application/json"], request.mimetype)
+
+    with registry.use() as served:
+        if served is None:
+            preds = arr.sum(axis=1) % 2  # same mock as for JSON
+        else:
+            try:
+                preds = _predict_rows(served, arr)
+            except Exception as e:
+                return jsonify({"error": f"model inference failed: {e}"}), 500
+    if response_type == "application/json":
+        return jsonify({"predictions": preds.tolist()})
+    try:
+        body = encode_tensor(preds, response_type)
+    except TensorError as e:
+        return jsonify({"error": f"predictions cannot be sent as {response_type}: {e}"}), 500
+    return Response(body, mimetype=response_type)
 
 
 @app.route("/predict", methods=["POST"])
 def predict():
+    if request.mimetype in TENSOR_TYPES:
+        return _predict_tensor()
     data = request.get_json() or {}
     features = data.get("features")
     if features is None:
         return jsonify({"error": "`features` key required (array)"}), 400
 
-    # Basic validation
-    if model is not None:
-        try:
-            arr = np.array(features)
-            preds = model.predict(arr).tolist()
-            return jsonify({"predictions": preds})
-        except Exception as e:
-            return jsonify({"error": f"model inference failed: {e}"}), 500
+    with registry.use() if registry is not None else nullcontext() as served:
+        if served is not None:
+            return _predict_model(served, features)
 
     # Mock deterministic prediction: sum of features mod 2
     try:
@@ -63,5 +165,31 @@ def predict():
     return jsonify({"predictions": preds})
 
 
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    current = registry.current if registry is not None else None
+    return jsonify({
+        "model": registry.metrics() if registry is not None else None,
+        "pid": os.getpid(),
+        "batching": current.batcher.metrics() if current is not None else None,
+        "cache": cache.metrics() if cache is not None else None,
+    })
+
+
+def _before_fork() -> None:
+    # Threads do not survive a fork; the parent checks for new models between forks instead
+    if registry is not None:
+        registry.stop()
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=int(os.environ.get("ML_WORKER_PORT", 5001)))
+    host = os.environ.get("ML_WORKER_HOST", "0.0.0.0")
+    port = int(os.environ.get("ML_WORKER_PORT", 5001))
+    workers = int(os.environ.get("ML_WORKERS", "1"))
+    if workers > 1:
+        from prefork import serve_prefork
+        reload = registry.check if registry is not None and POLL_INTERVAL else None
+        serve_prefork(app, host, port, workers, _before_fork, logger=app.logger,
+                      reload=reload, reload_interval=POLL_INTERVAL)
+    else:
+        app.run(host=host, port=port)
@@ -0,0 +1,295 @@
+"""
+Model registry with background hot-reload for the ML worker.
+- `ML_MODEL_PATH` may be a pickle file, a model directory written by `save_model`, or
+  a versioned directory whose entries (files or model directories) are versions;
+  the entry that sorts last is served.
+- A watcher thread polls the path. A changed or new version is loaded in the
+  background, warmed up with one predict call and then swapped in atomically.
+  Requests hold the version they started with until they finish, and a model that
+  fails to load or warm up never replaces the serving one.
+- `save_model` pickles with protocol 5 and writes large NumPy buffers out of band to
+  one aligned file. `load_model` memory-maps that file, so the arrays are read-only
+  views of the page cache, shared between processes and not copied on load.
+"""
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Tuple
+
+import numpy as np
+
+MODEL_FILE = "model.pkl"
+BUFFERS_FILE = "buffers.bin"
+LAYOUT_FILE = "buffers.json"
+WARMUP_FILE = "warmup.npy"
+ALIGNMENT = 64
+MIN_MAPPED_BYTES = 64 * 1024  # smaller buffers stay inside the pickle
+
+
+@contextmanager
+def _replacing(path: str):
+    """Binary file written under a temporary name, then moved over `path`"""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        yield f
+    os.replace(tmp, path)
+
+
+def save_model(model, directory: str, min_mapped_bytes: int = MIN_MAPPED_BYTES) -> None:
+    """Write `model` as a model directory whose large arrays load memory-mapped"""
+    os.makedirs(directory, exist_ok=True)
+    buffers = []
+
+    def out_of_band(buffer: pickle.PickleBuffer) -> bool:
+        if buffer.raw().nbytes < min_mapped_bytes:
+            return True  # serialize in band
+        buffers.append(buffer)
+        return False
+
+    data = pickle.dumps(model, protocol=5, buffer_callback=out_of_band)
+    # Every file gets a new inode: a serving process may have the old buffers mapped,
+    # and rewriting them in place would change or unmap weights it is still using
+    layout = []
+    with _replacing(os.path.join(directory, BUFFERS_FILE)) as f:
+        for buffer in buffers:
+            raw = buffer.raw()
+            f.write(b"\0" * (-f.tell() % ALIGNMENT))
+            layout.append([f.tell(), raw.nbytes])
+            f.write(raw)
+    with _replacing(os.path.join(directory, LAYOUT_FILE)) as f:
+        f.write(json.dumps(layout).encode())
+    # The pickle goes last: a directory with model.pkl is complete
+    with _replacing(os.path.join(directory, MODEL_FILE)) as f:
+        f.write(data)
+
+
+def load_model(path: str) -> Tuple[object, str]:
+    """(model, version) from a pickle file or a save_model directory"""
+    if not os.path.isdir(path):
+        with open(path, "rb") as fh:
+            data = fh.read()
+        return pickle.loads(data), hashlib.sha256(data).hexdigest()[:16]
+
+    with open(os.path.join(path, MODEL_FILE), "rb") as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data)
+    buffers = []
+    layout_path = os.path.join(path, LAYOUT_FILE)
+    if os.path.exists(layout_path):
+        with open(layout_path, "r", encoding="utf-8") as f:
+            layout = json.load(f)
+        if layout:
+            buffers_path = os.path.join(path, BUFFERS_FILE)
+            with open(buffers_path, "rb") as fh:
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+            buffers = [view[offset:offset + size] for offset, size in layout]
+            stat = os.stat(buffers_path)
+            digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return pickle.loads(data, buffers=buffers), digest.hexdigest()[:16]
+
+
+def resolve(path: str) -> str:
+    """The model file or directory to serve for ML_MODEL_PATH"""
+    if not os.path.isdir(path) or os.path.exists(os.path.join(path, MODEL_FILE)):
+        return path
+    # Versioned directory: the last complete entry by name
+    for name in sorted(os.listdir(path), reverse=True):
+        entry = os.path.join(path, name)
+        if name.endswith(".pkl") or os.path.exists(os.path.join(entry, MODEL_FILE)):
+            return entry
+    return None
+
+
+def _signature(path: str):
+    target = resolve(path) if os.path.exists(path) else None
+    if target is None:
+        return None
+    model_file = os.path.join(target, MODEL_FILE) if os.path.isdir(target) else target
+    try:
+        stat = os.stat(model_file)
+    except FileNotFoundError:
+        return None
+    return target, stat.st_mtime_ns, stat.st_size
+
+
+class ServedModel:
+    """One loaded model version; closed once retired and no request uses it.
+
+    The batcher is started on first use in each process, so a model loaded before a
+    fork gets a working batcher thread in every child.
+    """
+
+    def __init__(self, model, version: str, source: str, batcher_factory: Callable = None):
+        self.model = model
+        self.version = version
+        self.source = source
+        self.loaded_at = time.time()
+        self.batcher_factory = batcher_factory
+        self._batcher = None
+        self._batcher_pid = None
+        self._lock = threading.Lock()
+        self._users = 0
+        self._retired = False
+
+    @property
+    def batcher(self):
+        if self._batcher_pid != os.getpid() and self.batcher_factory is not None:
+            with self._lock:
+                if self._batcher_pid != os.getpid():
+                    self._batcher = self.batcher_factory(self.model.predict)
+                    self._batcher_pid = os.getpid()
+        return self._batcher
+
+    def _acquire(self) -> None:
+        with self._lock:
+            self._users += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            done = self._retired and not self._users
+        if done:
+            self._close()
+
+    def _retire(self) -> None:
+        with self._lock:
+            self._retired = True
+            done = not self._users
+        if done:
+            self._close()
+
+    def _close(self) -> None:
+        if self._batcher is not None and self._batcher_pid == os.getpid():
+            self._batcher.close()
+
+
+class ModelRegistry:
+    def __init__(self, path: str, poll_interval: float = 2.0, batcher_factory: Callable = None,
+                 on_swap: Callable = None, warmup_rows: int = 8, logger=None):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.batcher_factory = batcher_factory  # predict fn -> object with predict/close
+        self.on_swap = on_swap  # called with the new ServedModel after each swap
+        self.warmup_rows = warmup_rows
+        self.logger = logger
+        self.current: ServedModel = None
+        self.last_error = None
+        self.swaps = 0
+        self._signature = None
+        self._sample = None  # recent request rows, used to warm up when nothing better exists
+        self._swap_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watcher = None
+
+    def _log(self, level: str, message: str, *args) -> None:
+        if self.logger is not None:
+            getattr(self.logger, level)(message, *args)
+
+    @contextmanager
+    def use(self):
+        """The serving model, kept alive until the block exits"""
+        with self._swap_lock:
+            served = self.current
+            if served is not None:
+                served._acquire()
+        try:
+            yield served
+        finally:
+            if served is not None:
+                served._release()
+
+    def remember(self, rows: np.ndarray) -> None:
+        """Keep a few request rows to warm up future models with"""
+        if self._sample is None or len(self._sample) < self.warmup_rows:
+            self._sample = np.array(rows[:self.warmup_rows])
+
+    def _warmup_batch(self, model, source: str):
+        """(rows, strict): a strict warm-up must succeed for the model to be served"""
+        warmup_path = os.path.join(source, WARMUP_FILE)
+        if os.path.isdir(source) and os.path.exists(warmup_path):
+            return np.load(warmup_path), True
+        n_features = getattr(model, "n_features_in_", None)
+        if n_features is not None:
+            return np.zeros((self.warmup_rows, n_features)), True
+        # Rows seen by the previous model may not fit a new one
+        return self._sample, False
+
+    def load(self, source: str = None) -> ServedModel:
+        """Load, warm up and swap in a model; the serving model is kept on any failure"""
+        source = source or resolve(self.path)
+        if source is None:
+            raise FileNotFoundError(f"No model found at {self.path}")
+        model, version = load_model(source)
+        warmup, strict = self._warmup_batch(model, source)
+        start = time.perf_counter()
+        if warmup is not None:
+            try:
+                model.predict(warmup)
+            except Exception as e:
+                if strict:
+                    raise
+                self._log("info", "Skipped warm-up of model %s: %s", version, e)
+        served = ServedModel(model, version, source, self.batcher_factory)
+        with self._swap_lock:
+            previous, self.current = self.current, served
+            self.swaps += 1
+        if source == resolve(self.path):
+            self._signature = _signature(self.path)
+        self._log("info", "Serving model %s from %s (warm-up %.1f ms)", version, source,
+                  (time.perf_counter() - start) * 1000)
+        if self.on_swap is not None:
+            self.on_swap(served)
+        if previous is not None:
+            previous._retire()  # closes once its in-flight requests finish
+        return served
+
+    def check(self) -> bool:
+        """Reload if the watched path changed; True if a new model was swapped in"""
+        signature = _signature(self.path)
+        if signature is None or signature == self._signature:
+            return False
+        try:
+            self.load(signature[0])
+        except Exception as e:
+            self.last_error = f"{type(e).__name__}: {e}"
+            self._log("warning", "Failed to load model from %s: %s", signature[0], e)
+            return False
+        finally:
+            # A broken version is not retried until it changes again
+            self._signature = signature
+        self.last_error = None
+        return True
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.check()
+
+    def start(self) -> None:
+        """Load the model now if present, then keep watching in the background"""
+        self.check()
+        if self.poll_interval and self._watcher is None:
+            self._stop.clear()
+            self._watcher = threading.Thread(target=self._watch, daemon=True)
+            self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def metrics(self) -> dict:
+        current = self.current
+        return {
+            "version": current.version if current else None,
+            "source": current.source if current else None,
+            "loaded_at": current.loaded_at if current else None,
+            "swaps": self.swaps,
+            "last_error": self.last_error,
+        }
@@ -1,28 +1,122 @@
+import bisect
 import uuid
 import time
 import random
+import threading
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from dataclasses import dataclass, asdict
 import json
 
-@dataclass
+from nft_journal import NFTJournal
+from training_history import TrainingHistory
+
+TRAIN_COOLDOWN = 30  # seconds between trainings of one NFT
+INDEXED_FIELDS = ("value", "intelligence", "created_at")
+MAX_ID = "\U0010ffff"  # sorts after every NFT id
+BULK_UPDATE_MIN = 16  # fewer changed keys are moved one by one
+
+
+def message_features(message: str) -> List[float]:
+    """Convert message to numerical input"""
+    return [
+        len(message) / 100,  # Normalized length
+        sum(ord(c) for c in message) / 10000,  # Character sum
+        len([c for c in message if c.isalpha()]) / len(message) if message else 0  # Letter ratio
+    ]
+
+
+def batch_features(messages: List[str]) -> np.ndarray:
+    """message_features of many messages at once, as an (n, 3) array"""
+    lengths = np.fromiter(map(len, messages), dtype=np.int64, count=len(messages))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    codes = np.frombuffer("".join(messages).encode("utf-32-le", "surrogatepass"), dtype="<u4")
+    letters = ((codes | 0x20) - ord("a") < 26) & (codes < 128)
+    wide = codes >= 128
+    if wide.any():
+        # Outside ASCII defer to str.isalpha, once per distinct code point
+        unique = np.unique(codes[wide])
+        alpha = unique[np.fromiter((chr(c).isalpha() for c in unique.tolist()), dtype=bool, count=len(unique))]
+        letters |= wide & np.isin(codes, alpha)
+    code_sums = np.concatenate(([0], np.cumsum(codes, dtype=np.int64)))
+    letter_counts = np.concatenate(([0], np.cumsum(letters, dtype=np.int64)))
+
+    features = np.empty((len(messages), 3))
+    features[:, 0] = lengths / 100
+    features[:, 1] = (code_sums[ends] - code_sums[starts]) / 10000
+    features[:, 2] = np.divide(letter_counts[ends] - letter_counts[starts], lengths,
+                               out=np.zeros(len(messages)), where=lengths > 0)
+    return features
+
+
+def message_target(message: str) -> float:
+    # Target is to predict message complexity (simple heuristic)
+    return min(1.0, len(message) / 50)
+
+
 class SimpleNeuralNetwork:
-    """A very simple neural network for demonstration"""
-    weights: List[float]
-    bias: float
-    learning_rate: float = 0.1
+    """A very simple neural network for demonstration.
+
+    A network bound to a NetworkStore keeps its parameters in the store's shared
+    arrays instead of its own lists.
+    """
+    __slots__ = ("_store", "_row", "_weights", "_bias", "_learning_rate")
     
-    def __init__(self, input_size: int = 3):
-        self.weights = [random.uniform(-1, 1) for _ in range(input_size)]
-        self.bias = random.uniform(-1, 1)
+    def __init__(self, input_size: int = 3, weights: List[float] = None, bias: float = None,
+                 learning_rate: float = 0.1):
+        self._store = None
+        self._row = None
+        self.weights = weights if weights is not None else [random.uniform(-1, 1) for _ in range(input_size)]
+        self.bias = bias if bias is not None else random.uniform(-1, 1)
+        self.learning_rate = learning_rate
+
+    @property
+    def weights(self) -> List[float]:
+        if self._store is not None:
+            return self._store.weights[self._row].tolist()
+        return self._weights
+
+    @weights.setter
+    def weights(self, value: List[float]):
+        if self._store is not None:
+            self._store.weights[self._row] = value
+        else:
+            self._weights = list(value)
+
+    @property
+    def bias(self) -> float:
+        if self._store is not None:
+            return float(self._store.bias[self._row])
+        return self._bias
+
+    @bias.setter
+    def bias(self, value: float):
+        if self._store is not None:
+            self._store.bias[self._row] = value
+        else:
+            self._bias = value
+
+    @property
+    def learning_rate(self) -> float:
+        if self._store is not None:
+            return float(self._store.learning_rate[self._row])
+        return self._learning_rate
+
+    @learning_rate.setter
+    def learning_rate(self, value: float):
+        if self._store is not None:
+            self._store.learning_rate[self._row] = value
+        else:
+            self._learning_rate = value
     
     def predict(self, inputs: List[float]) -> float:
-        if len(inputs) != len(self.weights):
-            raise ValueError(f"Expected {len(self.weights)} inputs, got {len(inputs)}")
+        weights = self.weights
+        if len(inputs) != len(weights):
+            raise ValueError(f"Expected {len(weights)} inputs, got {len(inputs)}")
         
         # Simple weighted sum
-        output = sum(w * x for w, x in zip(self.weights, inputs)) + self.bias
+        output = sum(w * x for w, x in zip(weights, inputs)) + self.bias
         return 1 / (1 + np.exp(-output))  # Sigmoid activation
     
     def train(self, inputs: List[float], target: float):
@@ -30,8 +124,10 @@ class SimpleNeuralNetwork:
         error = target - prediction
         
         # Update weights and bias
-        for i in range(len(self.weights)):
-            self.weights[i] += self.learning_rate * error * inputs[i]
+        weights = self.weights
+        for i in range(len(weights)):
+            weights[i] += self.learning_rate * error * inputs[i]
+        self.weights = weights
         self.bias += self.learning_rate * error
         
         return error
@@ -45,15 +141,65 @@ class SimpleNeuralNetwork:
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'SimpleNeuralNetwork':
-        nn = cls(input_size=len(data["weights"]))
-        nn.weights = data["weights"]
-        nn.bias = data["bias"]
-        nn.learning_rate = data.get("learning_rate", 0.1)
-        return nn
+        return cls(len(data["weights"]), data["weights"], data["bias"], data.get("learning_rate", 0.1))
+
+
+class NetworkStore:
+    """Parameters of many SimpleNeuralNetworks in contiguous NumPy arrays.
+
+    Row i of `weights`, `bias` and `learning_rate` belongs to one bound network, so a
+    batch of networks is trained or evaluated with a single vectorized pass.
+    """
+
+    def __init__(self, input_size: int = 3, capacity: int = 1024):
+        self.input_size = input_size
+        self.size = 0
+        self.weights = np.zeros((capacity, input_size))
+        self.bias = np.zeros(capacity)
+        self.learning_rate = np.zeros(capacity)
+
+    def _grow(self):
+        capacity = max(1, 2 * len(self.bias))
+        weights = np.zeros((capacity, self.input_size))
+        weights[:self.size] = self.weights[:self.size]
+        self.weights = weights
+        self.bias = np.concatenate([self.bias, np.zeros(capacity - len(self.bias))])
+        self.learning_rate = np.concatenate([self.learning_rate, np.zeros(capacity - len(self.learning_rate))])
+
+    def bind(self, network: SimpleNeuralNetwork) -> bool:
+        """Move the network's parameters into a new row; False if its shape does not fit"""
+        if network._store is self:
+            return True
+        if len(network.weights) != self.input_size:
+            return False
+        if self.size == len(self.bias):
+            self._grow()
+        row = self.size
+        self.weights[row] = network.weights
+        self.bias[row] = network.bias
+        self.learning_rate[row] = network.learning_rate
+        network._store, network._row = self, row
+        self.size += 1
+        return True
+
+    def predict(self, rows: np.ndarray, inputs: np.ndarray) -> np.ndarray:
+        output = np.einsum("ij,ij->i", self.weights[rows], inputs) + self.bias[rows]
+        return 1 / (1 + np.exp(-output))
+
+    def train(self, rows: np.ndarray, inputs: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """One gradient step per row; rows must be unique within a call"""
+        error = targets - self.predict(rows, inputs)
+        step = self.learning_rate[rows] * error
+        self.weights[rows] += step[:, None] * inputs
+        self.bias[rows] += step
+        return error
 
 
 class NFT:
-    def __init__(self, owner: str, name: str):
+    __slots__ = ("id", "owner", "name", "value", "difficulty", "last_train", "created_at",
+                 "neural_network", "_training_history", "intelligence", "on_change")
+
+    def __init__(self, owner: str, name: str, neural_network: SimpleNeuralNetwork = None):
         self.id = str(uuid.uuid4())
         self.owner = owner
         self.name = name
@@ -63,57 +209,61 @@ class NFT:
         self.created_at = time.time()
         
         # AI components
-        self.neural_network = SimpleNeuralNetwork()
-        self.training_history = []
+        self.neural_network = neural_network or SimpleNeuralNetwork()
+        self.training_history = TrainingHistory()
         self.intelligence = 1.0  # Overall intelligence score
+        self.on_change = None  # set by NFTManager to track unsaved changes
         
+    @property
+    def training_history(self) -> TrainingHistory:
+        return self._training_history
+
+    @training_history.setter
+    def training_history(self, records):
+        # Plain lists of record dicts (e.g. from to_dict) are packed into the ring buffer
+        if not isinstance(records, TrainingHistory):
+            records = TrainingHistory.from_records(records)
+        self._training_history = records
+
+    def cooldown_error(self, now: float) -> Dict:
+        """Error result while the NFT is cooling down, else None"""
+        if now - self.last_train < TRAIN_COOLDOWN:
+            return {"error": "NFT is cooling down", "wait": TRAIN_COOLDOWN - (now - self.last_train)}
+        return None
+
     def train_with_chat(self, message: str) -> Dict:
         """Train NFT using chat message as input"""
         now = time.time()
-        cooldown = 30  # 30 seconds cooldown
-        
-        if now - self.last_train < cooldown:
-            return {"error": "NFT is cooling down", "wait": cooldown - (now - self.last_train)}
-        
-        # Convert message to numerical input
-        inputs = [
-            len(message) / 100,  # Normalized length
-            sum(ord(c) for c in message) / 10000,  # Character sum
-            len([c for c in message if c.isalpha()]) / len(message) if message else 0  # Letter ratio
-        ]
+        cooldown_error = self.cooldown_error(now)
+        if cooldown_error:
+            return cooldown_error
         
-        # Target is to predict message complexity (simple heuristic)
-        target = min(1.0, len(message) / 50)
+        inputs = message_features(message)
+        target = message_target(message)
         
         # Train the neural network
         error = self.neural_network.train(inputs, target)
-        
+        return self.record_training(now, message, inputs, error, self.neural_network.predict(inputs))
+
+    def record_training(self, now: float, message: str, inputs: List[float], error: float, prediction: float) -> Dict:
+        """Apply the stat updates and history record of one training step"""
         # Update NFT stats
         self.value += 0.1 + (self.difficulty * 0.05)
         self.difficulty = min(10, self.difficulty + 0.02)
         self.intelligence += 0.01
         self.last_train = now
+        if self.on_change:
+            self.on_change(self.id)
         
-        # Record training
-        training_record = {
-            "timestamp": now,
-            "message": message[:50],  # Store first 50 chars
-            "error": abs(error),
-            "inputs": inputs,
-            "prediction": self.neural_network.predict(inputs)
-        }
-        self.training_history.append(training_record)
-        
-        # Keep only last 100 trainings
-        if len(self.training_history) > 100:
-            self.training_history = self.training_history[-100:]
+        # Record training (first 50 chars of the message; the ring buffer keeps the last 100)
+        self.training_history.record(now, message[:50], abs(error), inputs, prediction)
         
         return {
             "success": True,
             "error": error,
             "new_value": self.value,
             "new_intelligence": self.intelligence,
-            "prediction": training_record["prediction"]
+            "prediction": prediction
         }
     
     def contribute_to_brain(self) -> float:
@@ -137,71 +287,332 @@ class NFT:
     
     @classmethod
     def from_dict(cls, data: Dict) -> 'NFT':
-        nft = cls(data["owner"], data["name"])
+        nft = cls(data["owner"], data["name"], SimpleNeuralNetwork.from_dict(data["neural_network"]))
         nft.id = data["id"]
         nft.value = data["value"]
         nft.difficulty = data["difficulty"]
         nft.last_train = data["last_train"]
         nft.created_at = data["created_at"]
         nft.intelligence = data.get("intelligence", 1.0)
-        nft.neural_network = SimpleNeuralNetwork.from_dict(data["neural_network"])
         nft.training_history = data.get("training_history", [])
         return nft
 
 
+class SortedIndex:
+    """(key, nft_id) pairs kept sorted for top-K and range queries in O(log n + k)"""
+
+    def __init__(self, items: List[Tuple[float, str]] = ()):
+        self.entries = sorted((key, nft_id) for nft_id, key in items)
+        self.keys = {nft_id: key for key, nft_id in self.entries}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, nft_id: str, key: float) -> None:
+        bisect.insort(self.entries, (key, nft_id))
+        self.keys[nft_id] = key
+
+    def remove(self, nft_id: str) -> None:
+        key = self.keys.pop(nft_id, None)
+        if key is None:
+            return
+        i = bisect.bisect_left(self.entries, (key, nft_id))
+        del self.entries[i]
+
+    def update(self, nft_id: str, key: float) -> None:
+        if self.keys.get(nft_id) != key:
+            self.remove(nft_id)
+            self.add(nft_id, key)
+
+    def update_many(self, items: List[Tuple[str, float]]) -> None:
+        """update() for many (nft_id, key) pairs in O(n + k log k) instead of O(k * n)"""
+        changed = {nft_id: key for nft_id, key in dict(items).items() if self.keys.get(nft_id) != key}
+        if len(changed) <= BULK_UPDATE_MIN:
+            for nft_id, key in changed.items():
+                self.update(nft_id, key)
+            return
+        self.entries = [entry for entry in self.entries if entry[1] not in changed]
+        self.entries.extend(sorted((key, nft_id) for nft_id, key in changed.items()))
+        self.entries.sort()  # two sorted runs: Timsort merges them in linear time
+        self.keys.update(changed)
+
+    def top(self, limit: int, offset: int = 0) -> List[str]:
+        """Ids with the highest keys, best first"""
+        end = len(self.entries) - offset
+        return [nft_id for _, nft_id in reversed(self.entries[max(0, end - limit):max(0, end)])]
+
+    def range(self, low: float = None, high: float = None, limit: int = 100, offset: int = 0) -> List[str]:
+        """Ids with low <= key <= high, ascending"""
+        start = 0 if low is None else bisect.bisect_left(self.entries, (low, ""))
+        stop = len(self.entries) if high is None else bisect.bisect_right(self.entries, (high, MAX_ID))
+        start += offset
+        return [nft_id for _, nft_id in self.entries[start:min(stop, start + limit)]]
+
+
 class NFTManager:
     def __init__(self):
         self.nfts = {}
-        self.owner_index = {}  # owner -> list of NFT IDs
-        
-    def mint_nft(self, owner: str, name: str) -> NFT:
-        nft = NFT(owner, name)
+        self.store = NetworkStore()  # weights of all managed NFTs
+        self.dirty = set()  # ids changed since the last save_changes
+        self.journal = None
+        # Held by every call that trains, transfers or reads the indexes, so request
+        # threads and a ChatIngestor can share one manager
+        self.lock = threading.RLock()
+        self._reset_indexes()
+
+    def _reset_indexes(self) -> None:
+        # owner -> ordered set of NFT IDs (dict keys), so removal is O(1)
+        self.owner_index: Dict[str, Dict[str, None]] = {}
+        self.indexes = {field: SortedIndex() for field in INDEXED_FIELDS}
+        self.owner_value_index: Dict[str, SortedIndex] = {}
+
+    def _adopt(self, nft: NFT) -> None:
         self.nfts[nft.id] = nft
+        self.store.bind(nft.neural_network)
+        nft.on_change = self._nft_changed
+        self.owner_index.setdefault(nft.owner, {})[nft.id] = None
+        for field, index in self.indexes.items():
+            index.add(nft.id, getattr(nft, field))
+        self.owner_value_index.setdefault(nft.owner, SortedIndex()).add(nft.id, nft.value)
+
+    def _adopt_all(self, nfts: List[NFT]) -> None:
+        """Replace the collection, building the sorted indexes in one sort each"""
+        self.nfts = {}
+        self.store = NetworkStore()
+        self._reset_indexes()
+        for nft in nfts:
+            self.nfts[nft.id] = nft
+            self.store.bind(nft.neural_network)
+            nft.on_change = self._nft_changed
+            self.owner_index.setdefault(nft.owner, {})[nft.id] = None
+        for field in INDEXED_FIELDS:
+            self.indexes[field] = SortedIndex((nft.id, getattr(nft, field)) for nft in nfts)
+        for owner, ids in self.owner_index.items():
+            self.owner_value_index[owner] = SortedIndex((nft_id, self.nfts[nft_id].value) for nft_id in ids)
+
+    def _nft_changed(self, nft_id: str) -> None:
+        with self.lock:
+            self._nfts_changed([nft_id])
+
+    def _nfts_changed(self, nft_ids: List[str]) -> None:
+        self.dirty.update(nft_ids)
+        nfts = [self.nfts[nft_id] for nft_id in nft_ids]
+        self.indexes["value"].update_many([(nft.id, nft.value) for nft in nfts])
+        self.indexes["intelligence"].update_many([(nft.id, nft.intelligence) for nft in nfts])
+        by_owner: Dict[str, List[Tuple[str, float]]] = {}
+        for nft in nfts:
+            by_owner.setdefault(nft.owner, []).append((nft.id, nft.value))
+        for owner, items in by_owner.items():
+            self.owner_value_index[owner].update_many(items)
         
-        if owner not in self.owner_index:
-            self.owner_index[owner] = []
-        self.owner_index[owner].append(nft.id)
-        
-        return nft
+    def mint_nft(self, owner: str, name: str, nft_id: str = None) -> NFT:
+        with self.lock:
+            nft = NFT(owner, name)
+            if nft_id is not None:
+                nft.id = nft_id  # assigned by the caller, e.g. a shard router
+            self._adopt(nft)
+            self.dirty.add(nft.id)
+            return nft
     
     def get_nft(self, nft_id: str) -> NFT:
         return self.nfts.get(nft_id)
     
     def get_owner_nfts(self, owner: str) -> List[NFT]:
-        return [self.nfts[nft_id] for nft_id in self.owner_index.get(owner, [])]
+        with self.lock:
+            return [self.nfts[nft_id] for nft_id in self.owner_index.get(owner, [])]
     
     def transfer_nft(self, nft_id: str, from_owner: str, to_owner: str) -> bool:
-        nft = self.get_nft(nft_id)
-        if not nft or nft.owner != from_owner:
-            return False
-        
-        # Update owner
-        nft.owner = to_owner
+        with self.lock:
+            nft = self.get_nft(nft_id)
+            if not nft or nft.owner != from_owner:
+                return False
         
-        # Update indexes
-        if from_owner in self.owner_index:
-            self.owner_index[from_owner] = [id for id in self.owner_index[from_owner] if id != nft_id]
+            # Update owner
+            nft.owner = to_owner
+            self.dirty.add(nft_id)
         
-        if to_owner not in self.owner_index:
-            self.owner_index[to_owner] = []
-        self.owner_index[to_owner].append(nft_id)
+            # Update indexes
+            self.owner_index[from_owner].pop(nft_id, None)
+            self.owner_index.setdefault(to_owner, {})[nft_id] = None
+            self.owner_value_index[from_owner].remove(nft_id)
+            self.owner_value_index.setdefault(to_owner, SortedIndex()).add(nft_id, nft.value)
         
-        return True
+            return True
+
+    def top_nfts(self, field: str = "value", limit: int = 10, offset: int = 0) -> List[NFT]:
+        """Leaderboard on value, intelligence or created_at, highest first"""
+        with self.lock:
+            return [self.nfts[nft_id] for nft_id in self.indexes[field].top(limit, offset)]
+
+    def nfts_in_range(self, field: str, low: float = None, high: float = None,
+                      limit: int = 100, offset: int = 0) -> List[NFT]:
+        """NFTs with low <= field <= high, ascending; None leaves a bound open"""
+        with self.lock:
+            return [self.nfts[nft_id] for nft_id in self.indexes[field].range(low, high, limit, offset)]
+
+    def owner_top_nfts(self, owner: str, limit: int = 10, offset: int = 0) -> List[NFT]:
+        """The owner's most valuable NFTs, highest first"""
+        with self.lock:
+            index = self.owner_value_index.get(owner)
+            return [self.nfts[nft_id] for nft_id in index.top(limit, offset)] if index else []
     
+    def train_with_chat(self, nft_id: str, message: str) -> Dict:
+        """Train one NFT under the manager lock; use this rather than NFT.train_with_chat
+        when other threads share the manager"""
+        return self.train_batch([(nft_id, message)])[0]
+
+    def train_batch(self, messages: List[Tuple[str, str]], inputs=None, targets=None) -> List[Dict]:
+        """Train many NFTs on (nft_id, message) pairs with one vectorized pass.
+
+        Results match calling train_with_chat for each pair in order, so a second
+        message for the same NFT within a batch hits the cooldown. Callers that already
+        hold the features (n, input_size) or targets (n,) of the messages may pass them.
+        """
+        with self.lock:
+            now = time.time()
+            results: List[Dict] = [None] * len(messages)
+            batch = []  # (position, nft, message)
+            seen = set()
+            for i, (nft_id, message) in enumerate(messages):
+                nft = self.nfts.get(nft_id)
+                if nft is None:
+                    results[i] = {"error": "NFT not found"}
+                    continue
+                if nft_id in seen:
+                    results[i] = {"error": "NFT is cooling down", "wait": TRAIN_COOLDOWN}
+                    continue
+                seen.add(nft_id)
+                cooldown_error = nft.cooldown_error(now)
+                if cooldown_error:
+                    results[i] = cooldown_error
+                else:
+                    batch.append((i, nft, message))
+            if not batch:
+                return results
+
+            positions = [i for i, _, _ in batch]
+            if inputs is None:
+                batch_inputs = batch_features([m for _, _, m in batch])
+            else:
+                batch_inputs = np.asarray(inputs, dtype=float)[positions]
+            if targets is None:
+                batch_targets = np.array([message_target(m) for _, _, m in batch])
+            else:
+                batch_targets = np.asarray(targets, dtype=float)[positions]
+
+            errors = np.empty(len(batch))
+            predictions = np.empty(len(batch))
+            stored = [j for j, (_, nft, _) in enumerate(batch) if nft.neural_network._store is self.store]
+            if stored:
+                rows = np.array([batch[j][1].neural_network._row for j in stored])
+                x = batch_inputs[stored]
+                errors[stored] = self.store.train(rows, x, batch_targets[stored])
+                predictions[stored] = self.store.predict(rows, x)
+            if len(stored) < len(batch):
+                # Networks of another shape stay outside the store
+                for j in sorted(set(range(len(batch))) - set(stored)):
+                    network = batch[j][1].neural_network
+                    x = batch_inputs[j].tolist()
+                    errors[j] = network.train(x, float(batch_targets[j]))
+                    predictions[j] = network.predict(x)
+
+            for (i, _, _), result in zip(batch, self._record_batch(now, batch, batch_inputs, errors, predictions)):
+                results[i] = result
+            return results
+
+    def _record_batch(self, now: float, batch: List[Tuple[int, NFT, str]], inputs: np.ndarray,
+                      errors: np.ndarray, predictions: np.ndarray) -> List[Dict]:
+        """NFT.record_training for a whole batch: stats computed as arrays, indexes updated once"""
+        nfts = [nft for _, nft, _ in batch]
+        count = len(nfts)
+        value = np.fromiter((nft.value for nft in nfts), dtype=float, count=count)
+        difficulty = np.fromiter((nft.difficulty for nft in nfts), dtype=float, count=count)
+        intelligence = np.fromiter((nft.intelligence for nft in nfts), dtype=float, count=count)
+        # Same expressions, in the same order, as record_training
+        value += 0.1 + (difficulty * 0.05)
+        difficulty = np.minimum(10, difficulty + 0.02)
+        intelligence += 0.01
+
+        results = []
+        for (_, nft, message), v, d, g, x, error, prediction in zip(
+                batch, value.tolist(), difficulty.tolist(), intelligence.tolist(), inputs,
+                errors.tolist(), predictions.tolist()):
+            nft.value, nft.difficulty, nft.intelligence, nft.last_train = v, d, g, now
+            nft.training_history.record(now, message[:50], abs(error), x, prediction)
+            results.append({"success": True, "error": error, "new_value": v, "new_intelligence": g,
+                            "prediction": prediction})
+        self._nfts_changed([nft.id for nft in nfts])
+        return results
+
+    def predict_batch(self, nft_ids: List[str], inputs) -> np.ndarray:
+        """Predictions of many NFTs in one vectorized call.
+
+        `inputs` is either one row per NFT, shape (len(nft_ids), input_size), or a
+        single input vector scored by every NFT.
+        """
+        with self.lock:
+            inputs = np.asarray(inputs, dtype=float)
+            if inputs.ndim == 1:
+                inputs = np.broadcast_to(inputs, (len(nft_ids), inputs.shape[0]))
+            if inputs.shape != (len(nft_ids), self.store.input_size):
+                raise ValueError(f"Expected inputs of shape ({len(nft_ids)}, {self.store.input_size}), got {inputs.shape}")
+
+            rows = np.empty(len(nft_ids), dtype=np.intp)
+            unbound = []
+            for i, nft_id in enumerate(nft_ids):
+                nft = self.nfts.get(nft_id)
+                if nft is None:
+                    raise KeyError(f"NFT not found: {nft_id}")
+                if nft.neural_network._store is self.store:
+                    rows[i] = nft.neural_network._row
+                else:
+                    rows[i] = 0
+                    unbound.append((i, nft.neural_network))
+
+            predictions = self.store.predict(rows, inputs)
+            for i, network in unbound:
+                predictions[i] = network.predict(inputs[i].tolist())
+            return predictions
+
     def save_to_file(self, filename: str):
-        data = {
-            "nfts": {nft_id: nft.to_dict() for nft_id, nft in self.nfts.items()},
-            "owner_index": self.owner_index
-        }
-        with open(filename, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        with self.lock:
+            data = {
+                "nfts": {nft_id: nft.to_dict() for nft_id, nft in self.nfts.items()},
+                "owner_index": {owner: list(ids) for owner, ids in self.owner_index.items()}
+            }
+            with open(filename, 'w') as f:
+                json.dump(data, f, indent=2, default=str)
     
     def load_from_file(self, filename: str):
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        with self.lock:
+            with open(filename, 'r') as f:
+                data = json.load(f)
         
-        self.nfts = {}
-        for nft_id, nft_data in data["nfts"].items():
-            self.nfts[nft_id] = NFT.from_dict(nft_data)
-        
-        self.owner_index = data["owner_index"]
+            # owner_index is rebuilt from the NFTs themselves
+            self._adopt_all([NFT.from_dict(nft_data) for nft_data in data["nfts"].values()])
+            self.dirty = set(self.nfts)
+
+    def open_journal(self, directory: str, compact_threshold: int = 10000, fsync: bool = False):
+        """Persist incrementally through an NFTJournal in `directory`.
+
+        A journal with saved state replaces the in-memory collection; an empty one
+        starts from the current collection, which is written on the next save_changes.
+        """
+        with self.lock:
+            self.journal = NFTJournal(directory, compact_threshold, fsync)
+            state = self.journal.load()
+            if state:
+                self._adopt_all([NFT.from_dict(nft_data) for nft_data in state.values()])
+                self.dirty = set()
+            else:
+                self.dirty = set(self.nfts)
+
+    def save_changes(self) -> int:
+        """Append NFTs changed since the last save to the journal; returns how many"""
+        with self.lock:
+            if self.journal is None:
+                raise RuntimeError("No journal is open; call open_journal before save_changes")
+            changed = [self.nfts[nft_id].to_dict() for nft_id in self.dirty if nft_id in self.nfts]
+            self.journal.append(changed)
+            self.dirty.clear()
+            return len(changed)
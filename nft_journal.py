@@ -0,0 +1,122 @@
+"""
+Write-ahead log + snapshot persistence for NFTManager.
+- `append` writes one JSON line per changed NFT to `wal.jsonl`, so a save costs
+  O(changes) instead of O(collection).
+- Once the log holds `compact_threshold` records it is rotated to `wal.old` and
+  merged into `snapshot.json` on a background thread; new writes go to a fresh log.
+- `load` replays snapshot, then `wal.old`, then `wal.jsonl`. A torn last line from a
+  crash is ignored and replaying a record twice is harmless.
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Tuple
+
+SNAPSHOT_FILE = "snapshot.json"
+WAL_FILE = "wal.jsonl"
+OLD_WAL_FILE = "wal.old"
+
+
+class NFTJournal:
+    def __init__(self, directory: str, compact_threshold: int = 10000, fsync: bool = False):
+        self.directory = directory
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.wal_records = 0
+        self._compactor = None
+        os.makedirs(directory, exist_ok=True)
+        self._wal = open(self._path(WAL_FILE), "a", encoding="utf-8")
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _read_snapshot(self) -> Dict[str, Dict]:
+        path = self._path(SNAPSHOT_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _replay(path: str, state: Dict[str, Dict]) -> Tuple[int, int]:
+        """Apply the records in `path`; (records, bytes up to the last complete record)"""
+        if not os.path.exists(path):
+            return 0, 0
+        count = good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write at the tail
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                state[record["id"]] = record
+                count += 1
+                good += len(line)
+        return count, good
+
+    def load(self) -> Dict[str, Dict]:
+        """Current state as {nft_id: nft dict}"""
+        with self.lock:
+            state = self._read_snapshot()
+            self._replay(self._path(OLD_WAL_FILE), state)
+            self.wal_records, good = self._replay(self._path(WAL_FILE), state)
+            # Drop a torn tail so later appends are not hidden behind it
+            if good < os.path.getsize(self._path(WAL_FILE)):
+                os.truncate(self._path(WAL_FILE), good)
+        return state
+
+    def append(self, records: List[Dict]) -> None:
+        if not records:
+            return
+        with self.lock:
+            self._wal.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            self.wal_records += len(records)
+            if self.wal_records >= self.compact_threshold:
+                self._start_compaction()
+
+    def _start_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if os.path.exists(self._path(OLD_WAL_FILE)):
+            # A previous compaction did not finish; merge it before rotating again
+            self._compactor = threading.Thread(target=self._merge_old_wal, daemon=True)
+        else:
+            self._wal.close()
+            os.replace(self._path(WAL_FILE), self._path(OLD_WAL_FILE))
+            self._wal = open(self._path(WAL_FILE), "a", encoding="utf-8")
+            self.wal_records = 0
+            self._compactor = threading.Thread(target=self._merge_old_wal, daemon=True)
+        self._compactor.start()
+
+    def _merge_old_wal(self) -> None:
+        state = self._read_snapshot()
+        self._replay(self._path(OLD_WAL_FILE), state)
+        tmp = self._path(SNAPSHOT_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path(SNAPSHOT_FILE))
+        os.remove(self._path(OLD_WAL_FILE))
+
+    def compact(self) -> None:
+        """Merge everything logged so far into the snapshot, waiting for completion"""
+        while True:
+            with self.lock:
+                if not self.wal_records and not os.path.exists(self._path(OLD_WAL_FILE)):
+                    return
+                self._start_compaction()
+                compactor = self._compactor
+            compactor.join()
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+        with self.lock:
+            self._wal.close()
@@ -0,0 +1,435 @@
+"""
+Sharded NFT engine: NFTs partitioned across worker processes by id hash.
+- Every shard process owns an NFTManager with its NFTs, indexes and (optionally) its
+  own journal directory, so training and queries run on as many cores as shards.
+- `ShardedNFTManager` is a thin router with the NFTManager API. Calls that touch
+  several shards are sent to all of them before any reply is awaited, so the shards
+  work in parallel.
+- An NFT never changes shard (placement depends only on its id), so transfer_nft is
+  shard-local. transfer_nfts moves several NFTs all-or-nothing with a two-phase
+  prepare/commit across the shards involved. With a directory, shards persist what
+  they prepared and the router logs every commit decision in `transfers.jsonl`
+  before sending it, so a commit interrupted by a shard or router crash is finished
+  when the shard comes back, and an undecided one is rolled back.
+- A shard that dies or does not reply within `timeout` seconds raises ShardError and
+  is skipped until `restart_shard` (or `recover`, for every such shard) starts it
+  again on its directory.
+- NFTs returned by the router are detached copies; change them through the router.
+"""
+import json
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Tuple
+
+from nft import NFT, NFTManager
+
+PREPARED_FILE = "prepared.json"  # per shard: transfer id -> NFT ids held for it
+TRANSFER_LOG = "transfers.jsonl"  # router: commit decisions and completions
+
+
+class ShardError(RuntimeError):
+    pass
+
+
+def shard_of(nft_id: str, shards: int) -> int:
+    return zlib.crc32(nft_id.encode()) % shards
+
+
+class _Shard:
+    """Request handlers run inside a shard process"""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory
+        self.manager = NFTManager()
+        self.prepared: Dict[str, List[str]] = {}  # transfer id -> NFT ids held for it
+        if directory:
+            self.manager.open_journal(directory)
+            path = os.path.join(directory, PREPARED_FILE)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self.prepared = json.load(f)
+        self.held = {nft_id for nft_ids in self.prepared.values() for nft_id in nft_ids}
+
+    def _save_prepared(self) -> None:
+        """Persist the held transfers before answering, so a restart keeps the vote"""
+        if not self.directory:
+            return
+        path = os.path.join(self.directory, PREPARED_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.prepared, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def mint(self, owner: str, name: str, nft_id: str) -> Dict:
+        return self.manager.mint_nft(owner, name, nft_id).to_dict()
+
+    def get(self, nft_id: str) -> Dict:
+        nft = self.manager.get_nft(nft_id)
+        return nft.to_dict() if nft else None
+
+    def owner_nfts(self, owner: str) -> List[Dict]:
+        return [nft.to_dict() for nft in self.manager.get_owner_nfts(owner)]
+
+    def top(self, field: str, limit: int) -> List[Tuple[float, Dict]]:
+        return [(getattr(nft, field), nft.to_dict()) for nft in self.manager.top_nfts(field, limit)]
+
+    def transfer(self, nft_id: str, from_owner: str, to_owner: str) -> bool:
+        if nft_id in self.held:
+            return False
+        return self.manager.transfer_nft(nft_id, from_owner, to_owner)
+
+    def prepare_transfer(self, transfer_id: str, nft_ids: List[str], from_owner: str) -> bool:
+        """Check and hold NFTs for a multi-NFT transfer; nothing changes yet"""
+        for nft_id in nft_ids:
+            nft = self.manager.get_nft(nft_id)
+            if nft is None or nft.owner != from_owner or nft_id in self.held:
+                return False
+        self.prepared[transfer_id] = nft_ids
+        self.held.update(nft_ids)
+        self._save_prepared()
+        return True
+
+    def prepared_transfers(self) -> List[str]:
+        return list(self.prepared)
+
+    def commit_transfer(self, transfer_id: str, from_owner: str, to_owner: str) -> None:
+        """Apply a prepared transfer; repeating a commit that was already applied is a no-op"""
+        nft_ids = self.prepared.get(transfer_id)
+        if nft_ids is None:
+            return
+        for nft_id in nft_ids:
+            self.manager.transfer_nft(nft_id, from_owner, to_owner)
+        if self.manager.journal:
+            self.manager.save_changes()  # durable before the hold is released
+        del self.prepared[transfer_id]
+        self.held.difference_update(nft_ids)
+        self._save_prepared()
+
+    def abort_transfer(self, transfer_id: str) -> None:
+        if transfer_id in self.prepared:
+            self.held.difference_update(self.prepared.pop(transfer_id))
+            self._save_prepared()
+
+    def train_batch(self, messages: List[Tuple[str, str]]) -> List[Dict]:
+        return self.manager.train_batch(messages)
+
+    def save_changes(self) -> int:
+        return self.manager.save_changes() if self.manager.journal else 0
+
+    def stats(self) -> Dict:
+        return {"nfts": len(self.manager.nfts), "unsaved": len(self.manager.dirty)}
+
+    def close(self) -> None:
+        if self.manager.journal:
+            self.manager.save_changes()
+            self.manager.journal.close()
+
+
+def _shard_main(conn, directory: str) -> None:
+    shard = _Shard(directory)
+    while True:
+        request = conn.recv()
+        if request is None:
+            shard.close()
+            conn.send((True, None))
+            return
+        method, args = request
+        try:
+            conn.send((True, getattr(shard, method)(*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class ShardedNFTManager:
+    def __init__(self, shards: int = None, directory: str = None, timeout: float = 60.0):
+        self.shards = shards or os.cpu_count() or 1
+        self.directory = directory
+        self.timeout = timeout  # seconds to wait for a shard's reply
+        self._broken = set()  # shards that died or timed out; their pipes are out of step
+        self._conns = [None] * self.shards
+        self._locks = [threading.Lock() for _ in range(self.shards)]
+        self._processes = [None] * self.shards
+        # Committed transfers some shard has not applied yet: id -> (shards, from, to)
+        self._pending: Dict[str, Tuple[set, str, str]] = {}
+        self._deciding = set()  # transfers between prepare and their decision
+        self._pending_lock = threading.Lock()
+        self._log = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load_log()
+        for i in range(self.shards):
+            self._spawn(i)
+        for i in range(self.shards):
+            self._resolve(i)
+
+    def _spawn(self, i: int) -> None:
+        parent, child = mp.Pipe()
+        shard_dir = os.path.join(self.directory, f"shard-{i:02d}") if self.directory else None
+        process = mp.Process(target=_shard_main, args=(child, shard_dir), daemon=True)
+        process.start()
+        child.close()
+        self._conns[i] = parent
+        self._processes[i] = process
+
+    def _load_log(self) -> None:
+        """Read the pending commits and rewrite the log with only those"""
+        path = os.path.join(self.directory, TRANSFER_LOG)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write at the tail
+                    record = json.loads(line)
+                    if "done" in record:
+                        shards = self._pending.get(record["id"], (set(),))[0]
+                        shards.discard(record["done"])
+                    else:
+                        self._pending[record["id"]] = (set(record["shards"]), record["from_owner"],
+                                                       record["to_owner"])
+        self._pending = {tid: entry for tid, entry in self._pending.items() if entry[0]}
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            for tid, (shards, from_owner, to_owner) in self._pending.items():
+                f.write(json.dumps({"id": tid, "shards": sorted(shards), "from_owner": from_owner,
+                                    "to_owner": to_owner}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+        self._log = open(path, "a", encoding="utf-8")
+
+    def _write_log(self, record: Dict, sync: bool = False) -> None:
+        if self._log is None:
+            return
+        self._log.write(json.dumps(record) + "\n")
+        self._log.flush()
+        if sync:
+            os.fsync(self._log.fileno())
+
+    def _applied(self, transfer_id: str, shard: int) -> None:
+        with self._pending_lock:
+            entry = self._pending.get(transfer_id)
+            if entry is None or shard not in entry[0]:
+                return
+            entry[0].discard(shard)
+            if not entry[0]:
+                del self._pending[transfer_id]
+            self._write_log({"id": transfer_id, "done": shard})
+
+    def _resolve(self, i: int) -> None:
+        """Finish the committed transfers shard i holds and roll back the undecided ones"""
+        held = set(self._call(i, "prepared_transfers"))
+        with self._pending_lock:
+            pending = {tid: (from_owner, to_owner) for tid, (shards, from_owner, to_owner)
+                       in self._pending.items() if i in shards}
+            deciding = held & self._deciding  # this router will still commit or abort these
+        for transfer_id in held - deciding:
+            if transfer_id in pending:
+                self._call(i, "commit_transfer", transfer_id, *pending[transfer_id])
+            else:
+                self._call(i, "abort_transfer", transfer_id)
+        for transfer_id in set(pending) - deciding:
+            self._applied(transfer_id, i)  # committed now, or applied before the shard went down
+
+    def restart_shard(self, i: int) -> None:
+        """Start shard i again on its directory and let it catch up on transfers"""
+        with self._locks[i]:
+            process = self._processes[i]
+            if process.is_alive():
+                process.kill()
+            process.join()
+            self._conns[i].close()
+            self._spawn(i)
+            self._broken.discard(i)
+        self._resolve(i)
+
+    def recover(self) -> List[int]:
+        """Restart every shard that died or timed out; returns their numbers"""
+        shards = sorted(self._broken)
+        for i in shards:
+            self.restart_shard(i)
+        return shards
+
+    def _exchange(self, requests: Dict[int, Tuple[str, tuple]]) -> Dict[int, Tuple[bool, object]]:
+        """Send every request before reading any reply, so shards work in parallel.
+
+        Returns (ok, value or error) per shard. Every reply is read, even after one
+        shard fails, so the pipes of the others stay in step.
+        """
+        shards = sorted(requests)
+        for i in shards:  # sorted order keeps concurrent fan-outs deadlock free
+            self._locks[i].acquire()
+        replies = {}
+        try:
+            for i in shards:
+                if i in self._broken:
+                    replies[i] = (False, "shard is unavailable")
+                    continue
+                try:
+                    self._conns[i].send(requests[i])
+                except OSError as e:
+                    self._broken.add(i)
+                    replies[i] = (False, f"shard died: {e}")
+            deadline = time.monotonic() + self.timeout
+            for i in shards:
+                if i in replies:
+                    continue
+                try:
+                    if not self._conns[i].poll(max(0.0, deadline - time.monotonic())):
+                        self._broken.add(i)
+                        replies[i] = (False, f"no reply within {self.timeout}s")
+                    else:
+                        replies[i] = self._conns[i].recv()
+                except (EOFError, OSError) as e:
+                    self._broken.add(i)
+                    replies[i] = (False, f"shard died: {type(e).__name__}")
+        finally:
+            for i in shards:
+                self._locks[i].release()
+        return replies
+
+    def _call_many(self, requests: Dict[int, Tuple[str, tuple]]) -> Dict:
+        replies = self._exchange(requests)
+        for i, (ok, value) in sorted(replies.items()):
+            if not ok:
+                raise ShardError(f"shard {i}: {value}")
+        return {i: value for i, (_, value) in replies.items()}
+
+    def _call(self, shard: int, method: str, *args):
+        return self._call_many({shard: (method, args)})[shard]
+
+    def _broadcast(self, method: str, *args) -> Dict:
+        return self._call_many({i: (method, args) for i in range(self.shards)})
+
+    def shard_of(self, nft_id: str) -> int:
+        return shard_of(nft_id, self.shards)
+
+    def mint_nft(self, owner: str, name: str) -> NFT:
+        nft_id = str(uuid.uuid4())
+        return NFT.from_dict(self._call(self.shard_of(nft_id), "mint", owner, name, nft_id))
+
+    def get_nft(self, nft_id: str) -> NFT:
+        data = self._call(self.shard_of(nft_id), "get", nft_id)
+        return NFT.from_dict(data) if data else None
+
+    def get_owner_nfts(self, owner: str) -> List[NFT]:
+        replies = self._broadcast("owner_nfts", owner)
+        return [NFT.from_dict(data) for i in sorted(replies) for data in replies[i]]
+
+    def top_nfts(self, field: str = "value", limit: int = 10, offset: int = 0) -> List[NFT]:
+        """Leaderboard merged from the top limit + offset of every shard"""
+        replies = self._broadcast("top", field, limit + offset)
+        merged = sorted((entry for entries in replies.values() for entry in entries),
+                        key=lambda entry: (entry[0], entry[1]["id"]), reverse=True)
+        return [NFT.from_dict(data) for _, data in merged[offset:offset + limit]]
+
+    def transfer_nft(self, nft_id: str, from_owner: str, to_owner: str) -> bool:
+        return self._call(self.shard_of(nft_id), "transfer", nft_id, from_owner, to_owner)
+
+    def transfer_nfts(self, nft_ids: List[str], from_owner: str, to_owner: str) -> bool:
+        """Transfer several NFTs, possibly on different shards, all or nothing"""
+        by_shard: Dict[int, List[str]] = {}
+        for nft_id in dict.fromkeys(nft_ids):
+            by_shard.setdefault(self.shard_of(nft_id), []).append(nft_id)
+        if not by_shard:
+            return True
+        transfer_id = str(uuid.uuid4())
+        abort = {i: ("abort_transfer", (transfer_id,)) for i in by_shard}
+        with self._pending_lock:
+            self._deciding.add(transfer_id)
+        try:
+            try:
+                votes = self._call_many({i: ("prepare_transfer", (transfer_id, ids, from_owner))
+                                         for i, ids in by_shard.items()})
+            except ShardError:
+                # Release the NFTs held by shards that did prepare; the failed shard rolls
+                # back when it is restarted, as no commit was logged
+                self._exchange(abort)
+                raise
+            if not all(votes.values()):
+                self._call_many(abort)
+                return False
+            with self._pending_lock:
+                self._pending[transfer_id] = (set(by_shard), from_owner, to_owner)
+                self._write_log({"id": transfer_id, "shards": sorted(by_shard),
+                                 "from_owner": from_owner, "to_owner": to_owner}, sync=True)
+        finally:
+            with self._pending_lock:
+                self._deciding.discard(transfer_id)
+
+        replies = self._exchange({i: ("commit_transfer", (transfer_id, from_owner, to_owner))
+                                  for i in by_shard})
+        failed = []
+        for i, (ok, value) in sorted(replies.items()):
+            if ok:
+                self._applied(transfer_id, i)
+            else:
+                failed.append(f"shard {i}: {value}")
+        if failed:
+            raise ShardError("; ".join(failed) + " (the transfer is committed and completes when "
+                             "the shard is restarted)")
+        return True
+
+    def train_with_chat(self, nft_id: str, message: str) -> Dict:
+        return self.train_batch([(nft_id, message)])[0]
+
+    def train_batch(self, messages: List[Tuple[str, str]]) -> List[Dict]:
+        """NFTManager.train_batch, run by all shards in parallel"""
+        positions: Dict[int, List[int]] = {}
+        for i, (nft_id, _) in enumerate(messages):
+            positions.setdefault(self.shard_of(nft_id), []).append(i)
+        replies = self._call_many({shard: ("train_batch", ([messages[i] for i in idx],))
+                                   for shard, idx in positions.items()})
+        results: List[Dict] = [None] * len(messages)
+        for shard, idx in positions.items():
+            for i, result in zip(idx, replies[shard]):
+                results[i] = result
+        return results
+
+    def save_changes(self) -> int:
+        """Flush every shard's journal; returns how many NFTs were written"""
+        return sum(self._broadcast("save_changes").values())
+
+    def stats(self) -> Dict:
+        replies = self._broadcast("stats")
+        return {
+            "shards": self.shards,
+            "nfts": sum(r["nfts"] for r in replies.values()),
+            "unsaved": sum(r["unsaved"] for r in replies.values()),
+            "per_shard": [replies[i] for i in range(self.shards)],
+        }
+
+    def close(self) -> None:
+        """Save and stop every shard; shards that do not stop within the timeout are killed"""
+        deadline = time.monotonic() + self.timeout
+        for i, conn in enumerate(self._conns):
+            with self._locks[i]:
+                if i in self._broken:
+                    continue
+                try:
+                    conn.send(None)
+                    if conn.poll(max(0.0, deadline - time.monotonic())):
+                        conn.recv()
+                except (EOFError, OSError):
+                    pass
+        for process in self._processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        for conn in self._conns:
+            conn.close()
+        self._conns = []
+        self._processes = []
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
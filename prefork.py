@@ -0,0 +1,139 @@
+"""
+Pre-fork serving for a WSGI app.
+- The parent binds the listening socket and does the expensive setup (e.g. loading a
+  model) once, then forks `workers` children that all accept on that socket; the
+  kernel spreads connections across them.
+- Memory that the children only read (model weights, NumPy buffers) stays shared
+  copy-on-write. The parent calls gc.freeze() before forking so the collector does
+  not touch, and thereby copy, the pages of objects created during setup.
+- With `reload`, the parent polls it every `reload_interval` seconds. When it reports a
+  change (e.g. it swapped in a new model), a fresh set of workers is forked to share
+  the new state and the old ones finish their in-flight requests and exit, so memory
+  stays close to one copy across reloads.
+- Children that exit unexpectedly are replaced. SIGTERM / SIGINT stop them all; a
+  worker stops accepting on SIGTERM and exits once its requests are done.
+"""
+import gc
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Callable
+
+from werkzeug.serving import make_server
+
+RESPAWN_BACKOFF = 1.0  # seconds to wait before replacing a worker that died young
+POLL_INTERVAL = 0.2  # how often the parent reaps children when idle
+
+
+def _child(app, host: str, port: int, sock: socket.socket, after_fork: Callable) -> None:
+    code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        if after_fork is not None:
+            after_fork()
+        server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+        server.daemon_threads = False  # server_close waits for in-flight requests
+        # shutdown() blocks until serve_forever returns, so it cannot run in the handler itself
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=server.shutdown).start())
+        server.serve_forever()
+        server.server_close()
+    except KeyboardInterrupt:
+        pass
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def serve_prefork(app, host: str, port: int, workers: int, before_fork: Callable = None,
+                  after_fork: Callable = None, logger=None, reload: Callable[[], bool] = None,
+                  reload_interval: float = 2.0) -> None:
+    """Serve `app` from `workers` forked processes until SIGTERM / SIGINT"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.set_inheritable(True)
+
+    if before_fork is not None:
+        before_fork()
+    gc.freeze()
+
+    children = {}  # pid -> start time
+    retiring = set()  # workers replaced after a reload, finishing their requests
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            _child(app, host, port, sock, after_fork)
+        children[pid] = time.monotonic()
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children) + list(retiring):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def replace_workers() -> None:
+        gc.freeze()  # objects created by the reload are shared too
+        old = list(children)
+        for _ in range(workers):
+            spawn()
+        for pid in old:
+            del children[pid]
+            retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        if logger is not None:
+            logger.info("Reloaded; replaced %d worker processes", len(old))
+
+    for _ in range(workers):
+        spawn()
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if logger is not None:
+        logger.info("Serving on %s:%d with %d worker processes", host, port, workers)
+
+    next_reload = time.monotonic() + reload_interval
+    while children or retiring:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            retiring.discard(pid)
+            started = children.pop(pid, None)
+            if stopping or started is None:
+                continue
+            if logger is not None:
+                logger.warning("Worker %d exited with status %d; starting a new one", pid, status)
+            if time.monotonic() - started < RESPAWN_BACKOFF:
+                time.sleep(RESPAWN_BACKOFF)
+            spawn()
+            continue
+        if not stopping and reload is not None and time.monotonic() >= next_reload:
+            try:
+                changed = reload()
+            except Exception:
+                changed = False
+                if logger is not None:
+                    logger.exception("Reload check failed")
+            if changed:
+                replace_workers()
+            next_reload = time.monotonic() + reload_interval
+        time.sleep(POLL_INTERVAL)
+    sock.close()
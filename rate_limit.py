@@ -0,0 +1,126 @@
+"""
+Rate limiting with O(1) state per key.
+- Sliding-window counter: each key keeps the request counts of the current and the
+  previous fixed window, and the previous count is weighted by how much of it still
+  overlaps the sliding window. Requests that are refused are not counted.
+- `MemoryBackend` keeps counters in lock-striped shards of one process and evicts
+  idle keys on a background thread.
+- `RedisBackend` keeps them in Redis (INCR + EXPIRE per window), so several API
+  processes share one limit and Redis expires idle keys itself.
+- A backend is anything with `hit(key, limit, window, now) -> (allowed, retry_after)`.
+"""
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+def _retry_after(previous: float, current: int, limit: int, window: float, elapsed: float) -> float:
+    """Seconds until a request would be allowed again, assuming no other requests"""
+    if current >= limit or not previous:
+        return window - elapsed  # the current count only drops out at the next window
+    # previous * (1 - t / window) + current < limit  =>  t > window * (1 - (limit - current) / previous)
+    return max(0.0, window * (1 - (limit - current) / previous) - elapsed)
+
+
+class MemoryBackend:
+    """Counters of one process, in `stripes` independently locked shards"""
+
+    def __init__(self, stripes: int = 16, evict_interval: float = 60.0):
+        # key -> [window index, previous count, current count, expires at]
+        self._shards: List[Tuple[Dict[str, list], threading.Lock]] = [
+            ({}, threading.Lock()) for _ in range(stripes)
+        ]
+        self._stop = threading.Event()
+        self._evictor = None
+        if evict_interval:
+            self._evictor = threading.Thread(target=self._evict_loop, args=(evict_interval,), daemon=True)
+            self._evictor.start()
+
+    def _shard(self, key: str):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        counts, lock = self._shard(key)
+        index = int(now // window)
+        elapsed = now - index * window
+        with lock:
+            state = counts.get(key)
+            if state is None:
+                state = counts[key] = [index, 0, 0, 0.0]
+            elif state[0] != index:
+                state[1] = state[2] if state[0] == index - 1 else 0
+                state[0] = index
+                state[2] = 0
+            previous = state[1] * (1 - elapsed / window)
+            if previous + state[2] >= limit:
+                return False, _retry_after(state[1], state[2], limit, window, elapsed)
+            state[2] += 1
+            state[3] = (index + 2) * window  # both windows have slid past by then
+            return True, 0.0
+
+    def evict(self, now: float = None) -> int:
+        """Drop keys with no requests left in their sliding window; returns how many"""
+        now = time.time() if now is None else now
+        evicted = 0
+        for counts, lock in self._shards:
+            with lock:  # one shard at a time, so requests on other shards keep flowing
+                idle = [key for key, state in counts.items() if state[3] <= now]
+                for key in idle:
+                    del counts[key]
+            evicted += len(idle)
+        return evicted
+
+    def _evict_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.evict()
+
+    def __len__(self) -> int:
+        return sum(len(counts) for counts, _ in self._shards)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._evictor is not None:
+            self._evictor.join()
+
+
+class RedisBackend:
+    """Counters in Redis (or anything with its get/incr/decr/expire/pipeline commands)"""
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> Tuple[bool, float]:
+        index = int(now // window)
+        elapsed = now - index * window
+        current_key = f"{self.prefix}{key}:{index}"
+        pipe = self.client.pipeline()
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(2 * window) + 1)
+        pipe.get(f"{self.prefix}{key}:{index - 1}")
+        current, _, previous = pipe.execute()
+        previous = int(previous or 0)
+        current = int(current) - 1  # requests before this one
+        if previous * (1 - elapsed / window) + current >= limit:
+            self.client.decr(current_key)  # refused requests do not count
+            return False, _retry_after(previous, current, limit, window, elapsed)
+        return True, 0.0
+
+    def close(self) -> None:
+        pass
+
+
+class RateLimiter:
+    """At most `limit` requests per key in any sliding `window` seconds"""
+
+    def __init__(self, limit: int, window: float = 60.0, backend=None):
+        self.limit = limit
+        self.window = window
+        self.backend = backend if backend is not None else MemoryBackend()
+
+    def hit(self, key: str, now: float = None) -> Tuple[bool, float]:
+        """Count a request for `key`; (allowed, seconds to wait when refused)"""
+        return self.backend.hit(key, self.limit, self.window, time.time() if now is None else now)
+
+    def close(self) -> None:
+        self.backend.close()
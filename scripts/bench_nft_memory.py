@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+bench_nft_memory.py
+
+Measures heap bytes per NFT with a full training history (100 records) for the
+compact layout (__slots__ + NumPy ring buffer + interned messages) against the
+previous layout (plain object + list of record dicts), using tracemalloc.
+
+Run from the repository root:
+    python scripts/bench_nft_memory.py --nfts 2000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nft import NFT, SimpleNeuralNetwork, message_features  # noqa: E402
+from training_history import HISTORY_SIZE  # noqa: E402
+
+MESSAGES = [f"training message number {i} about the weather" for i in range(200)]
+
+
+class LegacyNFT:
+    """Attribute layout of NFT before the compact representation"""
+
+    def __init__(self, owner, name):
+        self.id = "00000000-0000-0000-0000-000000000000"
+        self.owner = owner
+        self.name = name
+        self.value = 1.0
+        self.difficulty = 1.0
+        self.last_train = 0
+        self.created_at = time.time()
+        self.neural_network = SimpleNeuralNetwork()
+        self.training_history = []
+        self.intelligence = 1.0
+
+
+def fill(nft, records):
+    for _ in range(records):
+        message = random.choice(MESSAGES)
+        record = {
+            "timestamp": time.time(),
+            "message": message[:50],
+            "error": random.random(),
+            "inputs": message_features(message),
+            "prediction": random.random()
+        }
+        nft.training_history.append(record)
+
+
+def measure(factory, count, records):
+    random.seed(0)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nfts = []
+    for i in range(count):
+        nft = factory(f"owner{i % 100}", f"nft{i}")
+        fill(nft, records)
+        nfts.append(nft)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bytes per NFT before and after the compact layout")
+    parser.add_argument("--nfts", type=int, default=2000, help="Number of NFTs to build")
+    parser.add_argument("--records", type=int, default=HISTORY_SIZE, help="Training records per NFT")
+    args = parser.parse_args()
+
+    legacy = measure(LegacyNFT, args.nfts, args.records)
+    compact = measure(NFT, args.nfts, args.records)
+
+    print(f"NFTs: {args.nfts}, records per NFT: {args.records}")
+    print(f"before (dict records): {legacy:,.0f} bytes/NFT")
+    print(f"after (ring buffer):   {compact:,.0f} bytes/NFT")
+    print(f"reduction:             {legacy / compact:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+bench_nft_predict.py
+
+Compares NFTManager.predict_batch with the per-item path
+(get_nft + SimpleNeuralNetwork.predict) for a collection of NFTs.
+
+Run from the repository root:
+    python scripts/bench_nft_predict.py --nfts 10000
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from nft import NFTManager  # noqa: E402
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch vs per-item NFT inference")
+    parser.add_argument("--nfts", type=int, default=10000, help="Number of NFTs to score")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path; best time is reported")
+    args = parser.parse_args()
+
+    manager = NFTManager()
+    ids = [manager.mint_nft(f"owner{i % 100}", f"nft{i}").id for i in range(args.nfts)]
+    inputs = np.random.rand(args.nfts, manager.store.input_size)
+
+    def per_item():
+        return [manager.get_nft(nft_id).neural_network.predict(x) for nft_id, x in zip(ids, inputs.tolist())]
+
+    def batch():
+        return manager.predict_batch(ids, inputs)
+
+    item_time, item_preds = timed(per_item, args.repeat)
+    batch_time, batch_preds = timed(batch, args.repeat)
+    assert np.allclose(item_preds, batch_preds)
+
+    print(f"NFTs:      {args.nfts}")
+    print(f"per-item:  {item_time * 1000:.2f} ms ({args.nfts / item_time:,.0f} predictions/s)")
+    print(f"batch:     {batch_time * 1000:.2f} ms ({args.nfts / batch_time:,.0f} predictions/s)")
+    print(f"speedup:   {item_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
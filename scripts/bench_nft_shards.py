@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+bench_nft_shards.py
+
+Measures NFT training throughput of a single NFTManager against
+ShardedNFTManager with increasing shard counts. The training cooldown is
+disabled (before the shards fork) so every round trains every NFT.
+
+Run from the repository root:
+    python scripts/bench_nft_shards.py --nfts 20000 --shards 1 2 4
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+import nft  # noqa: E402
+from nft import NFTManager  # noqa: E402
+from nft_shards import ShardedNFTManager  # noqa: E402
+
+
+def run(manager, args):
+    ids = [manager.mint_nft(f"owner{i % 100}", f"nft{i}").id for i in range(args.nfts)]
+    messages = [(nft_id, f"hello from chat message number {i}") for i, nft_id in enumerate(ids)]
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        results = manager.train_batch(messages)
+    elapsed = time.perf_counter() - start
+    assert all(r.get("success") for r in results)
+    return args.nfts * args.rounds / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded NFT training throughput")
+    parser.add_argument("--nfts", type=int, default=20000, help="Number of NFTs to train")
+    parser.add_argument("--rounds", type=int, default=5, help="Training rounds over every NFT")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4], help="Shard counts to try")
+    args = parser.parse_args()
+
+    nft.TRAIN_COOLDOWN = 0
+    base = run(NFTManager(), args)
+    print(f"NFTs:        {args.nfts} x {args.rounds} rounds")
+    print(f"in-process:  {base:,.0f} trainings/s")
+    for shards in args.shards:
+        with ShardedNFTManager(shards) as manager:
+            rate = run(manager, args)
+        print(f"{shards:>2} shard(s): {rate:,.0f} trainings/s ({rate / base:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+bench_predict_payloads.py
+
+Compares /predict request and response sizes and round-trip latency for
+JSON, .npy and msgpack tensor payloads. Latency covers encoding on the
+client, the request, decoding on the worker, prediction and decoding the
+response. By default the worker runs in-process with a linear model and
+the prediction cache disabled; --url benchmarks a running worker instead.
+
+Run from the repository root:
+    python scripts/bench_predict_payloads.py --rows 1 64 1024 --features 32
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import tempfile
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from tensor_codec import MSGPACK_TYPE, NPY_TYPE, decode_tensor, encode_tensor  # noqa: E402
+
+FORMATS = ("json", "npy", "msgpack")
+CONTENT_TYPES = {"json": "application/json", "npy": NPY_TYPE, "msgpack": MSGPACK_TYPE}
+
+
+class LinearModel:
+    def __init__(self, weights):
+        self.weights = weights
+
+    def predict(self, X):
+        return X @ self.weights
+
+
+def encode(rows, fmt):
+    if fmt == "json":
+        return json.dumps({"features": rows.tolist()}).encode()
+    return encode_tensor(rows, CONTENT_TYPES[fmt])
+
+
+def decode(body, fmt):
+    if fmt == "json":
+        return np.asarray(json.loads(body)["predictions"])
+    return decode_tensor(body, CONTENT_TYPES[fmt])
+
+
+def in_process_client(features):
+    """post(body, content type) -> response body, against an in-process ml_worker"""
+    path = os.path.join(tempfile.mkdtemp(), "model.pkl")
+    with open(path, "wb") as fh:
+        pickle.dump(LinearModel(np.random.default_rng(0).standard_normal(features)), fh)
+    os.environ.update(ML_MODEL_PATH=path, ML_CACHE_SIZE="0", ML_MODEL_POLL_SECONDS="0")
+    import ml_worker
+    client = ml_worker.app.test_client()
+
+    def post(body, content_type):
+        response = client.post("/predict", data=body, content_type=content_type)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_data()
+    return post
+
+
+def http_client(url):
+    def post(body, content_type):
+        request = urllib.request.Request(url.rstrip("/") + "/predict", data=body,
+                                         headers={"Content-Type": content_type})
+        with urllib.request.urlopen(request) as response:
+            return response.read()
+    return post
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /predict payload formats")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 64, 1024], help="Rows per request")
+    parser.add_argument("--features", type=int, default=32, help="Features per row")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per format and size")
+    parser.add_argument("--url", help="Benchmark a running ML worker instead, e.g. http://localhost:5001")
+    args = parser.parse_args()
+
+    post = http_client(args.url) if args.url else in_process_client(args.features)
+    rng = np.random.default_rng(1)
+    print(f"{'rows':>6} {'format':<8} {'request B':>10} {'response B':>11} {'mean ms':>8} {'p95 ms':>8}")
+    for n in args.rows:
+        rows = rng.standard_normal((n, args.features))
+        expected = None
+        for fmt in FORMATS:
+            content_type = CONTENT_TYPES[fmt]
+            request_size = len(encode(rows, fmt))
+            latencies = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                body = post(encode(rows, fmt), content_type)
+                preds = decode(body, fmt)
+                latencies.append(time.perf_counter() - start)
+            if expected is None:
+                expected = preds
+            assert np.allclose(preds, expected), f"{fmt} predictions differ from JSON"
+            latencies.sort()
+            mean = sum(latencies) / len(latencies) * 1000
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+            print(f"{n:>6} {fmt:<8} {request_size:>10,} {len(body):>11,} {mean:>8.3f} {p95:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+export_model.py
+
+Converts a pickled model into a model directory the ML worker loads with
+memory-mapped weights (see model_registry.save_model). Writing into a new
+entry of a versioned ML_MODEL_PATH directory hot-swaps it in.
+
+Run from the repository root:
+    python scripts/export_model.py model.pkl models/v002 --warmup sample.npy
+"""
+import os
+import sys
+import pickle
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from model_registry import MIN_MAPPED_BYTES, WARMUP_FILE, save_model  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a pickled model as a memory-mappable model directory")
+    parser.add_argument("model", help="Pickled model file")
+    parser.add_argument("directory", help="Model directory to create")
+    parser.add_argument("--warmup", help="Optional .npy batch used to warm the model up before serving")
+    parser.add_argument("--min-mapped-bytes", type=int, default=MIN_MAPPED_BYTES,
+                        help="Arrays at least this large are memory-mapped")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as fh:
+        model = pickle.load(fh)
+    os.makedirs(args.directory, exist_ok=True)
+    if args.warmup:
+        # Copied before save_model writes model.pkl, which marks the directory complete
+        shutil.copyfile(args.warmup, os.path.join(args.directory, WARMUP_FILE))
+    save_model(model, args.directory, args.min_mapped_bytes)
+    print(f"Exported {args.model} to {args.directory}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Binary tensor payloads for the ML worker.
+- `application/x-npy`: a NumPy .npy file (format 1.0 - 3.0, no pickled objects).
+- `application/x-msgpack`: a MessagePack map {"dtype": "<f8", "shape": [rows, cols],
+  "data": <bin>}, as produced by e.g. `msgpack.packb` or `encode_msgpack`. Only the
+  subset of MessagePack such a map needs is implemented, so the msgpack package is
+  not required.
+- Decoding returns a read-only ndarray viewing the request bytes, without copying.
+  Only numeric dtypes and 1-D / 2-D shapes are accepted, and the byte count must
+  match dtype and shape exactly.
+- Every malformed payload raises TensorError; msgpack nesting is limited to
+  MAX_DEPTH levels.
+"""
+import ast
+import io
+import math
+import struct
+from typing import Tuple
+
+import numpy as np
+
+NPY_TYPE = "application/x-npy"
+MSGPACK_TYPE = "application/x-msgpack"
+TENSOR_TYPES = (NPY_TYPE, MSGPACK_TYPE)
+NUMERIC_KINDS = "biuf"
+MAX_DIMS = 2
+MAX_DEPTH = 8  # a tensor map needs 2: the map and its shape array
+
+
+class TensorError(ValueError):
+    pass
+
+
+def _dtype(descr) -> np.dtype:
+    try:
+        dtype = np.dtype(descr)
+    except (TypeError, ValueError):
+        raise TensorError(f"unsupported dtype {descr!r}")
+    if dtype.kind not in NUMERIC_KINDS or dtype.fields is not None or dtype.subdtype is not None:
+        raise TensorError(f"dtype must be numeric, got {dtype.str}")
+    return dtype
+
+
+def _shape(shape) -> Tuple[int, ...]:
+    if (not isinstance(shape, (list, tuple)) or not 1 <= len(shape) <= MAX_DIMS
+            or not all(isinstance(d, int) and d >= 0 for d in shape)):
+        raise TensorError(f"shape must have 1 to {MAX_DIMS} non-negative dimensions, got {shape!r}")
+    return tuple(shape)
+
+
+def _view(buffer: memoryview, dtype: np.dtype, shape: Tuple[int, ...], order: str = "C") -> np.ndarray:
+    count = math.prod(shape)  # Python ints: np.prod would wrap around at 64 bits
+    if len(buffer) != count * dtype.itemsize:
+        raise TensorError(f"expected {count * dtype.itemsize} data bytes for {dtype.str}{list(shape)}, "
+                          f"got {len(buffer)}")
+    try:
+        return np.frombuffer(buffer, dtype=dtype, count=count).reshape(shape, order=order)
+    except ValueError as e:  # e.g. a zero-size shape with a dimension too large for NumPy
+        raise TensorError(f"unsupported shape {list(shape)}: {e}")
+
+
+def decode_npy(data) -> np.ndarray:
+    view = memoryview(data)
+    if bytes(view[:6]) != b"\x93NUMPY" or len(view) < 10:
+        raise TensorError("not an .npy payload")
+    major = view[6]
+    if major == 1:
+        start, header_len = 10, struct.unpack_from("<H", view, 8)[0]
+    elif major in (2, 3):
+        start, header_len = 12, struct.unpack_from("<I", view, 8)[0]
+    else:
+        raise TensorError(f"unsupported .npy format version {major}")
+    try:
+        header = ast.literal_eval(bytes(view[start:start + header_len]).decode("latin1"))
+        descr, fortran, shape = header["descr"], header["fortran_order"], header["shape"]
+    except (ValueError, SyntaxError, KeyError, TypeError, RecursionError, MemoryError):
+        raise TensorError("malformed .npy header")
+    return _view(view[start + header_len:], _dtype(descr), _shape(shape), "F" if fortran else "C")
+
+
+def encode_npy(array: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    np.lib.format.write_array(buf, np.asarray(array), allow_pickle=False)
+    return buf.getvalue()
+
+
+class _Unpacker:
+    """Reads the MessagePack subset used by tensor maps; bin values stay views"""
+
+    def __init__(self, data):
+        self.view = memoryview(data)
+        self.pos = 0
+
+    def _take(self, size: int) -> memoryview:
+        if self.pos + size > len(self.view):
+            raise TensorError("truncated msgpack payload")
+        chunk = self.view[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def _uint(self, size: int) -> int:
+        return int.from_bytes(self._take(size), "big")
+
+    def value(self, depth: int = 0):
+        tag = self._uint(1)
+        if tag <= 0x7f:
+            return tag
+        if 0x80 <= tag <= 0x8f:
+            return self._map(tag & 0x0f, depth + 1)
+        if 0x90 <= tag <= 0x9f:
+            return self._array(tag & 0x0f, depth + 1)
+        if 0xa0 <= tag <= 0xbf:
+            return self._str(tag & 0x1f)
+        sizes = {0xcc: 1, 0xcd: 2, 0xce: 4, 0xcf: 8}
+        if tag in sizes:
+            return self._uint(sizes[tag])
+        if tag in (0xd9, 0xda, 0xdb):
+            return self._str(self._uint({0xd9: 1, 0xda: 2, 0xdb: 4}[tag]))
+        if tag in (0xc4, 0xc5, 0xc6):
+            return self._take(self._uint({0xc4: 1, 0xc5: 2, 0xc6: 4}[tag]))
+        if tag in (0xdc, 0xdd):
+            return self._array(self._uint(2 if tag == 0xdc else 4), depth + 1)
+        if tag in (0xde, 0xdf):
+            return self._map(self._uint(2 if tag == 0xde else 4), depth + 1)
+        raise TensorError(f"unsupported msgpack type 0x{tag:02x}")
+
+    def _str(self, size: int) -> str:
+        try:
+            return bytes(self._take(size)).decode()
+        except UnicodeDecodeError:
+            raise TensorError("msgpack string is not valid UTF-8")
+
+    def _array(self, size: int, depth: int) -> list:
+        if depth > MAX_DEPTH:
+            raise TensorError(f"msgpack nesting deeper than {MAX_DEPTH}")
+        return [self.value(depth) for _ in range(size)]
+
+    def _map(self, size: int, depth: int) -> dict:
+        if depth > MAX_DEPTH:
+            raise TensorError(f"msgpack nesting deeper than {MAX_DEPTH}")
+        result = {}
+        for _ in range(size):
+            key = self.value(depth)
+            result[key if isinstance(key, str) else str(key)] = self.value(depth)
+        return result
+
+
+def decode_msgpack(data) -> np.ndarray:
+    unpacker = _Unpacker(data)
+    message = unpacker.value()
+    if not isinstance(message, dict) or unpacker.pos != len(unpacker.view):
+        raise TensorError("expected a single msgpack map")
+    buffer = message.get("data")
+    if not isinstance(buffer, memoryview):
+        raise TensorError("msgpack tensor needs a bin `data` field")
+    return _view(buffer, _dtype(message.get("dtype")), _shape(message.get("shape")))
+
+
+def _pack_uint(value: int) -> bytes:
+    if value < 0x80:
+        return bytes((value,))
+    for tag, size in ((0xcc, 1), (0xcd, 2), (0xce, 4), (0xcf, 8)):
+        if value < 1 << (8 * size):
+            return bytes((tag,)) + value.to_bytes(size, "big")
+    raise TensorError("integer too large for msgpack")
+
+
+def _pack_str(value: str) -> bytes:
+    data = value.encode()
+    if len(data) < 32:
+        return bytes((0xa0 | len(data),)) + data
+    return b"\xd9" + bytes((len(data),)) + data
+
+
+def encode_msgpack(array: np.ndarray) -> bytes:
+    array = np.ascontiguousarray(array)
+    if len(array.shape) > 15:
+        raise TensorError("too many dimensions")
+    data = array.reshape(-1).view(np.uint8).data  # memoryview.cast refuses zero-size shapes
+    if len(data) < 1 << 8:
+        bin_header = b"\xc4" + len(data).to_bytes(1, "big")
+    elif len(data) < 1 << 16:
+        bin_header = b"\xc5" + len(data).to_bytes(2, "big")
+    else:
+        bin_header = b"\xc6" + len(data).to_bytes(4, "big")
+    return b"".join((
+        b"\x83",
+        _pack_str("dtype"), _pack_str(array.dtype.str),
+        _pack_str("shape"), bytes((0x90 | array.ndim,)), *(_pack_uint(d) for d in array.shape),
+        _pack_str("data"), bin_header, data,
+    ))
+
+
+def decode_tensor(data, content_type: str) -> np.ndarray:
+    if content_type == NPY_TYPE:
+        return decode_npy(data)
+    if content_type == MSGPACK_TYPE:
+        return decode_msgpack(data)
+    raise TensorError(f"unsupported content type {content_type}")
+
+
+def encode_tensor(array: np.ndarray, content_type: str) -> bytes:
+    array = np.asarray(array)
+    _dtype(array.dtype)
+    if content_type == NPY_TYPE:
+        return encode_npy(array)
+    if content_type == MSGPACK_TYPE:
+        return encode_msgpack(array)
+    raise TensorError(f"unsupported content type {content_type}")
@@ -0,0 +1,66 @@
+"""In-process stand-in for the subset of the Redis client API used by RedisBackend"""
+import threading
+import time
+from typing import Dict
+
+
+class FakeRedis:
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.data: Dict[str, int] = {}
+        self.expires: Dict[str, float] = {}
+        self.lock = threading.RLock()  # re-entered by pipelines
+
+    def _live(self, key: str) -> bool:
+        expires = self.expires.get(key)
+        if expires is not None and expires <= self.clock():
+            del self.data[key]
+            del self.expires[key]
+        return key in self.data
+
+    def get(self, key: str):
+        with self.lock:
+            return str(self.data[key]).encode() if self._live(key) else None
+
+    def incr(self, key: str, amount: int = 1) -> int:
+        with self.lock:
+            value = (self.data[key] if self._live(key) else 0) + amount
+            self.data[key] = value
+            return value
+
+    def decr(self, key: str, amount: int = 1) -> int:
+        return self.incr(key, -amount)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        with self.lock:
+            if not self._live(key):
+                return False
+            self.expires[key] = self.clock() + seconds
+            return True
+
+    def keys(self):
+        with self.lock:
+            return [key for key in list(self.data) if self._live(key)]
+
+    def pipeline(self) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Queues commands and runs them together under the client lock, like MULTI/EXEC"""
+
+    def __init__(self, client: FakeRedis):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+            return self
+        return queue
+
+    def execute(self) -> list:
+        with self.client.lock:
+            results = [getattr(self.client, name)(*args) for name, args in self.commands]
+        self.commands = []
+        return results
@@ -0,0 +1,35 @@
+import threading
+from types import SimpleNamespace
+
+from accounts import AccountIndex
+
+
+def block(*transfers):
+    return SimpleNamespace(transactions=[{"sender": s, "recipient": r, "amount": a} for s, r, a in transfers])
+
+
+def test_rebuild_recomputes_balances():
+    index = AccountIndex()
+    index.apply_block(block(("alice", "bob", 5.0)))
+    index.rebuild([SimpleNamespace(transactions=["genesis"]), block(("alice", "bob", 2.0))])
+    assert index.height == 2
+    assert index.balance("bob") == 2.0
+    assert index.balance("alice") == -2.0
+
+
+def test_apply_block_waits_for_a_running_rebuild():
+    index = AccountIndex()
+    late = block(("carol", "dave", 1.0))
+    applier = threading.Thread(target=index.apply_block, args=(late,))
+
+    def chain():
+        yield block(("alice", "bob", 5.0))
+        applier.start()
+        applier.join(0.2)
+        assert applier.is_alive(), "apply_block ran in the middle of rebuild"
+        yield block(("bob", "alice", 1.0))
+
+    index.rebuild(chain())
+    applier.join()
+    assert index.height == 3
+    assert index.bulk_balances(["alice", "bob", "dave"]) == {"alice": -4.0, "bob": 4.0, "dave": 1.0}
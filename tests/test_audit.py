@@ -0,0 +1,82 @@
+import threading
+import time
+
+import audit
+from audit import AuditBatcher
+
+
+def _record(i):
+    return {"id": f"task-{i}", "task": "train_model", "meta": {"n": i}}
+
+
+def test_batch_is_anchored_with_proofs():
+    roots = []
+    batcher = AuditBatcher(lambda root: roots.append(root) or f"0x{len(roots):064x}", max_batch=4)
+    for i in range(3):
+        batcher.submit(_record(i))
+    batcher.flush()
+
+    proof = batcher.proof("task-1")
+    assert proof["status"] == "anchored"
+    assert proof["root"] == roots[0]
+    assert batcher.pending == 0
+
+
+def test_withdraw_drops_only_unsealed_records():
+    batcher = AuditBatcher(lambda root: "0x1", max_batch=4)
+    batcher.submit(_record(0))
+    batcher.submit(_record(1))
+
+    assert batcher.withdraw("task-1")
+    assert batcher.proof("task-1") is None
+    assert batcher.pending == 1
+
+    batcher.flush()
+    assert not batcher.withdraw("task-0")
+    assert batcher.proof("task-0")["status"] == "anchored"
+
+
+def test_withdraw_while_a_batch_is_being_sealed(monkeypatch):
+    hashing, release = threading.Event(), threading.Event()
+    real_root = audit.merkle_root
+
+    def slow_root(records):
+        hashing.set()
+        release.wait(5)
+        return real_root(records)
+
+    monkeypatch.setattr(audit, "merkle_root", slow_root)
+    batcher = AuditBatcher(lambda root: "0x1", max_batch=1)
+    batcher.submit(_record(0))
+    sealer = threading.Thread(target=batcher.flush)
+    sealer.start()
+    assert hashing.wait(5)
+
+    assert not batcher.withdraw("task-0")  # out of the open batch, not yet located
+
+    release.set()
+    sealer.join()
+    assert batcher.proof("task-0")["status"] == "anchored"
+
+
+def test_flush_and_background_thread_anchor_each_batch_once():
+    lock = threading.Lock()
+    anchored = []
+
+    def anchor(root):
+        time.sleep(0.01)
+        with lock:
+            anchored.append(root)
+        return "0x1"
+
+    batcher = AuditBatcher(anchor, max_batch=2, max_delay=0.0)
+    batcher.start()
+    for i in range(40):
+        batcher.submit(_record(i))
+        if i % 7 == 0:
+            batcher.flush()
+    batcher.stop()
+
+    assert len(anchored) == len(set(anchored)) == batcher.stats["batches"]
+    assert batcher.pending == 0
+    assert all(batcher.proof(f"task-{i}")["status"] == "anchored" for i in range(40))
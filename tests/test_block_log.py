@@ -0,0 +1,140 @@
+import os
+
+from core.block_log import INDEX_ENTRY, INDEX_FILE, INDEX_HEADER, KEYS_FILE, KEYS_HEADER, KEYS_MAGIC, BlockLog
+
+
+def _append_blocks(log, start, count):
+    for i in range(start, start + count):
+        log.append(f"block {i}".encode(), f"key {i}".encode())
+
+
+def test_reopen_keeps_records(tmp_path):
+    log = BlockLog(str(tmp_path))
+    _append_blocks(log, 0, 5)
+    log.close()
+
+    log = BlockLog(str(tmp_path))
+    assert [bytes(p) for p in log] == [f"block {i}".encode() for i in range(5)]
+    assert log.find(b"key 3") == 3
+    log.close()
+
+
+def test_torn_segment_tail_is_truncated(tmp_path):
+    log = BlockLog(str(tmp_path))
+    _append_blocks(log, 0, 3)
+    segment = log._segment_path(log.segment)
+    log.close()
+    with open(segment, "ab") as f:
+        f.write(b"\0\0\0\xffpartial")
+
+    log = BlockLog(str(tmp_path))
+    assert len(log) == 3
+    assert log.truncated_bytes == 11
+    log.close()
+
+
+def test_torn_index_entry_is_removed(tmp_path):
+    index = os.path.join(str(tmp_path), INDEX_FILE)
+    log = BlockLog(str(tmp_path))
+    _append_blocks(log, 0, 5)
+    log.close()
+    with open(index, "ab") as f:
+        f.write(b"\x01" * 7)
+
+    log = BlockLog(str(tmp_path))
+    assert os.path.getsize(index) == INDEX_HEADER.size + 5 * INDEX_ENTRY.size
+    _append_blocks(log, 5, 1)
+    log.close()
+
+    log = BlockLog(str(tmp_path))
+    assert os.path.getsize(index) == INDEX_HEADER.size + 6 * INDEX_ENTRY.size
+    assert [bytes(p) for p in log] == [f"block {i}".encode() for i in range(6)]
+    assert [log.find(f"key {i}".encode()) for i in range(6)] == list(range(6))
+    log.close()
+
+
+def test_find_returns_newest_height_for_a_key(tmp_path):
+    log = BlockLog(str(tmp_path))
+    _append_blocks(log, 0, 3)
+    log.append(b"again", b"key 1")
+    assert log.find(b"key 1") == 3
+    assert log.find(b"missing") is None
+    log.close()
+
+    log = BlockLog(str(tmp_path))
+    assert log.find(b"key 1") == 3
+    assert log.find(b"key 2") == 2
+    log.close()
+
+
+def test_legacy_index_is_rebuilt_from_segments(tmp_path):
+    log = BlockLog(str(tmp_path), segment_size=64)
+    _append_blocks(log, 0, 10)
+    log.close()
+    # An index in the earlier header-less 12-byte format
+    with open(os.path.join(str(tmp_path), INDEX_FILE), "wb") as f:
+        f.write(b"\0" * 12 * 10)
+
+    log = BlockLog(str(tmp_path), key_of=lambda payload: payload.replace(b"block", b"key"))
+    assert log.rebuilt_index
+    assert [bytes(p) for p in log] == [f"block {i}".encode() for i in range(10)]
+    assert log.find(b"key 7") == 7
+    log.close()
+
+
+def test_missing_index_is_rebuilt(tmp_path):
+    log = BlockLog(str(tmp_path))
+    _append_blocks(log, 0, 4)
+    log.close()
+    os.remove(os.path.join(str(tmp_path), INDEX_FILE))
+
+    log = BlockLog(str(tmp_path))
+    assert len(log) == 4
+    log.append(b"block 4")
+    log.close()
+
+    log = BlockLog(str(tmp_path))
+    assert len(log) == 5
+    log.close()
+
+
+def test_keys_are_found_across_merges_and_reopens(tmp_path):
+    log = BlockLog(str(tmp_path), merge_keys=4)
+    _append_blocks(log, 0, 18)
+    log.append(b"again", b"key 5")
+    assert len(log._recent) < 4  # the rest went to the key file
+    assert [log.find(f"key {i}".encode()) for i in range(18)] == [i if i != 5 else 18 for i in range(18)]
+    log.close()
+
+    log = BlockLog(str(tmp_path), merge_keys=4)
+    assert len(log._recent) < 4  # opening reads only the keys newer than the key file
+    assert log.find(b"key 5") == 18
+    assert log.find(b"key 17") == 17
+    assert log.find(b"key 99") is None
+    assert log.find(b"") is None
+    log.close()
+
+
+def test_stale_key_file_is_rebuilt(tmp_path):
+    log = BlockLog(str(tmp_path), merge_keys=4)
+    _append_blocks(log, 0, 10)
+    log.close()
+    # A key file that claims more heights than the index has, e.g. after a torn tail was cut
+    with open(os.path.join(str(tmp_path), KEYS_FILE), "r+b") as f:
+        f.write(KEYS_HEADER.pack(KEYS_MAGIC, 50))
+
+    log = BlockLog(str(tmp_path), merge_keys=4)
+    assert [log.find(f"key {i}".encode()) for i in range(10)] == list(range(10))
+    log.close()
+
+
+def test_legacy_log_without_key_file_gets_one(tmp_path):
+    log = BlockLog(str(tmp_path), merge_keys=1000)
+    _append_blocks(log, 0, 6)
+    log.close()
+    os.remove(os.path.join(str(tmp_path), KEYS_FILE))
+
+    log = BlockLog(str(tmp_path), merge_keys=4)
+    assert not log._recent
+    assert [log.find(f"key {i}".encode()) for i in range(6)] == list(range(6))
+    log.close()
@@ -0,0 +1,60 @@
+import os
+import random
+import threading
+
+import pytest
+
+import core.blockchain as core_chain
+from core.block_log import INDEX_FILE
+
+
+@pytest.fixture
+def chain_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(core_chain, "CHAIN_LOG_DIR", str(tmp_path / "chain"))
+    monkeypatch.setattr(core_chain, "CHAIN_FILE", str(tmp_path / "chain.json"))
+    return tmp_path / "chain"
+
+
+def _mine(blocks):
+    chain = core_chain.Blockchain(difficulty=1)
+    for i in range(blocks):
+        chain.mine_block([{"n": i}])
+    hashes = [b.hash for b in chain.chain]
+    chain.close()
+    return hashes
+
+
+def test_lazy_chain_serves_concurrent_readers(chain_dir):
+    hashes = _mine(40)
+    chain = core_chain.Blockchain(difficulty=1, lazy=True, recent_blocks=4, cache_blocks=8)
+    errors = []
+
+    def read():
+        rng = random.Random()
+        for _ in range(300):
+            height = rng.randrange(len(hashes))
+            if chain.chain[height].hash != hashes[height]:
+                errors.append(height)
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(chain.chain.cache) <= 8
+    assert len(chain.chain.recent) <= 4
+    chain.close()
+
+
+def test_blocks_are_found_by_hash_after_index_rebuild(chain_dir):
+    hashes = _mine(10)
+    os.remove(os.path.join(str(chain_dir), INDEX_FILE))
+
+    chain = core_chain.Blockchain(difficulty=1, lazy=True)
+    assert chain.log.rebuilt_index
+    assert [chain.get_block_by_hash(h).index for h in hashes] == list(range(len(hashes)))
+    mined = chain.mine_block([{"n": "new"}])
+    assert chain.get_block_by_hash(mined.hash) is mined
+    chain.close()
@@ -0,0 +1,98 @@
+import pytest
+
+from core.blockchain import Block
+from core.encoding import EncodingError, Reader, U64, decode_value, encode_value
+from core.transaction import Transaction
+
+TRANSACTION_BYTES = bytes.fromhex(
+    "01"                                      # version
+    "00000005" "616c696365"                   # sender "alice"
+    "00000003" "626f62"                       # receiver "bob"
+    "4029000000000000"                        # amount 12.5
+    "41d954fc40000000"                        # timestamp 1700000000.0
+    "07" "00000002"                           # meta: dict of 2, keys sorted
+    "00000001" "6e" "03" "0000000000000003"   # "n": 3
+    "00000004" "6e6f7465" "05" "00000002" "6869"  # "note": "hi"
+)
+TRANSACTION_ID = "d3424bfd892d11155352f1d9bba37c4cf5cb8118228014b1ef7e5c2325ee6ac7"
+
+BLOCK_BYTES = bytes.fromhex(
+    "01"                                      # version
+    "0000000000000001"                        # index 1
+    "00" + "00" * 31 + "01"                   # previous_hash as 32 raw bytes
+    "41d954fc40600000"                        # timestamp 1700000001.5
+    "000000000000002a"                        # nonce 42
+    "00" + "ab" * 32 +                        # hash as 32 raw bytes
+    "06" "00000001"                           # transactions: list of 1
+    "07" "00000001" "00000001" "61" "03" "0000000000000001"  # {"a": 1}
+)
+BLOCK_HASH = "cc5860ecde3272bf891e5b1d634c2bdba036e2b87b0e1b473973152608ec7017"
+
+GENESIS_BYTES = bytes.fromhex(
+    "01" "0000000000000000"
+    "01" "00000001" "30"                      # previous_hash "0" as a string
+    "41d954fc40000000" "0000000000000000"
+    "01" "00000001" "30"                      # hash "0" as a string
+    "06" "00000000"
+)
+GENESIS_HASH = "98596d2b15ffc5f7974d15b69a7aab8955b4d0d7e86064ffaf0d3fbea397443d"
+
+
+def _transaction():
+    return Transaction("alice", "bob", 12.5, {"note": "hi", "n": 3}, timestamp=1700000000.0)
+
+
+def _block():
+    return Block(1, "0" * 63 + "1", [{"a": 1}], nonce=42, hash_val="ab" * 32, timestamp=1700000001.5)
+
+
+def test_transaction_golden_vector():
+    transaction = _transaction()
+    assert transaction.to_bytes() == TRANSACTION_BYTES
+    assert transaction.tx_id == TRANSACTION_ID
+
+
+def test_transaction_round_trip():
+    decoded = Transaction.from_bytes(TRANSACTION_BYTES)
+    assert decoded.to_dict() == _transaction().to_dict()
+
+
+def test_block_golden_vector():
+    block = _block()
+    assert block.to_bytes() == BLOCK_BYTES
+    assert block.calculate_hash() == BLOCK_HASH
+
+
+def test_genesis_golden_vector():
+    genesis = Block(0, "0", [], 0, "0", 1700000000.0)
+    assert genesis.to_bytes() == GENESIS_BYTES
+    assert genesis.calculate_hash() == GENESIS_HASH
+
+
+def test_block_round_trip():
+    decoded = Block.from_bytes(BLOCK_BYTES)
+    assert decoded.to_dict() == _block().to_dict()
+    assert decoded.to_bytes() == BLOCK_BYTES
+
+
+def test_value_round_trip_is_canonical():
+    value = {"b": [1, -2, 3.5, None, True, False], "a": {"x": "ü", "y": b"\x00\xff"}}
+    encoded = encode_value(value)
+    assert decode_value(encoded) == value
+    assert encode_value({"a": value["a"], "b": value["b"]}) == encoded
+
+
+@pytest.mark.parametrize("size", [0, 1, 10, len(BLOCK_BYTES) - 1])
+def test_truncated_block_raises_encoding_error(size):
+    with pytest.raises(EncodingError):
+        Block.from_bytes(BLOCK_BYTES[:size])
+
+
+def test_truncated_number_raises_encoding_error():
+    with pytest.raises(EncodingError, match="truncated record"):
+        Reader(b"\x00\x01").unpack(U64)
+
+
+def test_unsupported_version_is_rejected():
+    with pytest.raises(EncodingError, match="unsupported encoding version"):
+        Transaction.from_bytes(b"\x02" + TRANSACTION_BYTES[1:])
@@ -0,0 +1,138 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JobQueue, JobQueueFull
+
+
+def _wait_for(jobs, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while any(job.status not in ("done", "failed") for job in jobs):
+        assert time.monotonic() < deadline, "jobs did not finish"
+        time.sleep(0.005)
+
+
+def double(payloads):
+    return [payload * 2 for payload in payloads]
+
+
+class GatedHandler:
+    """Blocks its first call until `release`, so later jobs pile up behind it"""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def __call__(self, payloads):
+        self.batches.append(list(payloads))
+        self.started.set()
+        self.gate.wait(5)
+        return payloads
+
+    def release(self):
+        self.gate.set()
+
+
+def test_waiting_jobs_run_in_one_batch():
+    handler = GatedHandler()
+    queue = JobQueue(handler, workers=1, batch_size=3)
+    try:
+        first = queue.submit(0)
+        handler.started.wait(5)
+        jobs = [queue.submit(n) for n in range(1, 6)]
+        handler.release()
+        _wait_for([first] + jobs)
+    finally:
+        queue.close()
+    assert handler.batches == [[0], [1, 2, 3], [4, 5]]
+    assert [job.result for job in jobs] == [1, 2, 3, 4, 5]
+    metrics = queue.metrics()
+    assert metrics["done"] == 6
+    assert metrics["batch_size"]["count"] == 3
+
+
+def test_failed_result_is_retried_with_backoff_and_only_for_its_job():
+    calls = []
+
+    def flaky(payloads):
+        calls.append(list(payloads))
+        return [ValueError("not yet") if payload == "flaky" and len(calls) < 3 else payload
+                for payload in payloads]
+
+    queue = JobQueue(flaky, workers=1, retry_delay=0.01)
+    try:
+        flaky_job, good_job = queue.submit("flaky"), queue.submit("good")
+        _wait_for([flaky_job, good_job])
+    finally:
+        queue.close()
+    assert good_job.status == "done" and good_job.attempts == 1
+    assert flaky_job.status == "done" and flaky_job.attempts == 3
+    assert flaky_job.error is None
+    assert queue.counts["retried"] == 2
+
+
+def test_job_fails_after_max_attempts():
+    def broken(payloads):
+        raise RuntimeError("model unavailable")
+
+    queue = JobQueue(broken, workers=1, max_attempts=2, retry_delay=0.01)
+    try:
+        job = queue.submit("x")
+        _wait_for([job])
+    finally:
+        queue.close()
+    assert job.status == "failed"
+    assert job.attempts == 2
+    assert job.error == "RuntimeError: model unavailable"
+    assert queue.metrics()["failed"] == 1
+
+
+def test_wrong_number_of_results_fails_the_batch():
+    queue = JobQueue(lambda payloads: [], workers=1, max_attempts=1)
+    try:
+        job = queue.submit("x")
+        _wait_for([job])
+    finally:
+        queue.close()
+    assert job.status == "failed"
+    assert "returned 0 results for 1 jobs" in job.error
+
+
+def test_submit_raises_when_the_queue_is_full():
+    handler = GatedHandler()
+    queue = JobQueue(handler, workers=1, max_queue=2)
+    try:
+        queue.submit("running")
+        handler.started.wait(5)
+        queue.submit("a")
+        queue.submit("b")
+        with pytest.raises(JobQueueFull):
+            queue.submit("c")
+        assert queue.metrics()["rejected"] == 1
+        assert queue.metrics()["queue_depth"] == 2
+    finally:
+        handler.release()
+        queue.close()
+
+
+def test_only_the_newest_finished_jobs_are_kept():
+    queue = JobQueue(double, workers=1, keep_finished=2)
+    try:
+        jobs = [queue.submit(n) for n in range(4)]
+        _wait_for(jobs)
+    finally:
+        queue.close()
+    assert [queue.get(job.id) for job in jobs[:2]] == [None, None]
+    assert [queue.get(job.id).result for job in jobs[2:]] == [4, 6]
+
+
+def test_handler_can_run_in_a_process_pool():
+    queue = JobQueue(double, workers=1, processes=True)
+    try:
+        jobs = [queue.submit(n) for n in range(3)]
+        _wait_for(jobs, timeout=30)
+    finally:
+        queue.close()
+    assert [job.result for job in jobs] == [0, 2, 4]
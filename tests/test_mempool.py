@@ -0,0 +1,92 @@
+from core.mempool import Mempool, size_of, tx_id_of
+
+
+def _tx(n, fee):
+    return {"tx_id": f"tx-{n}", "fee": fee}
+
+
+def test_duplicates_are_rejected():
+    pool = Mempool()
+    assert pool.add_transaction(_tx(1, 5))
+    assert not pool.add_transaction(_tx(1, 9))
+    assert len(pool) == 1
+    assert pool.transactions["tx-1"]["fee"] == 5
+
+
+def test_plain_dicts_are_keyed_by_their_content():
+    tx = {"sender": "a", "recipient": "b", "amount": 1}
+    assert tx_id_of(tx) == tx_id_of(dict(reversed(list(tx.items()))))
+    pool = Mempool()
+    assert pool.add_transaction(tx)
+    assert not pool.add_transaction(dict(tx))
+
+
+def test_top_orders_by_fee_then_arrival():
+    pool = Mempool()
+    for n, fee in enumerate([1, 5, 3, 5, 0]):
+        pool.add_transaction(_tx(n, fee))
+    assert [tx["tx_id"] for tx in pool.top(4)] == ["tx-1", "tx-3", "tx-2", "tx-0"]
+    assert len(pool) == 5  # top leaves them in the pool
+    assert [tx["tx_id"] for tx in pool.top(10)] == ["tx-1", "tx-3", "tx-2", "tx-0", "tx-4"]
+
+
+def test_removed_transactions_are_skipped_lazily():
+    pool = Mempool()
+    for n in range(10):
+        pool.add_transaction(_tx(n, n))
+    removed = pool.remove(["tx-9", "tx-7", "missing"])
+    assert [tx["tx_id"] for tx in removed] == ["tx-9", "tx-7"]
+    assert len(pool._best) == 10  # stale entries stay until popped
+    assert [tx["tx_id"] for tx in pool.top(3)] == ["tx-8", "tx-6", "tx-5"]
+    assert pool.bytes == sum(size_of(tx) for tx in pool)
+    assert "tx-9" not in pool
+
+
+def test_heaps_are_compacted_once_stale_entries_dominate():
+    pool = Mempool()
+    for n in range(200):
+        pool.add_transaction(_tx(n, n))
+    pool.remove([f"tx-{n}" for n in range(190)])
+    assert len(pool._best) <= 2 * len(pool) + 64
+    assert len(pool._worst) <= 2 * len(pool) + 64
+    assert [tx["tx_id"] for tx in pool.top(2)] == ["tx-199", "tx-198"]
+
+
+def test_cheapest_transaction_is_evicted_when_full():
+    evicted = []
+    pool = Mempool(max_count=3, on_evict=evicted.append)
+    for n, fee in enumerate([4, 1, 6]):
+        pool.add_transaction(_tx(n, fee))
+
+    assert pool.add_transaction(_tx(3, 5))
+    assert [tx["tx_id"] for tx in evicted] == ["tx-1"]
+    assert set(pool.transactions) == {"tx-0", "tx-2", "tx-3"}
+
+    # Too cheap to displace anything: refused, and not reported as evicted
+    assert not pool.add_transaction(_tx(4, 0))
+    assert [tx["tx_id"] for tx in evicted] == ["tx-1"]
+    assert len(pool) == 3
+
+
+def test_byte_limit_evicts_until_the_pool_fits():
+    size = size_of(_tx(0, 1))
+    evicted = []
+    pool = Mempool(max_bytes=3 * size, on_evict=evicted.append)
+    for n in range(3):
+        pool.add_transaction(_tx(n, n + 1))
+    assert pool.add_transaction(_tx(3, 9))
+    assert [tx["tx_id"] for tx in evicted] == ["tx-0"]
+    assert pool.add_transaction({"tx_id": "big", "fee": 8, "memo": "x" * (size // 2)})  # takes two slots
+    assert [tx["tx_id"] for tx in evicted] == ["tx-0", "tx-1", "tx-2"]
+    assert set(pool.transactions) == {"tx-3", "big"}
+    assert pool.bytes <= pool.max_bytes
+
+
+def test_clear_empties_the_pool():
+    pool = Mempool()
+    pool.add_transaction(_tx(1, 1))
+    pool.clear()
+    assert len(pool) == 0
+    assert pool.bytes == 0
+    assert pool.top(5) == []
+    assert pool.add_transaction(_tx(1, 1))
@@ -0,0 +1,41 @@
+import pytest
+
+from merkle import EMPTY_ROOT, merkle_proof, merkle_proofs, merkle_root, verify_proof
+
+
+def items(n):
+    return [{"sender": "a", "recipient": "b", "amount": i} for i in range(n)]
+
+
+def test_empty_and_single_item_roots():
+    assert merkle_root([]) == EMPTY_ROOT
+    assert merkle_root(["x"]) != merkle_root(["y"])
+    assert merkle_proof(["x"], 0) == []
+    assert verify_proof("x", [], merkle_root(["x"]))
+
+
+@pytest.mark.parametrize("n", [3, 5, 6, 7])
+def test_repeating_the_last_item_changes_the_root(n):
+    leaves = items(n)
+    assert merkle_root(leaves + leaves[-1:]) != merkle_root(leaves)
+
+
+def test_order_matters():
+    leaves = items(4)
+    assert merkle_root(leaves[::-1]) != merkle_root(leaves)
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 5, 7, 8, 13])
+def test_every_proof_verifies(n):
+    leaves = items(n)
+    root = merkle_root(leaves)
+    proofs = merkle_proofs(leaves)
+    for i, leaf in enumerate(leaves):
+        assert proofs[i] == merkle_proof(leaves, i)
+        assert verify_proof(leaf, proofs[i], root)
+        assert not verify_proof({"forged": i}, proofs[i], root)
+
+
+def test_proof_index_out_of_range():
+    with pytest.raises(IndexError):
+        merkle_proof(items(3), 3)
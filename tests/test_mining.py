@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+import mining
+from mining import MiningError, ParallelMiner
+
+
+def test_parallel_miner_finds_a_solution():
+    result = ParallelMiner(2).mine(b"prefix", b"suffix", 2)
+    assert result.hash.startswith("00")
+    assert result.workers == 2
+
+
+def test_parallel_miner_fails_when_a_worker_dies(monkeypatch):
+    search = mining._worker
+
+    def worker(index, *args):
+        if index == 1:
+            os._exit(3)
+        search(index, *args)
+
+    monkeypatch.setattr(mining, "_worker", worker)
+    monkeypatch.setattr(mining, "POLL_INTERVAL", 0.05)
+    with pytest.raises(MiningError, match="worker 1 died with exit code 3"):
+        ParallelMiner(2).mine(b"prefix", b"suffix", 64)  # never solved, so only the crash can end it
@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ml_batching import MicroBatcher
+
+
+def _predict_concurrently(batcher, requests):
+    """Results (or exceptions) of `requests`, all submitted at once, in order"""
+    results = [None] * len(requests)
+
+    def call(i):
+        try:
+            results[i] = batcher.predict(requests[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class RecordingModel:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, rows):
+        self.calls.append(len(rows))
+        if (rows < 0).any():
+            raise ValueError("negative feature")
+        return rows.sum(axis=1)
+
+
+def test_concurrent_requests_share_one_batch():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=6, max_wait=5)  # full batch sends at once
+    requests = [np.full((2, 3), i, dtype=float) for i in range(3)]
+    try:
+        results = _predict_concurrently(batcher, requests)
+    finally:
+        batcher.close()
+    assert model.calls == [6]
+    for i, result in enumerate(results):
+        np.testing.assert_array_equal(result, [3.0 * i, 3.0 * i])
+    assert batcher.metrics()["batches"] == 1
+    assert batcher.metrics()["requests"] == 3
+
+
+def test_failed_batch_is_split_so_only_the_bad_request_fails():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=6, max_wait=5)
+    requests = [np.ones((2, 3)), -np.ones((2, 3)), np.full((2, 3), 2.0)]
+    try:
+        results = _predict_concurrently(batcher, requests)
+    finally:
+        batcher.close()
+    np.testing.assert_array_equal(results[0], [3.0, 3.0])
+    assert isinstance(results[1], ValueError)
+    np.testing.assert_array_equal(results[2], [6.0, 6.0])
+    assert model.calls == [6, 2, 2, 2]
+    assert batcher.counts["split_batches"] == 1
+
+
+def test_wrong_prediction_count_fails_over_to_single_requests():
+    def model(rows):
+        return np.zeros(len(rows) - 1 if len(rows) > 1 else 1)
+
+    batcher = MicroBatcher(model, max_batch_size=2, max_wait=5)
+    try:
+        results = _predict_concurrently(batcher, [np.ones((1, 2)), np.ones((1, 2))])
+    finally:
+        batcher.close()
+    assert [len(result) for result in results] == [1, 1]
+    assert batcher.counts["split_batches"] == 1
+
+
+def test_requests_of_different_shapes_are_not_stacked():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=4, max_wait=0.05)
+    try:
+        results = _predict_concurrently(batcher, [np.ones((2, 3)), np.ones((2, 4))])
+    finally:
+        batcher.close()
+    assert sorted(model.calls) == [2, 2]
+    assert [list(result) for result in results] == [[3.0, 3.0], [4.0, 4.0]]
+
+
+def test_oversized_request_runs_on_its_own():
+    model = RecordingModel()
+    batcher = MicroBatcher(model, max_batch_size=2, max_wait=0.01)
+    try:
+        result = batcher.predict(np.ones((5, 2)))
+    finally:
+        batcher.close()
+    assert model.calls == [5]
+    assert len(result) == 5
+
+
+def test_predict_after_close_raises():
+    batcher = MicroBatcher(RecordingModel())
+    batcher.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.predict(np.ones((1, 2)))
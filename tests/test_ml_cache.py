@@ -0,0 +1,81 @@
+import numpy as np
+
+import ml_cache
+from ml_cache import PredictionCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lookup_splits_hits_and_misses():
+    cache = PredictionCache()
+    rows = np.arange(6, dtype=float).reshape(3, 2)
+    keys = PredictionCache.keys(rows, "v1")
+    cache.store([keys[0], keys[2]], [10.0, 30.0])
+
+    predictions, misses = cache.lookup(keys)
+    assert predictions == [10.0, None, 30.0]
+    assert misses == [1]
+    assert cache.counts["hits"] == 2
+    assert cache.counts["misses"] == 1
+
+
+def test_keys_depend_on_version_dtype_and_shape():
+    rows = np.ones((1, 4), dtype=np.float32)
+    key = PredictionCache.keys(rows, "v1")[0]
+    assert PredictionCache.keys(rows, "v1")[0] == key
+    assert PredictionCache.keys(rows, "v2")[0] != key
+    assert PredictionCache.keys(rows.astype(np.float64), "v1")[0] != key
+    assert PredictionCache.keys(np.ones((1, 2, 2), dtype=np.float32), "v1")[0] != key  # same bytes
+
+
+def test_new_model_version_misses():
+    cache = PredictionCache()
+    rows = np.ones((2, 3))
+    cache.store(PredictionCache.keys(rows, "v1"), [1.0, 1.0])
+    _, misses = cache.lookup(PredictionCache.keys(rows, "v2"))
+    assert misses == [0, 1]
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ml_cache.time, "monotonic", clock)
+    cache = PredictionCache(ttl=10)
+    keys = PredictionCache.keys(np.ones((1, 2)), "v1")
+    cache.store(keys, [5.0])
+
+    clock.now += 9
+    assert cache.lookup(keys) == ([5.0], [])
+    clock.now += 1
+    assert cache.lookup(keys) == ([None], [0])
+    assert cache.counts["expired"] == 1
+    assert cache.metrics()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(max_entries=2)
+    keys = PredictionCache.keys(np.arange(3, dtype=float).reshape(3, 1), "v1")
+    cache.store(keys[:2], [0.0, 1.0])
+    cache.lookup([keys[0]])  # keys[1] is now the least recently used
+    cache.store([keys[2]], [2.0])
+
+    predictions, misses = cache.lookup(keys)
+    assert predictions == [0.0, None, 2.0]
+    assert misses == [1]
+    assert cache.counts["evicted"] == 1
+
+
+def test_clear_drops_every_entry():
+    cache = PredictionCache()
+    keys = PredictionCache.keys(np.ones((2, 2)), "v1")
+    cache.store(keys, [1.0, 2.0])
+    cache.clear()
+    assert cache.lookup(keys)[1] == [0, 1]
+    metrics = cache.metrics()
+    assert metrics["invalidations"] == 1
+    assert metrics["hit_rate"] == 0.0
@@ -0,0 +1,32 @@
+import os
+
+import numpy as np
+
+from model_registry import BUFFERS_FILE, load_model, save_model
+
+
+def weights(value):
+    return {"w": np.full(64 * 1024, value, dtype=np.float64)}
+
+
+def test_saved_model_loads_memory_mapped(tmp_path):
+    save_model(weights(1.0), str(tmp_path))
+    model, version = load_model(str(tmp_path))
+    assert not model["w"].flags.writeable  # a view of the mapped buffers file
+    assert (model["w"] == 1.0).all()
+    assert load_model(str(tmp_path))[1] == version
+
+
+def test_saving_over_a_loaded_model_leaves_it_intact(tmp_path):
+    save_model(weights(1.0), str(tmp_path))
+    old, old_version = load_model(str(tmp_path))
+    inode = os.stat(tmp_path / BUFFERS_FILE).st_ino
+
+    save_model({"w": np.full(32 * 1024, 2.0)}, str(tmp_path))  # smaller file: truncation would unmap
+    assert os.stat(tmp_path / BUFFERS_FILE).st_ino != inode
+    assert (old["w"] == 1.0).all()
+
+    new, new_version = load_model(str(tmp_path))
+    assert (new["w"] == 2.0).all()
+    assert new_version != old_version
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
@@ -0,0 +1,117 @@
+import random
+import threading
+
+import pytest
+
+from chat_ingest import ChatIngestor
+from nft import NFT, NFTManager, SortedIndex
+
+
+def test_save_changes_without_a_journal_raises():
+    manager = NFTManager()
+    manager.mint_nft("alice", "first")
+    with pytest.raises(RuntimeError, match="No journal is open"):
+        manager.save_changes()
+    assert manager.dirty  # nothing was dropped
+
+
+def test_save_changes_writes_to_an_open_journal(tmp_path):
+    manager = NFTManager()
+    manager.open_journal(str(tmp_path))
+    nft = manager.mint_nft("alice", "first")
+    assert manager.save_changes() == 1
+    reopened = NFTManager()
+    reopened.open_journal(str(tmp_path))
+    assert reopened.get_nft(nft.id).owner == "alice"
+
+
+def _twin_managers(count):
+    first, second = NFTManager(), NFTManager()
+    for i in range(count):
+        nft = first.mint_nft(f"owner-{i % 3}", f"nft-{i}")
+        second._adopt(NFT.from_dict(nft.to_dict()))
+    return first, second
+
+
+def _without_timestamps(nft):
+    data = nft.to_dict()
+    del data["last_train"]
+    for record in data["training_history"]:
+        del record["timestamp"]
+    return data
+
+
+def test_train_batch_matches_training_one_at_a_time():
+    batched, looped = _twin_managers(50)
+    ids = list(batched.nfts)
+    messages = [(nft_id, f"message number {i} " * (i % 4 + 1)) for i, nft_id in enumerate(ids)]
+    messages += [(ids[0], "second message in the batch"), ("missing", "hello")]
+
+    batch_results = batched.train_batch(messages)
+    loop_results = [looped.train_batch([pair])[0] for pair in messages]
+
+    assert batch_results[-1] == {"error": "NFT not found"}
+    assert batch_results[-2]["error"] == "NFT is cooling down"
+    assert batch_results[:-2] == loop_results[:-2]
+    for nft_id in ids:
+        assert _without_timestamps(batched.nfts[nft_id]) == _without_timestamps(looped.nfts[nft_id])
+    assert batched.dirty == looped.dirty
+    for field in ("value", "intelligence"):
+        assert [nft.id for nft in batched.top_nfts(field, 50)] == [nft.id for nft in looped.top_nfts(field, 50)]
+    for owner in ("owner-0", "owner-1", "owner-2"):
+        assert ([nft.id for nft in batched.owner_top_nfts(owner, 50)]
+                == [nft.id for nft in looped.owner_top_nfts(owner, 50)])
+
+
+@pytest.mark.parametrize("changes", [3, 200])  # one by one, and the bulk merge
+def test_sorted_index_update_many_matches_update(changes):
+    rng = random.Random(changes)
+    items = [(f"nft-{i}", rng.random()) for i in range(500)]
+    one_by_one, bulk = SortedIndex(items), SortedIndex(items)
+    updates = [(f"nft-{rng.randrange(600)}", rng.choice([rng.random(), 0.5])) for _ in range(changes)]
+
+    for nft_id, key in updates:
+        one_by_one.update(nft_id, key)
+    bulk.update_many(updates)
+
+    assert bulk.entries == one_by_one.entries
+    assert bulk.keys == one_by_one.keys
+    assert bulk.top(5) == one_by_one.top(5)
+    assert bulk.range(0.25, 0.75, limit=1000) == one_by_one.range(0.25, 0.75, limit=1000)
+
+
+def test_sorted_index_update_many_keeps_the_last_key_of_an_id():
+    index = SortedIndex([("a", 0.3), ("b", 0.1)])
+    index.update_many([("a", 0.9), ("b", 0.2), ("a", 0.3)])
+    assert index.entries == [(0.2, "b"), (0.3, "a")]
+
+
+def test_ingestor_and_request_threads_train_each_nft_once():
+    manager = NFTManager()
+    ids = [manager.mint_nft(f"owner-{i % 3}", f"nft-{i}").id for i in range(40)]
+    ingestor = ChatIngestor(manager)
+    for nft_id in ids:
+        ingestor.submit(nft_id, "queued message")
+    results = []
+    start = threading.Barrier(5)
+
+    def request_thread():
+        start.wait()
+        results.extend(manager.train_with_chat(nft_id, "direct message") for nft_id in ids)
+
+    def ingest_thread():
+        start.wait()
+        results.extend(ingestor.run_due())
+
+    threads = [threading.Thread(target=request_thread) for _ in range(4)]
+    threads.append(threading.Thread(target=ingest_thread))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(1 for result in results if result.get("success")) == len(ids)
+    for nft_id in ids:
+        assert len(manager.nfts[nft_id].training_history) == 1
+    for field in ("value", "intelligence"):
+        assert manager.indexes[field].entries == sorted((getattr(nft, field), nft.id) for nft in manager.nfts.values())
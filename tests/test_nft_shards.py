@@ -0,0 +1,118 @@
+import os
+import signal
+import time
+
+import pytest
+
+from nft_shards import ShardedNFTManager, ShardError
+
+
+def _mint_on_shards(manager, owner, shards):
+    """One NFT of `owner` on each of `shards`"""
+    minted = {}
+    while len(minted) < len(shards):
+        nft = manager.mint_nft(owner, "nft")
+        shard = manager.shard_of(nft.id)
+        if shard in shards:
+            minted.setdefault(shard, nft.id)
+    return [minted[i] for i in shards]
+
+
+def test_transfer_nfts_across_shards():
+    with ShardedNFTManager(2) as manager:
+        ids = _mint_on_shards(manager, "alice", [0, 1])
+        assert manager.transfer_nfts(ids, "alice", "bob")
+        assert {nft.id for nft in manager.get_owner_nfts("bob")} == set(ids)
+        assert not manager.transfer_nfts(ids, "alice", "carol")
+
+
+def test_failed_prepare_releases_held_nfts():
+    manager = ShardedNFTManager(3, timeout=5)
+    try:
+        ids = _mint_on_shards(manager, "alice", [0, 1, 2])
+        manager._processes[2].kill()
+        manager._processes[2].join()
+
+        with pytest.raises(ShardError):
+            manager.transfer_nfts(ids, "alice", "bob")
+        # Shards 0 and 1 prepared before shard 2 failed; their NFTs must not stay held
+        assert manager.transfer_nft(ids[0], "alice", "bob")
+        assert manager.transfer_nfts([ids[1]], "alice", "bob")
+        with pytest.raises(ShardError):
+            manager.get_nft(ids[2])
+    finally:
+        start = time.monotonic()
+        manager.close()
+        assert time.monotonic() - start < 5
+
+
+def test_unresponsive_shard_times_out():
+    manager = ShardedNFTManager(2, timeout=0.5)
+    try:
+        ids = _mint_on_shards(manager, "alice", [0, 1])
+        os.kill(manager._processes[1].pid, signal.SIGSTOP)
+
+        with pytest.raises(ShardError, match="no reply"):
+            manager.transfer_nfts(ids, "alice", "bob")
+        assert manager.transfer_nft(ids[0], "alice", "bob")
+    finally:
+        start = time.monotonic()
+        manager.close()
+        assert time.monotonic() - start < 5
+
+
+def _kill_before_commit(manager, shard):
+    """Make `shard` die as the commit phase of the next transfer starts; once only"""
+    exchange = manager._exchange
+
+    def killing_exchange(requests):
+        if any(method == "commit_transfer" for method, _ in requests.values()):
+            del manager._exchange
+            manager._processes[shard].kill()
+            manager._processes[shard].join()
+        return exchange(requests)
+
+    manager._exchange = killing_exchange
+
+
+def test_restarted_shard_finishes_a_committed_transfer(tmp_path):
+    with ShardedNFTManager(2, directory=str(tmp_path), timeout=5) as manager:
+        ids = _mint_on_shards(manager, "alice", [0, 1])
+        manager.save_changes()
+        _kill_before_commit(manager, 1)
+
+        with pytest.raises(ShardError, match="committed"):
+            manager.transfer_nfts(ids, "alice", "bob")
+        assert manager.get_nft(ids[0]).owner == "bob"
+
+        assert manager.recover() == [1]
+        assert manager.get_nft(ids[1]).owner == "bob"
+        assert manager.transfer_nft(ids[1], "bob", "carol")
+        assert not manager._pending
+
+
+def test_reopened_router_finishes_a_committed_transfer(tmp_path):
+    with ShardedNFTManager(2, directory=str(tmp_path), timeout=5) as manager:
+        ids = _mint_on_shards(manager, "alice", [0, 1])
+        manager.save_changes()
+        _kill_before_commit(manager, 1)
+        with pytest.raises(ShardError):
+            manager.transfer_nfts(ids, "alice", "bob")
+
+    with ShardedNFTManager(2, directory=str(tmp_path), timeout=5) as manager:
+        assert {nft.id for nft in manager.get_owner_nfts("bob")} == set(ids)
+        assert not manager._pending
+
+
+def test_restarted_shard_rolls_back_an_undecided_transfer(tmp_path):
+    with ShardedNFTManager(2, directory=str(tmp_path), timeout=5) as manager:
+        ids = _mint_on_shards(manager, "alice", [0, 1])
+        manager.save_changes()
+        manager._call(1, "prepare_transfer", "undecided", [ids[1]], "alice")
+        manager._processes[1].kill()
+        manager._processes[1].join()
+        with pytest.raises(ShardError):
+            manager.get_nft(ids[1])
+
+        manager.restart_shard(1)
+        assert manager.transfer_nft(ids[1], "alice", "bob")  # no longer held
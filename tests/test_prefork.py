@@ -0,0 +1,114 @@
+import signal
+from collections import deque
+from types import SimpleNamespace
+
+import prefork
+
+
+class FakeOS:
+    """fork/waitpid/kill of pretend worker processes; no child ever runs"""
+    WNOHANG = 1
+
+    def __init__(self):
+        self.forked = []
+        self.killed = []
+        self.exits = deque()  # (pid, status) waiting to be reaped
+
+    def fork(self):
+        pid = len(self.forked) + 100
+        self.forked.append(pid)
+        return pid
+
+    def waitpid(self, pid, options):
+        return self.exits.popleft() if self.exits else (0, 0)
+
+    def kill(self, pid, signum):
+        self.killed.append(pid)
+        if signum == signal.SIGTERM:
+            self.exits.append((pid, 0))
+
+
+class Parent:
+    """Runs serve_prefork against FakeOS, calling `script(self)` on every idle poll"""
+
+    def __init__(self, monkeypatch, script):
+        self.os = FakeOS()
+        self.handlers = {}
+        self.now = 0.0
+        self.polls = 0
+        self.freezes = 0
+        self.script = script
+        monkeypatch.setattr(prefork, "os", self.os)
+        monkeypatch.setattr(prefork, "signal", SimpleNamespace(
+            signal=self.handlers.__setitem__, SIGTERM=signal.SIGTERM, SIGINT=signal.SIGINT))
+        monkeypatch.setattr(prefork, "time", SimpleNamespace(monotonic=lambda: self.now, sleep=self.sleep))
+        monkeypatch.setattr(prefork, "gc", SimpleNamespace(freeze=self.freeze))
+
+    def freeze(self):
+        self.freezes += 1
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if seconds == prefork.POLL_INTERVAL:
+            self.polls += 1
+            self.script(self)
+        if self.polls > 100:
+            raise AssertionError("serve_prefork did not stop")
+
+    def stop(self):
+        self.handlers[signal.SIGTERM](signal.SIGTERM, None)
+
+    def serve(self, **kwargs):
+        prefork.serve_prefork(None, "127.0.0.1", 0, 2, **kwargs)
+
+
+def test_worker_that_dies_is_replaced(monkeypatch):
+    def script(parent):
+        if parent.polls == 1:
+            parent.os.exits.append((100, 256))
+        elif parent.polls == 3:
+            parent.stop()
+
+    parent = Parent(monkeypatch, script)
+    parent.serve()
+    assert parent.os.forked == [100, 101, 102]
+    assert sorted(parent.os.killed) == [101, 102]
+
+
+def test_reload_forks_new_workers_and_retires_the_old(monkeypatch):
+    reloads = iter([True])
+
+    def script(parent):
+        if parent.polls == 20:
+            parent.stop()
+
+    parent = Parent(monkeypatch, script)
+    calls = []
+    before_fork = lambda: calls.append("before_fork")
+    parent.serve(reload=lambda: next(reloads, False), reload_interval=1.0, before_fork=before_fork)
+
+    assert calls == ["before_fork"]  # setup runs once, in the parent
+    assert parent.os.forked == [100, 101, 102, 103]  # retired workers are not respawned
+    assert parent.os.killed[:2] == [100, 101]
+    assert sorted(parent.os.killed[2:]) == [102, 103]
+    assert parent.freezes == 2
+
+
+def test_failed_reload_check_keeps_the_workers(monkeypatch):
+    def reload():
+        raise OSError("model store unreachable")
+
+    def script(parent):
+        if parent.polls == 20:
+            parent.stop()
+
+    parent = Parent(monkeypatch, script)
+    parent.serve(reload=reload, reload_interval=1.0)
+    assert parent.os.forked == [100, 101]
+
+
+def test_stop_before_any_exit_terminates_every_worker(monkeypatch):
+    parent = Parent(monkeypatch, lambda parent: parent.stop())
+    parent.serve()
+    assert sorted(parent.os.killed) == [100, 101]
+    assert parent.os.forked == [100, 101]
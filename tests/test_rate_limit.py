@@ -0,0 +1,94 @@
+import pytest
+
+from fake_redis import FakeRedis
+from rate_limit import MemoryBackend, RateLimiter, RedisBackend
+
+START = 1_200_000.0  # a multiple of the 60 s window
+
+
+class Clock:
+    def __init__(self, now=START):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=["memory", "redis"])
+def make_limiter(request):
+    limiters = []
+
+    def make(limit, window=60.0, clock=None):
+        if request.param == "memory":
+            backend = MemoryBackend(stripes=4, evict_interval=0)
+        else:
+            backend = RedisBackend(FakeRedis(clock or Clock()))
+        limiters.append(RateLimiter(limit, window, backend))
+        return limiters[-1]
+
+    yield make
+    for limiter in limiters:
+        limiter.close()
+
+
+def test_limit_is_enforced_per_key(make_limiter):
+    limiter = make_limiter(3)
+    assert [limiter.hit("a", START + i)[0] for i in range(4)] == [True, True, True, False]
+    assert limiter.hit("b", START + 4)[0]
+
+
+def test_refused_requests_are_not_counted(make_limiter):
+    limiter = make_limiter(2)
+    for i in range(10):
+        limiter.hit("a", START + i)
+    # Only the two allowed requests carry into the next window, weighted by overlap
+    assert limiter.hit("a", START + 60 + 30)[0]
+
+
+def test_retry_after_points_at_the_next_window(make_limiter):
+    limiter = make_limiter(2)
+    limiter.hit("a", START)
+    limiter.hit("a", START + 10)
+    allowed, retry_after = limiter.hit("a", START + 20)
+    assert not allowed
+    assert retry_after == pytest.approx(40.0)
+
+
+def test_window_rollover_weights_the_previous_window(make_limiter):
+    limiter = make_limiter(4)
+    for i in range(4):
+        assert limiter.hit("a", START + 50 + i)[0]
+    # A quarter into the next window 3 of the 4 previous requests still count
+    assert limiter.hit("a", START + 75)[0]
+    assert not limiter.hit("a", START + 75)[0]
+    # Half way through only 2 do, and the request above counts in the current window
+    assert limiter.hit("a", START + 90)[0]
+    assert not limiter.hit("a", START + 90)[0]
+    # Two windows later the old requests are gone entirely
+    assert all(limiter.hit("a", START + 180 + i)[0] for i in range(4))
+
+
+def test_memory_backend_evicts_idle_keys():
+    backend = MemoryBackend(stripes=4, evict_interval=0)
+    limiter = RateLimiter(5, 60.0, backend)
+    limiter.hit("idle", START)
+    limiter.hit("busy", START)
+    limiter.hit("busy", START + 100)
+
+    # A key is idle once both windows it has counts in have slid past
+    assert backend.evict(START + 119) == 0
+    assert backend.evict(START + 120) == 1
+    assert len(backend) == 1
+    assert backend.evict(START + 180) == 1
+    assert len(backend) == 0
+
+
+def test_redis_keys_expire():
+    clock = Clock()
+    client = FakeRedis(clock)
+    limiter = RateLimiter(5, 60.0, RedisBackend(client))
+    limiter.hit("a", START)
+    assert client.keys()
+
+    clock.now = START + 121
+    assert client.keys() == []
@@ -0,0 +1,160 @@
+from blockchain import Block, Blockchain, signed_payload
+from merkle import merkle_root
+from wallet import SignatureVerifier, Wallet
+
+
+def _signed_transaction(wallet, **fields):
+    transaction = {"sender": wallet.address, "recipient": "NN_" + "b" * 40, "amount": 5, **fields}
+    transaction["signature"] = wallet.sign_transaction(transaction)
+    transaction["public_key"] = wallet.public_key
+    return transaction
+
+
+def test_wallet_signature_verifies():
+    wallet = Wallet()
+    wallet.generate_keys()
+    transaction = _signed_transaction(wallet)
+    assert wallet.verify_signature(signed_payload(transaction), transaction["signature"], wallet.public_key)
+
+
+def test_wallet_signed_transaction_is_accepted():
+    wallet = Wallet()
+    wallet.generate_keys()
+    chain = Blockchain()
+    good = _signed_transaction(wallet)
+    tampered = dict(_signed_transaction(wallet, fee=1), amount=500)
+
+    results = chain.add_transactions([good, tampered])
+
+    assert results[0]["success"]
+    assert results[1] == {"error": "Invalid transaction signature"}
+    chain.mine_pending_transactions(wallet.address)
+    assert chain.is_chain_valid(full=True)
+
+
+def test_chain_validation_uses_injected_verifier():
+    class RejectAll(SignatureVerifier):
+        def verify_batch(self, items):
+            return [False] * len(items)
+
+    wallet = Wallet()
+    wallet.generate_keys()
+    chain = Blockchain()
+    chain.add_transaction(_signed_transaction(wallet))
+    chain.mine_pending_transactions(wallet.address)
+    chain.verifier = RejectAll()
+
+    assert not chain.is_chain_valid(full=True)
+    assert chain.validation_error.reason == "invalid signature"
+
+
+def _chain_with_block(wallet, transactions):
+    chain = Blockchain()
+    chain.add_transactions(transactions)
+    chain.mine_pending_transactions(wallet.address)
+    return chain
+
+
+def test_repeated_last_transaction_does_not_keep_the_block_hash():
+    wallet = Wallet()
+    wallet.generate_keys()
+    # Two transfers plus the reward: an odd number of leaves
+    chain = _chain_with_block(wallet, [_signed_transaction(wallet), _signed_transaction(wallet, fee=1)])
+    block = chain.chain[1]
+    assert len(block.transactions) == 3
+    block.transactions.append(dict(block.transactions[-1]))
+
+    assert not chain.is_chain_valid(full=True)
+    assert chain.validation_error.reason == "invalid merkle root"
+
+
+def test_block_with_duplicate_transactions_is_rejected():
+    wallet = Wallet()
+    wallet.generate_keys()
+    chain = Blockchain()
+    transaction = _signed_transaction(wallet)
+    block = Block(1, [transaction, dict(transaction)], 0.0, chain.get_last_block().hash, difficulty=1)
+    block.mine_block(1)
+    chain.chain.append(block)
+
+    assert not chain.is_chain_valid(full=True)
+    assert chain.validation_error.reason == "duplicate transaction"
+
+
+def test_unsigned_or_foreign_key_transactions_are_refused():
+    wallet, other = Wallet(), Wallet()
+    wallet.generate_keys()
+    other.generate_keys()
+    chain = Blockchain()
+    stripped = _signed_transaction(wallet)
+    del stripped["public_key"]
+    foreign = _signed_transaction(other, sender=wallet.address)  # signed with someone else's key
+    reward = {"sender": "network", "recipient": wallet.address, "amount": 1000, "signature": "mining_reward"}
+
+    results = chain.add_transactions([stripped, foreign, reward])
+
+    assert results == [
+        {"error": "Invalid transaction: missing public key"},
+        {"error": "Invalid transaction: public key does not belong to the sender"},
+        {"error": "Mining rewards cannot be submitted"},
+    ]
+    assert not chain.pending_transactions
+
+
+def test_block_with_an_unsigned_transfer_is_rejected():
+    wallet = Wallet()
+    wallet.generate_keys()
+    chain = Blockchain()
+    chain.add_transaction(_signed_transaction(wallet))
+    chain.mine_pending_transactions(wallet.address)
+    block = chain.chain[1]
+    del block.transactions[0]["public_key"]
+    block.merkle_root = merkle_root(block.transactions)
+    block.mine_block(1)
+
+    assert not chain.is_chain_valid(full=True)
+    assert chain.validation_error.reason == "unsigned transaction"
+
+
+def test_verifier_caches_verified_signatures():
+    wallet = Wallet()
+    wallet.generate_keys()
+    verifier = SignatureVerifier(cache_size=2)
+    transactions = [_signed_transaction(wallet, fee=i) for i in range(3)]
+    items = [(signed_payload(tx), tx["signature"], tx["public_key"]) for tx in transactions]
+
+    assert verifier.verify_batch(items[:2]) == [True, True]
+    assert verifier.verify_batch(items[:2]) == [True, True]
+    assert (verifier.hits, verifier.misses) == (2, 2)
+
+    verifier.verify_batch([items[2]])  # evicts the least recently used entry
+    assert len(verifier.cache) == 2
+    assert not verifier.verify(signed_payload(transactions[0]), "0" * 64, wallet.public_key)  # never cached
+
+
+def test_verifier_pool_matches_serial_results():
+    wallet = Wallet()
+    wallet.generate_keys()
+    items = []
+    for i in range(20):
+        transaction = _signed_transaction(wallet, fee=i)
+        signature = transaction["signature"] if i % 3 else "bad"
+        items.append((signed_payload(transaction), signature, transaction["public_key"]))
+
+    pooled = SignatureVerifier(workers=2, min_parallel_batch=4)
+    try:
+        assert pooled.verify_batch(items) == SignatureVerifier().verify_batch(items)
+    finally:
+        pooled.close()
+
+
+def test_parallel_validation_ships_the_verifier_to_workers():
+    wallet = Wallet()
+    wallet.generate_keys()
+    chain = Blockchain()
+    chain.difficulty = 1
+    for i in range(3):
+        chain.add_transaction(_signed_transaction(wallet, fee=i))
+        chain.mine_pending_transactions(wallet.address)
+
+    assert chain.is_chain_valid(full=True, workers=2)
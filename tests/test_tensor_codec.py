@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from tensor_codec import (MSGPACK_TYPE, NPY_TYPE, TENSOR_TYPES, TensorError, decode_tensor, encode_tensor,
+                          _pack_str, _pack_uint)
+
+
+def msgpack_map(dtype, shape, data: bytes) -> bytes:
+    """A tensor map with arbitrary (possibly inconsistent) fields"""
+    return b"".join((b"\x83", _pack_str("dtype"), _pack_str(dtype),
+                     _pack_str("shape"), bytes((0x90 | len(shape),)), *(_pack_uint(d) for d in shape),
+                     _pack_str("data"), b"\xc6", len(data).to_bytes(4, "big"), data))
+
+
+@pytest.mark.parametrize("content_type", TENSOR_TYPES)
+@pytest.mark.parametrize("array", [
+    np.arange(12, dtype="<f8").reshape(3, 4),
+    np.arange(5, dtype=">i4"),
+    np.zeros((0, 3), dtype="<f4"),
+    np.array([[1, 0], [0, 1]], dtype="u1"),
+    np.random.default_rng(0).random((200, 50)),  # larger than a 16-bit bin length
+])
+def test_round_trip(content_type, array):
+    decoded = decode_tensor(encode_tensor(array, content_type), content_type)
+    assert decoded.dtype == array.dtype
+    assert decoded.shape == array.shape
+    assert (decoded == array).all()
+    assert not decoded.flags.writeable
+
+
+def test_npy_fortran_order_round_trip():
+    array = np.asfortranarray(np.arange(6, dtype="<f8").reshape(2, 3))
+    assert (decode_tensor(encode_tensor(array, NPY_TYPE), NPY_TYPE) == array).all()
+
+
+@pytest.mark.parametrize("payload", [
+    b"",
+    b"\x93NUMPY",
+    b"\x93NUMPY\x09\x00\x00\x00",  # unknown version
+    b"\x93NUMPY\x01\x00\x08\x00{'descr'",  # truncated header
+    b"\x93NUMPY\x01\x00\x05\x00[[[[[",
+    b"\x93NUMPY\x01\x00\x0c\x00" + b"[" * 6 + b"]" * 6,  # not a dict
+])
+def test_malformed_npy_is_rejected(payload):
+    with pytest.raises(TensorError):
+        decode_tensor(payload, NPY_TYPE)
+
+
+def test_npy_rejects_object_dtype_and_short_data():
+    with pytest.raises(TensorError, match="numeric"):
+        decode_tensor(encode_tensor(np.arange(3), NPY_TYPE).replace(b"<i8", b"|O8"), NPY_TYPE)
+    with pytest.raises(TensorError, match="data bytes"):
+        decode_tensor(encode_tensor(np.arange(3.0), NPY_TYPE)[:-8], NPY_TYPE)
+
+
+@pytest.mark.parametrize("payload, message", [
+    (msgpack_map("<f8", [2, 2], b"\0" * 24), "data bytes"),
+    (msgpack_map("<f8", [2, 2, 2], b"\0" * 64), "shape"),
+    (msgpack_map("|O", [1], b"\0" * 8), "dtype"),
+    (msgpack_map("<f8", [2 ** 32, 2 ** 32], b""), "data bytes"),  # overflows int64
+    (msgpack_map("<f8", [0, 2 ** 63], b""), "shape"),  # zero-size but too large for NumPy
+    (msgpack_map("<f8", [1], b"\0" * 8) + b"\x00", "single msgpack map"),
+    (msgpack_map("<f8", [1], b"\0" * 8)[:-3], "truncated"),
+    (b"\x81\xa3bad\xa2\xff\xfe", "UTF-8"),
+    (b"\x91" * 100000 + b"\x00", "nesting"),
+    (b"\xc1", "unsupported msgpack type"),
+    (b"\x81\xa4data\x01", "bin"),
+], ids=["short-data", "3-d", "object-dtype", "size-overflow", "dimension-overflow", "trailing-bytes",
+        "truncated", "bad-utf8", "deep-nesting", "unknown-type", "no-bin-data"])
+def test_malformed_msgpack_is_rejected(payload, message):
+    with pytest.raises(TensorError, match=message):
+        decode_tensor(payload, MSGPACK_TYPE)
+
+
+@pytest.mark.parametrize("content_type", TENSOR_TYPES)
+def test_every_truncation_raises_tensor_error(content_type):
+    payload = encode_tensor(np.arange(6, dtype="<f8").reshape(2, 3), content_type)
+    for end in range(len(payload)):
+        with pytest.raises(TensorError):
+            decode_tensor(payload[:end], content_type)
+
+
+def test_unsupported_content_type():
+    with pytest.raises(TensorError):
+        decode_tensor(b"", "application/json")
+    with pytest.raises(TensorError):
+        encode_tensor(np.array(["a"]), NPY_TYPE)
@@ -0,0 +1,78 @@
+import copy
+import gc
+import pickle
+
+from training_history import TrainingHistory, _record_dtype, message_table
+
+
+def _history(count, size=4):
+    history = TrainingHistory(size)
+    for i in range(count):
+        history.record(float(i), f"message {i % 3}", 0.5, [i, i + 1, i + 2], 0.25)
+    return history
+
+
+def _refs():
+    len(message_table)  # releases the ids of collected histories
+    return {message: message_table.refs[i] for message, i in message_table.ids.items()}
+
+
+def test_ring_buffer_keeps_newest_records():
+    history = _history(6)
+    assert [r["timestamp"] for r in history] == [2.0, 3.0, 4.0, 5.0]
+    assert history[-1]["message"] == "message 2"
+    assert history[0]["inputs"] == [2.0, 3.0, 4.0]
+
+
+def test_copies_intern_their_own_references():
+    before = _refs()
+    history = _history(6)
+    records = history.to_list()
+    copies = [copy.deepcopy(history), copy.copy(history), pickle.loads(pickle.dumps(history))]
+
+    for other in copies:
+        assert other.to_list() == records
+    del history
+    for other in copies:
+        assert other.to_list() == records
+        other.record(9.0, "message 9", 0.0, [0, 0, 0], 0.0)
+        assert other[-1]["message"] == "message 9"
+    del copies, other
+    assert _refs() == before
+
+
+def test_pickled_ids_are_resolved_against_the_loading_table():
+    history = _history(3)
+    data = pickle.dumps(history)
+    history.clear()
+    filler = _history(3)  # reuses the freed ids for other records
+    filler.record(0.0, "other", 0.0, [0, 0, 0], 0.0)
+
+    loaded = pickle.loads(data)
+    assert [r["message"] for r in loaded] == ["message 0", "message 1", "message 2"]
+
+
+def test_empty_history_copies():
+    history = copy.deepcopy(TrainingHistory(5))
+    assert len(history) == 0
+    history.record(1.0, "m", 0.0, [1, 2, 3], 0.0)
+    assert history.to_list()[0]["message"] == "m"
+
+
+def test_collected_history_releases_its_messages_on_the_next_table_call():
+    gc.collect()
+    before = len(message_table)
+    history = TrainingHistory(4)
+    history.record(0.0, "only used by a collected history", 0.5, [0, 1, 2], 0.25)
+    assert len(message_table) == before + 1
+
+    with message_table.lock:  # a collection can happen while this thread holds the lock
+        del history
+        gc.collect()
+    assert len(message_table) == before
+    assert "only used by a collected history" not in message_table.ids
+
+
+def test_record_dtype_is_built_once_per_width():
+    assert _record_dtype(3) is _record_dtype(3)
+    assert _record_dtype(4)["inputs"].shape == (4,)
@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+pytest.importorskip("web3")
+pytest.importorskip("eth_account")
+
+import web3_utils
+from web3_utils import ProviderPool
+
+
+class StubWeb3:
+    """Stands in for Web3: no network, connection state set by the test"""
+    connected = True
+    gate = None  # a Barrier every connection check waits on when set
+
+    class HTTPProvider:
+        def __init__(self, endpoint_uri, session=None):
+            self.endpoint_uri = endpoint_uri
+            self.session = session
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def isConnected(self):
+        if StubWeb3.gate is not None:
+            StubWeb3.gate.wait()
+        return StubWeb3.connected
+
+
+class TrackingSession(web3_utils.requests.Session):
+    created = []
+
+    def __init__(self):
+        super().__init__()
+        self.closed = False
+        TrackingSession.created.append(self)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(web3_utils, "Web3", StubWeb3)
+    monkeypatch.setattr(web3_utils.requests, "Session", TrackingSession)
+    monkeypatch.setattr(StubWeb3, "connected", True)
+    monkeypatch.setattr(StubWeb3, "gate", None)
+    monkeypatch.setattr(TrackingSession, "created", [])
+    pool = ProviderPool(health_interval=0)
+    yield pool
+    pool.close()
+
+
+def test_web3_reuses_the_pooled_provider(pool):
+    metrics = {}
+    first = pool.web3("http://node")
+    assert pool.web3("http://node", metrics) is first
+    assert metrics["provider_reused"] is True
+    assert pool.stats["providers_created"] == 1
+    assert pool.stats["providers_reused"] == 1
+    assert pool.stats["health_checks"] == 1
+
+
+def test_concurrent_connects_keep_one_session_and_close_the_other(pool):
+    StubWeb3.gate = threading.Barrier(2)  # both threads are connecting at once
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pool.web3("http://node"))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results[0] is results[1]
+    assert pool.stats["providers_created"] == 1
+    assert pool.stats["providers_reused"] == 1
+    kept = results[0].provider.session
+    sessions = TrackingSession.created
+    assert len(sessions) == 2
+    assert [session.closed for session in sessions] == [session is not kept for session in sessions]
+    assert len(pool._providers) == 1
+
+
+def test_failed_health_check_discards_the_provider(pool):
+    first = pool.web3("http://node")
+    StubWeb3.connected = False
+    with pytest.raises(RuntimeError, match="Lost connection"):
+        pool.web3("http://node")
+    assert first.provider.session.closed
+    assert pool.stats["health_failures"] == 1
+    StubWeb3.connected = True
+    assert pool.web3("http://node") is not first
+    assert pool.stats["providers_created"] == 2
+
+
+def test_discard_leaves_a_newer_connection_alone(pool):
+    stale = pool._providers.setdefault("http://node", pool._connect("http://node"))
+    pool.discard("http://node")
+    current = pool.web3("http://node")
+    pool.discard("http://node", stale)
+    assert pool.web3("http://node") is current
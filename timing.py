@@ -0,0 +1,35 @@
+"""
+Rolling latency statistics shared by the job queue and the ML worker.
+"""
+from collections import deque
+from typing import Dict
+
+
+class Timing:
+    """Count, mean, max and percentiles over the last `window` samples (seconds)"""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def to_dict(self) -> Dict:
+        recent = sorted(self.samples)
+
+        def pct(p):
+            return recent[min(len(recent) - 1, int(p * len(recent)))] if recent else 0.0
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+        }
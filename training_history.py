@@ -0,0 +1,223 @@
+"""
+Compact storage for NFT training history.
+- `TrainingHistory` is a fixed-capacity ring buffer backed by one NumPy structured
+  array (timestamp, error, inputs, prediction, message id) per NFT, allocated on the
+  first record and grown up to its capacity.
+- Message prefixes are interned in a shared, reference-counted `MessageTable`, so
+  repeated messages are stored once and ids are recycled when no record uses them.
+  The table is locked, as request threads and the chat ingestor train concurrently.
+  A collected history only queues its ids; the next table call releases them, so
+  garbage collection never runs table code in the middle of another update.
+  Copies and pickles carry the message strings and intern them again.
+- Records go in and come out as the same dicts NFT.to_dict has always produced.
+"""
+import threading
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+HISTORY_SIZE = 100  # trainings kept per NFT
+INITIAL_CAPACITY = 8
+
+
+class MessageTable:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.messages: List[str] = []
+        self.refs: List[int] = []
+        self.free: List[int] = []
+        self.lock = threading.Lock()
+        self._orphans: List[int] = []  # ids of collected histories, released on the next call
+
+    def intern(self, message: str) -> int:
+        with self.lock:
+            self._release_orphans()
+            return self._intern(message)
+
+    def intern_many(self, messages: List[str]) -> List[int]:
+        with self.lock:
+            self._release_orphans()
+            return [self._intern(message) for message in messages]
+
+    def release(self, message_id: int) -> None:
+        with self.lock:
+            self._release_orphans()
+            self._release(message_id)
+
+    def release_many(self, message_ids: List[int]) -> None:
+        with self.lock:
+            self._release_orphans()
+            for message_id in message_ids:
+                self._release(message_id)
+
+    def release_later(self, message_ids: List[int]) -> None:
+        """For __del__: takes no lock, which the collected thread may already hold"""
+        self._orphans.extend(message_ids)
+
+    def _release_orphans(self) -> None:
+        while self._orphans:
+            self._release(self._orphans.pop())
+
+    def _intern(self, message: str) -> int:
+        message_id = self.ids.get(message)
+        if message_id is None:
+            if self.free:
+                message_id = self.free.pop()
+                self.messages[message_id] = message
+                self.refs[message_id] = 0
+            else:
+                message_id = len(self.messages)
+                self.messages.append(message)
+                self.refs.append(0)
+            self.ids[message] = message_id
+        self.refs[message_id] += 1
+        return message_id
+
+    def _release(self, message_id: int) -> None:
+        self.refs[message_id] -= 1
+        if not self.refs[message_id]:
+            del self.ids[self.messages[message_id]]
+            self.messages[message_id] = None
+            self.free.append(message_id)
+
+    def __len__(self) -> int:
+        with self.lock:
+            self._release_orphans()
+            return len(self.ids)
+
+
+# Shared by every NFT in the process
+message_table = MessageTable()
+
+
+@lru_cache(maxsize=None)
+def _record_dtype(width: int) -> np.dtype:
+    return np.dtype([
+        ("timestamp", "f8"),
+        ("error", "f8"),
+        ("inputs", "f8", (width,)),
+        ("prediction", "f8"),
+        ("message", "i4"),
+    ])
+
+
+class TrainingHistory:
+    """Last `size` training records of one NFT, oldest first"""
+    __slots__ = ("size", "width", "_data", "_start", "_count")
+
+    def __init__(self, size: int = HISTORY_SIZE, width: int = 3):
+        self.size = size
+        self.width = width
+        self._data = None  # allocated on first record
+        self._start = 0  # index of the oldest record once the buffer is full
+        self._count = 0
+
+    @classmethod
+    def from_records(cls, records: List[Dict], size: int = HISTORY_SIZE) -> 'TrainingHistory':
+        width = len(records[0]["inputs"]) if records else 3
+        history = cls(size, width)
+        for record in records:
+            history.append(record)
+        return history
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, record: Dict) -> None:
+        self.record(record["timestamp"], record["message"], record["error"], record["inputs"], record["prediction"])
+
+    def record(self, timestamp: float, message: str, error: float, inputs: List[float], prediction: float) -> None:
+        if self._data is None:
+            self._data = np.zeros(min(INITIAL_CAPACITY, self.size), dtype=_record_dtype(self.width))
+        if self._count < self.size and self._count == len(self._data):
+            grown = np.zeros(min(2 * len(self._data), self.size), dtype=self._data.dtype)
+            grown[:self._count] = self._data
+            self._data = grown
+
+        if self._count < self.size:
+            slot = self._count
+            self._count += 1
+        else:
+            # Full: overwrite the oldest record
+            slot = self._start
+            self._start = (self._start + 1) % self.size
+            message_table.release(int(self._data["message"][slot]))
+        self._data[slot] = (timestamp, error, inputs, prediction, message_table.intern(message))
+
+    def _slot(self, i: int) -> int:
+        return (self._start + i) % len(self._data)
+
+    def _record(self, slot: int) -> Dict:
+        row = self._data[slot]
+        return {
+            "timestamp": float(row["timestamp"]),
+            "message": message_table.messages[int(row["message"])],
+            "error": float(row["error"]),
+            "inputs": row["inputs"].tolist(),
+            "prediction": float(row["prediction"])
+        }
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._record(self._slot(j)) for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("training history index out of range")
+        return self._record(self._slot(i))
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self._record(self._slot(i))
+
+    def to_list(self) -> List[Dict]:
+        return list(self)
+
+    def _message_ids(self) -> List[int]:
+        if self._data is None:
+            return []
+        return [int(self._data["message"][self._slot(i)]) for i in range(self._count)]
+
+    def clear(self) -> None:
+        message_table.release_many(self._message_ids())
+        self._data = None
+        self._start = 0
+        self._count = 0
+
+    def __getstate__(self) -> Dict:
+        # Message ids only mean something in this process's table, so the strings travel
+        data = None
+        if self._count:
+            data = self._data[[self._slot(i) for i in range(self._count)]]
+        messages = [] if data is None else [message_table.messages[int(m)] for m in data["message"]]
+        return {"size": self.size, "width": self.width, "data": data, "messages": messages}
+
+    def __setstate__(self, state: Dict) -> None:
+        self.size = state["size"]
+        self.width = state["width"]
+        self._start = 0
+        self._count = 0
+        self._data = None
+        if state["data"] is not None:
+            data = np.array(state["data"])
+            data["message"] = message_table.intern_many(state["messages"])
+            self._data = data
+            self._count = len(data)
+
+    def __copy__(self) -> 'TrainingHistory':
+        return self.__deepcopy__({})  # records hold only numbers and strings
+
+    def __deepcopy__(self, memo) -> 'TrainingHistory':
+        history = TrainingHistory.__new__(TrainingHistory)
+        history.__setstate__(self.__getstate__())
+        return history
+
+    def __del__(self):
+        try:
+            message_table.release_later(self._message_ids())
+        except Exception:
+            pass
+
+    def nbytes(self) -> int:
+        return 0 if self._data is None else self._data.nbytes
@@ -2,9 +2,112 @@ import hashlib
 import json
 import binascii
 import base64
-from typing import Tuple, Dict
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Dict, List, Optional
 import os
 
+
+def _expected_signature(transaction_string: str, public_key: str) -> str:
+    # Demo scheme: signer and verifier both hash the canonical transaction with the public key
+    return hashlib.sha256((transaction_string + public_key).encode()).hexdigest()
+
+
+def _check_signature(item: Tuple[str, str, str]) -> bool:
+    transaction_string, signature, public_key = item
+    return signature == _expected_signature(transaction_string, public_key)
+
+
+def address_of(public_key: str) -> str:
+    """Wallet address that belongs to `public_key`"""
+    return "NN_" + hashlib.sha256(public_key.encode()).hexdigest()[:40]
+
+
+class SignatureVerifier:
+    """Verifies signatures, in batches across a process pool, remembering verified ones.
+
+    The LRU holds (tx hash, signature, public key) triples that already verified, so
+    a re-broadcast transaction, block assembly and chain validation do not redo the work.
+    With the demo scheme a check is one sha256, about what the cache key costs, so the
+    cache and pool only pay off once `_check_signature` is a real signature scheme;
+    workers defaults to 1, which checks on the calling thread.
+    """
+
+    def __init__(self, cache_size: int = 100000, workers: int = 1, min_parallel_batch: int = 256):
+        self.cache_size = cache_size
+        self.workers = workers
+        self.min_parallel_batch = min_parallel_batch
+        self.cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __getstate__(self):
+        # Sent to validation worker processes: settings only, and no nested pool there
+        return {"cache_size": self.cache_size, "workers": 1, "min_parallel_batch": self.min_parallel_batch}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def _remember(self, key: Tuple[str, str, str]) -> None:
+        with self.lock:
+            self.cache[key] = True
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def _cached(self, key: Tuple[str, str, str]) -> bool:
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def _map(self, work: List[Tuple[str, str, str]]) -> List[bool]:
+        if self.workers > 1 and len(work) >= self.min_parallel_batch:
+            with self.lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                pool = self._pool
+            chunksize = max(1, len(work) // (self.workers * 4))
+            return list(pool.map(_check_signature, work, chunksize=chunksize))
+        return [_check_signature(w) for w in work]
+
+    def verify(self, transaction_data: Dict, signature: str, public_key: str) -> bool:
+        return self.verify_batch([(transaction_data, signature, public_key)])[0]
+
+    def verify_batch(self, items: List[Tuple[Dict, str, str]]) -> List[bool]:
+        """Verify (transaction_data, signature, public_key) items; one bool per item"""
+        results = [True] * len(items)
+        pending = []
+        for i, (transaction_data, signature, public_key) in enumerate(items):
+            transaction_string = json.dumps(transaction_data, sort_keys=True)
+            key = (hashlib.sha256(transaction_string.encode()).hexdigest(), signature, public_key)
+            if not self._cached(key):
+                pending.append((i, key, (transaction_string, signature, public_key)))
+
+        checked = self._map([work for _, _, work in pending])
+        for (i, key, _), ok in zip(pending, checked):
+            results[i] = ok
+            if ok:
+                self._remember(key)
+        return results
+
+    def close(self) -> None:
+        with self.lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+
+# Shared so every path that checks a signature benefits from earlier verifications
+default_verifier = SignatureVerifier()
+
+
 class Wallet:
     def __init__(self):
         self.private_key = None
@@ -16,11 +119,10 @@ class Wallet:
         # In production, use proper cryptography like ECDSA
         private_key = os.urandom(32).hex()
         public_key = hashlib.sha256(private_key.encode()).hexdigest()
-        address = hashlib.sha256(public_key.encode()).hexdigest()[:40]
         
         self.private_key = private_key
         self.public_key = public_key
-        self.address = f"NN_{address}"
+        self.address = address_of(public_key)
         
         return {
             "private_key": private_key,
@@ -33,19 +135,12 @@ class Wallet:
         if not self.private_key:
             raise ValueError("Wallet not initialized")
             
-        transaction_string = json.dumps(transaction_data, sort_keys=True)
-        message = transaction_string + self.private_key
-        signature = hashlib.sha256(message.encode()).hexdigest()
-        
-        return signature
+        public_key = self.public_key or hashlib.sha256(self.private_key.encode()).hexdigest()
+        return _expected_signature(json.dumps(transaction_data, sort_keys=True), public_key)
     
     def verify_signature(self, transaction_data: Dict, signature: str, public_key: str) -> bool:
         """Verify a transaction signature"""
-        transaction_string = json.dumps(transaction_data, sort_keys=True)
-        message = transaction_string + public_key
-        expected_signature = hashlib.sha256(message.encode()).hexdigest()
-        
-        return signature == expected_signature
+        return default_verifier.verify(transaction_data, signature, public_key)
     
     @staticmethod
     def validate_address(address: str) -> bool:
@@ -1,9 +1,21 @@
 """
 Simple web3 utilities for loading ABIs and interacting with contracts.
 This module intentionally keeps a small surface area; expand as needed.
+- `ProviderPool` keeps one Web3 per provider URI on a keep-alive HTTP session and
+  re-checks its connection at most every `health_interval` seconds.
+- Contracts are cached per (provider, address, ABI path) and reloaded when the ABI
+  file's mtime changes.
+- Pass a dict as `metrics` to record setup time and cache hits for one request; the
+  pool also keeps running totals in `pool.stats`.
 """
 import os
 import json
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+import requests
 from web3 import Web3
 from eth_account import Account
 
@@ -34,6 +46,105 @@ def load_contract(w3: Web3, abi_path: str, address: str):
     return w3.eth.contract(address=w3.toChecksumAddress(address), abi=abi)
 
 
+class ProviderPool:
+    def __init__(self, health_interval: float = 30.0, max_connections: int = 10):
+        self.health_interval = health_interval
+        self.max_connections = max_connections  # keep-alive connections per provider
+        self.lock = threading.Lock()
+        self._providers: Dict[str, list] = {}  # uri -> [w3, session, last health check]
+        self._contracts: Dict[tuple, tuple] = {}  # (uri, address, abi_path) -> (w3, abi mtime, contract)
+        self.stats = Counter()
+
+    def _connect(self, provider_uri: str) -> list:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_connections)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        w3 = Web3(Web3.HTTPProvider(provider_uri, session=session))
+        if not w3.isConnected():
+            session.close()
+            raise RuntimeError("Failed to connect to web3 provider")
+        return [w3, session, time.monotonic()]
+
+    def web3(self, provider_uri: str = None, metrics: dict = None) -> Web3:
+        provider_uri = provider_uri or os.environ.get("WEB3_PROVIDER_URI")
+        if not provider_uri:
+            raise RuntimeError("WEB3_PROVIDER_URI not configured")
+        start = time.perf_counter()
+        with self.lock:
+            entry = self._providers.get(provider_uri)
+            check = entry is not None and time.monotonic() - entry[2] >= self.health_interval
+            if check:
+                entry[2] = time.monotonic()  # claimed, so concurrent callers skip the check
+                self.stats["health_checks"] += 1
+        reused = entry is not None
+        if entry is None:
+            # Connect outside the lock; if another thread connected meanwhile, keep its entry
+            new_entry = self._connect(provider_uri)
+            with self.lock:
+                entry = self._providers.setdefault(provider_uri, new_entry)
+                reused = entry is not new_entry
+                self.stats["providers_reused" if reused else "providers_created"] += 1
+            if reused:
+                new_entry[1].close()
+        else:
+            if check and not entry[0].isConnected():
+                with self.lock:
+                    self.stats["health_failures"] += 1
+                self.discard(provider_uri, entry)
+                raise RuntimeError("Lost connection to web3 provider")
+            with self.lock:
+                self.stats["providers_reused"] += 1
+        if metrics is not None:
+            metrics["provider_reused"] = reused
+            metrics["web3_setup_ms"] = (time.perf_counter() - start) * 1000
+        return entry[0]
+
+    def contract(self, w3: Web3, abi_path: str, address: str, metrics: dict = None):
+        """Contract handle of a pooled Web3, cached until the ABI file changes"""
+        start = time.perf_counter()
+        key = (w3.provider.endpoint_uri, address, abi_path)
+        mtime = os.stat(abi_path).st_mtime_ns if os.path.exists(abi_path) else None
+        # Built under the lock, so concurrent misses on one key build the contract once
+        with self.lock:
+            cached = self._contracts.get(key)
+            hit = cached is not None and cached[0] is w3 and cached[1] == mtime
+            if hit:
+                contract = cached[2]
+            else:
+                contract = load_contract(w3, abi_path, address)
+                self._contracts[key] = (w3, mtime, contract)
+            self.stats["contract_hits" if hit else "contract_misses"] += 1
+        if metrics is not None:
+            metrics["contract_cache_hit"] = hit
+            metrics["contract_ms"] = (time.perf_counter() - start) * 1000
+        return contract
+
+    def discard(self, provider_uri: str, entry: list = None) -> None:
+        """Forget a provider and its contracts; the next call reconnects.
+
+        With `entry`, only that connection is dropped, not one made since by another thread.
+        """
+        with self.lock:
+            if entry is not None and self._providers.get(provider_uri) is not entry:
+                return
+            entry = self._providers.pop(provider_uri, None)
+            for key in [k for k in self._contracts if k[0] == provider_uri]:
+                del self._contracts[key]
+        if entry is not None:
+            entry[1].close()
+
+    def close(self) -> None:
+        with self.lock:
+            uris = list(self._providers)
+        for provider_uri in uris:
+            self.discard(provider_uri)
+
+
+# Shared by every request handler in the process
+pool = ProviderPool()
+
+
 def sign_and_send_transaction(w3: Web3, private_key: str, tx: dict) -> str:
     acct = Account.from_key(private_key)
     # Ensure nonce
@@ -47,3 +158,17 @@ def sign_and_send_transaction(w3: Web3, private_key: str, tx: dict) -> str:
     signed = acct.sign_transaction(tx)
     tx_hash = w3.eth.sendRawTransaction(signed.rawTransaction)
     return tx_hash.hex()
+
+
+def anchor_root(w3: Web3, private_key: str, root: str, contract=None) -> str:
+    """Write a 32-byte hex root on chain; returns the transaction hash.
+
+    Uses the contract's recordTask when it has one, otherwise a zero-value
+    transaction to the signer's own address carrying the root as data.
+    """
+    acct = Account.from_key(private_key)
+    if contract is not None and hasattr(contract.functions, "recordTask"):
+        tx = contract.functions.recordTask(root).buildTransaction({"from": acct.address})
+    else:
+        tx = {"to": acct.address, "value": 0, "data": "0x" + root, "gas": 30000, "chainId": w3.eth.chain_id}
+    return sign_and_send_transaction(w3, private_key, tx)